@@ -0,0 +1,53 @@
+"""The registry of the game's images, fonts and animations, which loads them
+once they're needed instead of when their modules are imported.
+
+Modules register a loader, a function that loads their assets, with
+@assets.loader.  Nothing is loaded until one of load(), load_some() or
+load_all() is called, which has to be after graphics.init() has opened the
+window.  Importing a module never touches the disk, so the game can show
+the splash screen first and load everything else behind it.
+
+Animation columns register themselves, and are also built on first use if
+nothing has loaded them yet.  Sounds are handled by the sound module, since
+they can be decoded on another thread.
+"""
+import time
+
+_pending = []  # loaders that haven't run yet, in the order they were registered
+
+
+def loader(function):
+    """registers a function that loads some assets.  returns the function,
+    so that it can be used as a decorator"""
+    _pending.append(function)
+    return function
+
+
+def _run(function):
+    _pending.remove(function)
+    function()
+
+
+def load(module_name):
+    """runs every loader registered by one module"""
+    for function in [function for function in _pending
+                     if function.__module__ == module_name]:
+        _run(function)
+
+
+def load_some(seconds):
+    """runs loaders until seconds have passed, for spreading the loading
+    over several frames.  at least one loader is run.
+    returns whether there are loaders left"""
+    end = time.perf_counter() + seconds
+    while _pending:
+        _run(_pending[0])
+        if time.perf_counter() >= end:
+            break
+
+    return bool(_pending)
+
+
+def load_all():
+    while _pending:
+        _run(_pending[0])
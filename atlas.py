@@ -0,0 +1,226 @@
+"""The animation atlas, which caches every scaled and flipped animation column.
+
+Building an AnimColumn means loading its image, scaling it and, for columns
+facing the other way, flipping it.  Once a column has been built, it's
+packed into one atlas image along with every other column, which is saved
+to images/.cache/atlas.  On the next start, columns are cut out of the
+atlas instead of being built again.
+
+The file starts with a line of JSON, which is the index of where each
+column is, followed by the atlas' pixels.  They're stored uncompressed,
+since decoding a PNG takes longer than building the columns does.
+
+The atlas is converted to the display's pixel format once it's loaded, like
+graphics.load_image() images are.  Each column in the index remembers its
+colorkey, which is set on the column when it's cut out, and the image it
+was built from.  A column is rebuilt once its image changes, and the atlas
+is saved again.  The delays of each column are set by the code that makes
+it, so they aren't cached.
+
+The atlas can also be built ahead of time with
+    python atlas.py
+"""
+import hashlib
+import json
+import os
+import threading
+
+import pygame
+
+CACHE_FOLDER = os.path.join("images", ".cache")
+ATLAS_PATH = os.path.join(CACHE_FOLDER, "atlas")
+PIXEL_FORMAT = "RGB"
+
+# Bump ATLAS_VERSION whenever the way columns are built changes, so that
+# old atlases stop being used
+ATLAS_VERSION = 2
+
+_loaded = False
+_surface = None  # the atlas image
+_columns = {}  # key -> index entry of every column in the atlas
+_added = {}  # key -> (index entry, surface) of columns built since loading
+
+
+def _key(source, multiplier, flipped):
+    return "%s %i %i" % (source, multiplier, flipped)
+
+
+def _source_stamp(path):
+    """Returns the (mtime, size) of a source image, or None if it's missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _source_digest(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _is_current(entry):
+    """Returns whether a column's image is unchanged since it was packed.
+
+    The image counts as unchanged if its mtime and size are, or if its
+    contents are (a fresh checkout changes mtimes, but not contents)."""
+    stamp = _source_stamp(entry["source"])
+    if stamp is None:
+        return False
+    if list(stamp) == [entry["mtime"], entry["size"]]:
+        return True
+    return _source_digest(entry["source"]) == entry["sha1"]
+
+
+def _load():
+    global _loaded, _surface, _columns
+
+    _loaded = True
+    try:
+        with open(ATLAS_PATH, "rb") as file:
+            index = json.loads(file.readline().decode("utf-8"))
+            if index.get("version") != ATLAS_VERSION:
+                return
+            pixels = file.read()
+        surface = pygame.image.frombytes(pixels, tuple(index["size"]), PIXEL_FORMAT).convert()
+    except (OSError, ValueError, KeyError, pygame.error):
+        return
+
+    _surface = surface
+    _columns = {entry["key"]: entry for entry in index["columns"]}
+
+
+def find(source, multiplier, flipped):
+    """Returns the surface of a column from the atlas, or None if it isn't
+    in the atlas or its image has changed.
+
+    source is the path of the column's image."""
+    if not _loaded:
+        _load()
+
+    key = _key(source, multiplier, flipped)
+    if key in _added:
+        return _added[key][1]
+
+    entry = _columns.get(key)
+    if not entry or not _is_current(entry):
+        return None
+
+    surface = _surface.subsurface(entry["rect"])
+    if entry["colorkey"] is not None:
+        surface.set_colorkey(entry["colorkey"], pygame.RLEACCEL)
+    return surface
+
+
+def add(source, multiplier, flipped, surface):
+    """Adds a column that was just built, to be packed the next time the
+    atlas is saved.  columns with per pixel alpha aren't added, since the
+    atlas doesn't store alpha"""
+    stamp = _source_stamp(source)
+    if stamp is None or surface.get_flags() & pygame.SRCALPHA:
+        return
+
+    colorkey = surface.get_colorkey()
+    if colorkey is not None:
+        colorkey = list(colorkey[:3])
+
+    entry = {"key": _key(source, multiplier, flipped), "source": source,
+             "mtime": stamp[0], "size": stamp[1], "sha1": _source_digest(source),
+             "colorkey": colorkey, "rect": None}
+    _added[entry["key"]] = (entry, surface)
+
+
+def _pack(sizes):
+    """Returns the position of each (w, h) in sizes and the size of the
+    whole atlas.
+
+    Animation columns are much taller than they are wide, so they're
+    stacked into shelves that run down the atlas, tallest first.  No shelf
+    is taller than the tallest column."""
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    positions = [None] * len(sizes)
+    if not sizes:
+        return positions, (0, 0)
+
+    height = sizes[order[0]][1]
+    x = 0
+    y = 0
+    shelf_width = 0
+    for i in order:
+        w, h = sizes[i]
+        if y + h > height:
+            x += shelf_width
+            y = 0
+            shelf_width = 0
+        positions[i] = (x, y)
+        y += h
+        shelf_width = max(shelf_width, w)
+
+    return positions, (x + shelf_width, height)
+
+
+def save():
+    """Packs the columns built since the atlas was loaded into a new atlas,
+    along with the columns that are still current.  Failing to save it is
+    not an error, it just means the columns get built again next time."""
+    global _surface, _columns, _added
+
+    if not _added:
+        return
+
+    columns = []
+    for key, entry in _columns.items():
+        if key not in _added and _is_current(entry):
+            columns.append((dict(entry), _surface.subsurface(entry["rect"])))
+    for entry, surface in _added.values():
+        columns.append((dict(entry), surface))
+
+    positions, size = _pack([surface.get_size() for entry, surface in columns])
+    atlas = pygame.Surface(size)
+    for (entry, surface), position in zip(columns, positions):
+        entry["rect"] = list(position) + list(surface.get_size())
+
+        # Blitting skips the colorkey's pixels, so they're filled in first
+        if entry["colorkey"] is not None:
+            atlas.fill(entry["colorkey"], entry["rect"])
+        atlas.blit(surface, position)
+
+    _surface = atlas
+    _columns = {entry["key"]: entry for entry, surface in columns}
+    _added = {}
+
+    index = {"version": ATLAS_VERSION, "size": list(size),
+             "columns": [entry for entry, surface in columns]}
+
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+
+        # Written to a temporary file first, so nothing ever reads half a file
+        temporary_path = "%s.%i.%i.tmp" % (ATLAS_PATH, os.getpid(), threading.get_ident())
+        with open(temporary_path, "wb") as file:
+            file.write(json.dumps(index).encode("utf-8") + b"\n")
+            file.write(pygame.image.tobytes(atlas, PIXEL_FORMAT))
+        os.replace(temporary_path, ATLAS_PATH)
+    except (OSError, pygame.error):
+        pass
+
+
+def build():
+    """builds and saves every column the game uses"""
+    import assets
+    import graphics
+    import entities.player
+    import splash
+
+    graphics.init()
+    assets.load("graphics")
+    save()
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    # The columns are added to the atlas module that graphics imports,
+    # which isn't this one when this file is run directly
+    import atlas
+    atlas.build()
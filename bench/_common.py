@@ -0,0 +1,36 @@
+"""What every benchmark shares.
+
+Importing this sets up for the game's modules, so it's imported before
+them: the repo's root goes on sys.path and becomes the working directory,
+since the game loads its files by relative paths, and SDL gets its dummy
+drivers, so nothing opens a window or plays through the speakers.
+
+best_time() is how every benchmark times things, so their numbers compare.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+REPEATS = 5
+
+
+def best_time(function, repeats=REPEATS, setup=None):
+    """returns the shortest time in seconds that function took out of
+    repeats calls.  setup is called before each one, and isn't timed"""
+    best = None
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
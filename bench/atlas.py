@@ -0,0 +1,70 @@
+"""Times building every animation column, with and without the atlas.
+
+Run from anywhere with
+    python bench/atlas.py
+
+"images" builds every column from its image, scaling and flipping it.
+"atlas" loads the atlas from images/.cache and cuts every column out of
+it, which is what happens on every start after the first.  Both are
+checked to give the same pixels.
+"""
+import _common
+
+import pygame
+
+import atlas
+import graphics
+import splash
+import entities.player
+
+
+def game_columns():
+    columns = []
+    for value in list(vars(entities.player.Player).values()) + list(vars(splash).values()):
+        if isinstance(value, graphics.AnimColumn):
+            columns.append(value)
+    return columns
+
+
+def build_columns(columns, from_atlas):
+    """returns the surfaces of every column, built again"""
+    if from_atlas:
+        atlas._loaded = False
+    else:
+        atlas._loaded = True
+        atlas._columns = {}
+    atlas._added = {}
+
+    return [graphics.load_column(column.path, column.multiplier, column.flipped)
+            for column in columns]
+
+
+def pixels(surfaces):
+    return [pygame.image.tobytes(surface, "RGB") for surface in surfaces]
+
+
+def main():
+    graphics.init()
+
+    columns = game_columns()
+
+    # Makes sure the atlas is saved with every column in it
+    build_columns(columns, False)
+    atlas.save()
+
+    same = pixels(build_columns(columns, False)) == pixels(build_columns(columns, True))
+
+    images = _common.best_time(lambda: build_columns(columns, False))
+    cached = _common.best_time(lambda: build_columns(columns, True))
+
+    print("%i columns, ms to build all of them" % len(columns))
+    print("images    %.3f" % (images * 1000))
+    print("atlas     %.3f" % (cached * 1000))
+    if same:
+        print("same pixels from both")
+    else:
+        print("different pixels from the atlas")
+
+
+if __name__ == "__main__":
+    main()
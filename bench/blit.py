@@ -0,0 +1,94 @@
+"""Times blitting the game's images, as loaded from file and as prepared.
+
+Run from anywhere with
+    python bench/blit.py
+
+"file" is an image in its file's pixel format with a colorkey, which is
+how every image used to be drawn.  "prepared" is the same image from
+graphics.load_image() or graphics.load_blend_image().  Each image is
+blitted the way the game draws it, and both are checked to draw the same
+pixels.
+"""
+import _common
+
+import pygame
+
+import constants as const
+import graphics
+
+BLITS = 200
+
+# (image, multiplier, colorkey, special_flags), for the images drawn every
+# frame or every time a level is drawn
+SPRITES = [
+    ("background", 1, const.BLACK, 0),
+    ("title", 1, const.BLACK, 0),
+    ("punch_box", 2, const.TRANSPARENT, 0),
+    ("checkpoint_activated", 2, const.TRANSPARENT, 0),
+    ("punch", 2, const.TRANSPARENT, 0),
+    ("heart_large", 2, const.TRANSPARENT, 0),
+]
+BLENDS = [
+    ("player_gradient", 1, const.BLACK, pygame.BLEND_ADD),
+    ("player_goal_gradient", 1, const.BLACK, pygame.BLEND_MAX),
+    ("punch_box_gradient", 1, const.BLACK, pygame.BLEND_MAX),
+    ("deathlock_gradient", 1, const.BLACK, pygame.BLEND_MAX),
+    ("checkpoint_gradient", 1, const.BLACK, pygame.BLEND_MAX),
+    ("deathlock_glow", 1, const.BLACK, pygame.BLEND_MAX),
+    ("punch_box_glow", 1, const.BLACK, pygame.BLEND_MAX),
+    ("checkpoint_shade_soft", 2, const.BLACK, pygame.BLEND_MULT),
+]
+
+
+def file_image(name, multiplier, colorkey):
+    image = pygame.image.load(graphics.pathify(name))
+    if multiplier != 1:
+        width = image.get_width() * multiplier
+        height = image.get_height() * multiplier
+        image = pygame.transform.scale(image, (width, height))
+    image.set_colorkey(colorkey)
+    return image
+
+
+def prepared_image(name, multiplier, colorkey, special_flags):
+    if special_flags:
+        return graphics.load_blend_image(name, multiplier)
+    return graphics.load_image(name, multiplier, colorkey)
+
+
+def blit_many(surf, image, special_flags):
+    for i in range(BLITS):
+        surf.blit(image, (i % 7, i % 5), special_flags=special_flags)
+
+
+def drawn_pixels(surf, image, special_flags):
+    surf.fill((90, 60, 200))
+    surf.blit(image, (0, 0), special_flags=special_flags)
+    return pygame.image.tobytes(surf, "RGB")
+
+
+def main():
+    graphics.init()
+
+    surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+
+    print("us per blit          file   prepared")
+    mismatches = []
+    for name, multiplier, colorkey, special_flags in SPRITES + BLENDS:
+        old = file_image(name, multiplier, colorkey)
+        new = prepared_image(name, multiplier, colorkey, special_flags)
+        if drawn_pixels(surf, old, special_flags) != drawn_pixels(surf, new, special_flags):
+            mismatches.append(name)
+
+        old_time = _common.best_time(lambda: blit_many(surf, old, special_flags)) / BLITS
+        new_time = _common.best_time(lambda: blit_many(surf, new, special_flags)) / BLITS
+        print("%-22s %7.1f %9.1f" % (name, old_time * 1e6, new_time * 1e6))
+
+    if mismatches:
+        print("different pixels from %s" % ", ".join(mismatches))
+    else:
+        print("same pixels from every image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Plays a crowded scene, first on the mixer's shared channels like the game
+used to and then through the channel pool, and counts what gets dropped.
+
+Run from anywhere with
+    python bench/channels.py
+
+The music, the hum, the goal sound and the six flicker sounds all hold a
+channel the whole time, while PLAYS_PER_FRAME footsteps start every frame
+and a checkpoint sound every CUE_INTERVAL frames.  On the shared channels,
+whatever starts once they're all busy is dropped, checkpoint sounds
+included.  The pool cuts off a footstep for them instead, and keeps the
+music and ambience on channels of their own.  The scene plays in real
+time, since channels are only freed as their sounds finish.
+"""
+import random
+import time
+
+import _common
+
+import pygame
+
+import sound
+import flicker
+import menus
+import entities.player
+
+SECONDS = 3
+PLAYS_PER_FRAME = 3
+CUE_INTERVAL = 15
+
+FRAME_LENGTH = 1 / 60
+
+
+class Counts:
+    def __init__(self):
+        self.footsteps = 0
+        self.cues = 0
+        self.cues_dropped = 0
+        self.play_time = 0.0
+        self.plays = 0
+
+
+def shared_play(played_sound, volume):
+    """how the game used to play a sound"""
+    # pygame's Sound.play() used to skip sounds SDL won't play, which
+    # Channel.play() doesn't, and writes past the end of its channels for
+    # them
+    if not played_sound.playable:
+        return None
+
+    channel = pygame.mixer.find_channel()
+    if channel:
+        channel.set_volume(volume)
+        channel.play(played_sound.load())
+    return channel
+
+
+def shared_hold(held_sound):
+    if not held_sound.playable:
+        return
+    channel = pygame.mixer.find_channel()
+    if channel:
+        channel.play(held_sound.load(), -1)
+
+
+def pool_hold(held_sound):
+    held_sound.play(-1)
+
+
+def run(play, hold, held):
+    """plays the scene, and returns its Counts"""
+    rng = random.Random(0)
+    footsteps = entities.player.Player.RUN_SOUNDS.sounds
+    cues = entities.player.Player.CHECKPOINT_CHANGE_SOUNDS.sounds
+
+    for held_sound in held:
+        hold(held_sound)
+
+    counts = Counts()
+    for frame in range(int(SECONDS / FRAME_LENGTH)):
+        frame_start = time.perf_counter()
+
+        played = []
+        for _ in range(PLAYS_PER_FRAME):
+            played.append((rng.choice(footsteps), False))
+        if frame % CUE_INTERVAL == 0:
+            played.append((rng.choice(cues), True))
+
+        for played_sound, is_cue in played:
+            start = time.perf_counter()
+            channel = play(played_sound, 0.3)
+            counts.play_time += time.perf_counter() - start
+            counts.plays += 1
+
+            if is_cue:
+                counts.cues += 1
+                if not channel:
+                    counts.cues_dropped += 1
+            elif channel:
+                counts.footsteps += 1
+
+        time.sleep(max(0.0, FRAME_LENGTH - (time.perf_counter() - frame_start)))
+
+    pygame.mixer.stop()
+    return counts
+
+
+def main():
+    sound.init()
+    for loaded_sound in sound.sounds:
+        loaded_sound.load()
+
+    held = [menus.main_menu_music, sound.load("hum", sound.AMBIENCE, sound.HIGH_PRIORITY),
+            sound.load("goal", sound.AMBIENCE, sound.HIGH_PRIORITY)]
+    held.extend(flicker.turn_on_sounds)
+    for held_sound in held:
+        held_sound.load()
+
+    pygame.mixer.set_reserved(0)
+    shared = run(shared_play, shared_hold, held)
+
+    pygame.mixer.set_reserved(sound.CHANNEL_COUNT)
+    pooled = run(sound.play, pool_hold, held)
+
+    print("%i seconds, %i footsteps a frame, a checkpoint sound every %i frames"
+          % (SECONDS, PLAYS_PER_FRAME, CUE_INTERVAL))
+    print("                        shared     pool")
+    print("checkpoint sounds lost  %3i/%-3i  %3i/%-3i"
+          % (shared.cues_dropped, shared.cues, pooled.cues_dropped, pooled.cues))
+    print("footsteps played        %7i  %7i" % (shared.footsteps, pooled.footsteps))
+    print("us per play             %7.1f  %7.1f"
+          % (shared.play_time / shared.plays * 1e6, pooled.play_time / pooled.plays * 1e6))
+    for line in sound.channel_pool.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Times Room.collide_vert and Room.collide_horiz on every level.
+
+Run from anywhere with
+    python bench/collision.py
+
+The queries are the same spans that a 20x20 entity checks while moving
+around the room, including spans that poke outside of it.
+"""
+import os
+import random
+
+import _common
+
+import grid
+
+QUERY_COUNT = 20000
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def make_queries(seed):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(QUERY_COUNT):
+        x = rng.randint(-30, grid.Room.PIXEL_W + 10)
+        y = rng.randint(-30, grid.Room.PIXEL_H + 10)
+        collide_deathlock = rng.random() < 0.5
+        queries.append((x, y, x + 19, y + 19, collide_deathlock))
+    return queries
+
+
+def collide_all(room, queries):
+    collide_vert = room.collide_vert
+    collide_horiz = room.collide_horiz
+    for x1, y1, x2, y2, collide_deathlock in queries:
+        collide_vert(x1, y1, y2, collide_deathlock)
+        collide_vert(x2, y1, y2, collide_deathlock)
+        collide_horiz(x1, x2, y1, collide_deathlock)
+        collide_horiz(x1, x2, y2, collide_deathlock)
+
+
+def main():
+    queries = make_queries(0)
+    total = 0.0
+    names = level_names()
+    for name in names:
+        room = grid.Room(name)
+        total += _common.best_time(lambda: collide_all(room, queries))
+
+    calls = len(names) * len(queries) * 4
+    print("%i levels, %i collide calls" % (len(names), calls))
+    print("total %.3f s, %.1f ns per call" % (total, total / calls * 1e9))
+
+
+if __name__ == "__main__":
+    main()
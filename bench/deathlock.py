@@ -0,0 +1,97 @@
+"""Times grouping touching deathlock spaces on every level.
+
+Run from anywhere with
+    python bench/deathlock.py
+
+Room._label_deathlock_components() is compared against the recursive flood
+fill that rooms used to be loaded with, and both are checked to find the
+same groups.
+"""
+import os
+
+import _common
+
+import flicker
+import grid
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def deathlocks(room):
+    for index, tiles in sorted(room.objects.items()):
+        for tile in tiles:
+            if type(tile) is grid.Deathlock:
+                yield index, tile
+
+
+def recursive_flood(room):
+    """the old way of grouping deathlock spaces"""
+    def recursion(flicker_sequence, col, row):
+        tile = room.get_tile(grid.Deathlock, col, row)
+        if tile.flicker_initiated:
+            return
+
+        tile.flicker_sequence = flicker_sequence
+        if room.has_tile(grid.Deathlock, col - 1, row):
+            recursion(flicker_sequence, col - 1, row)
+        if room.has_tile(grid.Deathlock, col + 1, row):
+            recursion(flicker_sequence, col + 1, row)
+        if room.has_tile(grid.Deathlock, col, row - 1):
+            recursion(flicker_sequence, col, row - 1)
+        if room.has_tile(grid.Deathlock, col, row + 1):
+            recursion(flicker_sequence, col, row + 1)
+
+    for index, tile in deathlocks(room):
+        tile.flicker_sequence = None
+    for row in range(room.HEIGHT):
+        for col in range(room.WIDTH):
+            if room.has_tile(grid.Deathlock, col, row):
+                recursion(flicker.FlickerSequence(), col, row)
+
+
+def recursive_groups(room):
+    """the groups found by the recursive flood fill, numbered like
+    deathlock_components"""
+    recursive_flood(room)
+    groups = {}
+    numbers = {}
+    for index, tile in deathlocks(room):
+        sequence = id(tile.flicker_sequence)
+        if sequence not in numbers:
+            numbers[sequence] = len(numbers) + 1
+        groups[index] = numbers[sequence]
+    return groups
+
+
+def main():
+    names = level_names()
+
+    recursive = 0.0
+    labelled = 0.0
+    mismatches = []
+    for name in names:
+        room = grid.Room(name)
+
+        room._label_deathlock_components()
+        groups = {index: room.deathlock_components[index] for index, tile in deathlocks(room)}
+        if groups != recursive_groups(room):
+            mismatches.append(name)
+
+        recursive += _common.best_time(lambda: recursive_flood(room))
+        labelled += _common.best_time(room._label_deathlock_components)
+
+    count = len(names)
+    print("%i levels, ms per level" % count)
+    print("recursive flood fill      %.3f" % (recursive / count * 1000))
+    print("component labelling       %.3f" % (labelled / count * 1000))
+    if mismatches:
+        print("different groups on %s" % ", ".join(mismatches))
+    else:
+        print("same groups on every level")
+
+
+if __name__ == "__main__":
+    main()
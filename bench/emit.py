@@ -0,0 +1,67 @@
+"""Times keeping the emitted tiles of every level up to date.
+
+Run from anywhere with
+    python bench/emit.py
+
+Emitting every tile from scratch with unemit() and emit() is compared
+against editing a single space of an emitting room, which only re-emits
+the rays and zones that the space could affect.  Every space of every
+level is edited once, by clearing it and putting its tiles back.
+"""
+import os
+
+import _common
+
+import grid
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def reemit(room):
+    room.unemit()
+    room.emit()
+
+
+def edited_spaces(room):
+    """returns (col, row, tiles) for every space with tiles that can be
+    erased, along with the tiles to put back"""
+    spaces = []
+    for row in range(room.HEIGHT):
+        for col in range(room.WIDTH):
+            tiles = [tile for tile in room.tiles_at(col, row)
+                     if not tile.EMITTED and not tile.BIT & grid.UNERASABLE_MASK]
+            if tiles:
+                spaces.append((col, row, tiles))
+    return spaces
+
+
+def edit_space(room, col, row, tiles):
+    room.clear_point(col, row)
+    for tile in tiles:
+        room.add_tile(col, row, tile)
+
+
+def main():
+    names = level_names()
+
+    full = 0.0
+    edit = 0.0
+    edits = 0
+    for name in names:
+        room = grid.Room(name)
+        full += _common.best_time(lambda: reemit(room))
+
+        for col, row, tiles in edited_spaces(room):
+            edit += _common.best_time(lambda: edit_space(room, col, row, tiles))
+            edits += 1
+
+    print("%i levels, %i edited spaces" % (len(names), edits))
+    print("unemit() and emit(), ms per level    %.3f" % (full / len(names) * 1000))
+    print("editing one space, ms per edit       %.3f" % (edit / edits * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Times drawing every level flickering in.
+
+Run from anywhere with
+    python bench/flicker.py
+
+Room.draw_flicker() only redraws what changed since the last frame.  It's
+compared against drawing every frame from scratch.  "events" is the time
+taken to work out what changes on each frame, which happens once when the
+transition starts.
+"""
+import os
+import time
+
+import _common
+
+import pygame
+
+import assets
+import constants as const
+import camera
+import graphics
+import grid
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def draw_every_frame(room, surf, full_redraw):
+    """returns the total time and the time of the slowest frame"""
+    total = 0.0
+    slowest = 0.0
+    for frame in range(room.FLICKER_FRAMES):
+        if full_redraw:
+            room.version += 1
+            room.flicker_events()
+
+        start = time.perf_counter()
+        room.draw_flicker(surf, camera.zero_camera, frame)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        slowest = max(slowest, elapsed)
+    return total, slowest
+
+
+def main():
+    graphics.init()
+    assets.load_all()
+
+    surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+    names = level_names()
+
+    events = 0.0
+    full_frame = 0.0
+    full_slowest = 0.0
+    frame = 0.0
+    slowest = 0.0
+    for name in names:
+        room = grid.Room(name)
+
+        start = time.perf_counter()
+        room.flicker_events()
+        events += time.perf_counter() - start
+
+        total, level_slowest = draw_every_frame(room, surf, True)
+        full_frame += total
+        full_slowest = max(full_slowest, level_slowest)
+
+        room.version += 1
+        room.flicker_events()
+        total, level_slowest = draw_every_frame(room, surf, False)
+        frame += total
+        slowest = max(slowest, level_slowest)
+
+    frames = len(names) * grid.Room.FLICKER_FRAMES
+    print("%i levels, %i frames each" % (len(names), grid.Room.FLICKER_FRAMES))
+    print("events, ms per level          %.3f" % (events / len(names) * 1000))
+    print("from scratch, ms per frame    %.3f (slowest %.3f)"
+          % (full_frame / frames * 1000, full_slowest * 1000))
+    print("draw_flicker, ms per frame    %.3f (slowest %.3f)"
+          % (frame / frames * 1000, slowest * 1000))
+
+
+if __name__ == "__main__":
+    main()
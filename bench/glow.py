@@ -0,0 +1,68 @@
+"""Times building the static layer of every level.
+
+Run from anywhere with
+    python bench/glow.py
+
+Room.draw_glow() is compared against calling draw_glow_at() on every
+space, which is how it used to work.  "first draw" includes working out
+the room's glow blits, like the first draw after a level loads.
+"""
+import os
+
+import _common
+
+import pygame
+
+import assets
+import constants as const
+import camera
+import graphics
+import grid
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def draw_glow_per_space(room, surf):
+    room.glow_surf.fill(const.BLACK)
+    for row in range(room.HEIGHT):
+        for col in range(room.WIDTH):
+            room.draw_glow_at(room.glow_surf, col, row)
+    surf.blit(room.glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+
+
+def main():
+    graphics.init()
+    assets.load_all()
+
+    surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+    names = level_names()
+
+    per_space = 0.0
+    first_draw = 0.0
+    batched = 0.0
+    static = 0.0
+    for name in names:
+        room = grid.Room(name)
+        per_space += _common.best_time(lambda: draw_glow_per_space(room, surf))
+
+        def draw_first():
+            room.version += 1
+            room.draw_glow(surf)
+        first_draw += _common.best_time(draw_first)
+
+        batched += _common.best_time(lambda: room.draw_glow(surf))
+        static += _common.best_time(lambda: room.draw_static(surf, camera.zero_camera))
+
+    count = len(names)
+    print("%i levels, ms per level" % count)
+    print("draw_glow_at per space  %.3f" % (per_space / count * 1000))
+    print("draw_glow, first draw   %.3f" % (first_draw / count * 1000))
+    print("draw_glow               %.3f" % (batched / count * 1000))
+    print("draw_static             %.3f" % (static / count * 1000))
+
+
+if __name__ == "__main__":
+    main()
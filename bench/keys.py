@@ -0,0 +1,114 @@
+"""Times setting the keyboard state and asking keybinds about it.
+
+Run from anywhere with
+    python bench/keys.py
+
+Each frame gets a new state from headless.random_inputs(), and then every
+one of the player's keybinds is asked whether it's held and pressed,
+QUERIES times over, like the player's update does.  The lists of keys and
+loops over them that events used to have are compared against KeyState,
+whose answers each keybind works out once per frame.  Both are checked to
+give the same answers.
+"""
+import _common
+
+import headless
+import events
+import entities.player
+
+FRAMES = 20000
+QUERIES = 2
+
+_Player = entities.player.Player
+KEYBINDS = (_Player.left_key, _Player.right_key, _Player.jump_key,
+            _Player.respawn_key, _Player.hard_respawn_key, _Player.pause_key)
+
+
+class ListKeys:
+    """the lists of keys events.KeyHandler used to keep"""
+    def __init__(self):
+        self.held_keys = []
+        self.pressed_keys = []
+        self.released_keys = []
+
+    def is_held(self, key):
+        return key in self.held_keys
+
+
+class ListKeybind:
+    """how events.Keybind used to look through the lists"""
+    def __init__(self, keys, key_list):
+        self.keys = keys
+        self.list = key_list
+
+    @property
+    def is_held(self):
+        for key in self.list:
+            if self.keys.is_held(key):
+                return True
+        return False
+
+    @property
+    def is_pressed(self):
+        for key in self.list:
+            if key in self.keys.pressed_keys:
+                return True
+        return False
+
+
+def make_frames():
+    """returns (held, pressed, released) keys for every frame"""
+    inputs = headless.random_inputs(0)
+    frames = []
+    last_held = frozenset()
+    for _ in range(FRAMES):
+        held = frozenset(next(inputs))
+        frames.append((held, held - last_held, last_held - held))
+        last_held = held
+    return frames
+
+
+def run_lists(frames):
+    keys = ListKeys()
+    keybinds = [ListKeybind(keys, keybind.list) for keybind in KEYBINDS]
+
+    answers = []
+    for held, pressed, released in frames:
+        keys.held_keys = list(held)
+        keys.pressed_keys = list(pressed)
+        keys.released_keys = list(released)
+        for _ in range(QUERIES):
+            for keybind in keybinds:
+                answers.append((keybind.is_held, keybind.is_pressed))
+    return answers
+
+
+def run_states(frames):
+    answers = []
+    for held, pressed, released in frames:
+        events.set_state(held, pressed, released)
+        for _ in range(QUERIES):
+            for keybind in KEYBINDS:
+                answers.append((keybind.is_held, keybind.is_pressed))
+    return answers
+
+
+def main():
+    frames = make_frames()
+    same = run_lists(frames) == run_states(frames)
+
+    lists = _common.best_time(lambda: run_lists(frames))
+    states = _common.best_time(lambda: run_states(frames))
+
+    queries = QUERIES * len(KEYBINDS) * 2
+    print("%i frames, %i keybind queries a frame" % (FRAMES, queries))
+    print("lists of keys, us per frame   %.2f" % (lists / FRAMES * 1e6))
+    print("KeyState, us per frame        %.2f" % (states / FRAMES * 1e6))
+    if same:
+        print("same answers on every frame")
+    else:
+        print("different answers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Plays the soundtrack's fades through every level, and counts how many
+layers are decoded and mixed.
+
+Run from anywhere with
+    python bench/soundtrack.py
+
+Each level gets FRAMES_PER_LEVEL frames of the same fades that
+game.handle_music_fade() makes.  The game used to decode all seven layers
+up front and mix all of them the whole time, most of them silently.  Now
+only the audible layers are decoded and mixed, along with the track kept
+for a layer that fades back in.  Frames spent waiting for a layer to decode
+aren't counted.
+"""
+import time
+
+import _common
+
+import sound
+import sequences
+import soundtrack
+
+FRAMES_PER_LEVEL = 600
+LAYER_COUNT = 7
+
+
+def fade(layers, level_num):
+    """the fades game.handle_music_fade() makes each frame"""
+    if level_num >= sequences.music_changes[6]:
+        sound.lower_volume(layers[6], 0.005)
+
+    for i in range(len(layers) - 1):
+        if level_num >= sequences.music_changes[i]:
+            sound.lower_volume(layers[i], 0.005)
+            if level_num < sequences.music_changes[i + 1]:
+                sound.raise_volume(layers[i + 1], 0.02)
+
+    if level_num < sequences.TUTORIAL_TEXT_LEVEL:
+        sound.raise_volume(layers[0], 0.02)
+
+
+def decoded_bytes(tracks):
+    return sum(memoryview(track).nbytes for track in tracks)
+
+
+def main():
+    sound.init()
+
+    music = soundtrack.Soundtrack(["music%i" % x for x in range(1, LAYER_COUNT + 1)])
+    music.play()
+
+    frames = 0
+    playing = 0
+    most_playing = 0
+    most_bytes = 0
+    update_time = 0.0
+    slowest = 0.0
+    for level_num in range(len(sequences.level_names)):
+        for _ in range(FRAMES_PER_LEVEL):
+            fade(music.layers, level_num)
+
+            start = time.perf_counter()
+            music.update()
+            elapsed = time.perf_counter() - start
+            update_time += elapsed
+            slowest = max(slowest, elapsed)
+
+            # Waits for any layer that's still decoding, like the game
+            # would over the next few frames
+            while any(layer._decoding for layer in music.layers):
+                time.sleep(0.01)
+                start = time.perf_counter()
+                music.update()
+                slowest = max(slowest, time.perf_counter() - start)
+
+            layer_count = sum(layer.playing for layer in music.layers)
+            playing += layer_count
+            most_playing = max(most_playing, layer_count)
+            tracks = [layer.track for layer in music.layers if layer.track]
+            most_bytes = max(most_bytes, decoded_bytes(tracks + list(soundtrack._kept.values())))
+            frames += 1
+
+    track_bytes = decoded_bytes([soundtrack._decode("music1")])
+
+    print("%i levels, %i frames" % (len(sequences.level_names), frames))
+    print("                  before    after")
+    print("layers mixed      %6.2f  %7.2f  (average)" % (LAYER_COUNT, playing / frames))
+    print("layers mixed      %6i  %7i  (most at once)" % (LAYER_COUNT, most_playing))
+    print("decoded MB        %6.1f  %7.1f  (most at once)"
+          % (LAYER_COUNT * track_bytes / 1e6, most_bytes / 1e6))
+    print("update(), us per frame   %.1f (slowest %.1f)"
+          % (update_time / frames * 1e6, slowest * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Times starting the game, up to the splash screen and up to the menu.
+
+Run from anywhere with
+    python bench/startup.py
+
+Each start runs in a fresh process, since modules are only imported once.
+"import" imports every module game.py does, which doesn't load anything.
+"splash" opens the window and loads the splash screen, which is all that
+has to happen before the splash screen can be shown.  "the rest" loads the
+remaining images, fonts and animations, which the game spreads across the
+frames of the splash screen, and "sounds" decodes every sound, which the
+game does on a thread of its own.
+"""
+import json
+import subprocess
+import sys
+import time
+
+import _common
+
+PHASES = ("import", "splash", "the rest", "sounds")
+
+
+def start():
+    """starts the game the way game.py does, and returns the seconds each
+    phase took"""
+    times = {}
+
+    begin = time.perf_counter()
+    import pygame
+
+    import sound
+    import assets
+    import graphics
+    import debug
+    import splash
+    import menus
+    import sequences
+    import editor
+    import grid
+    import flicker
+    import punchers
+    import entities.player
+    times["import"] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    sound.init()
+    pygame.init()
+    graphics.init()
+    assets.load("splash")
+    times["splash"] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    assets.load_all()
+    times["the rest"] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for loaded_sound in sound.sounds:
+        loaded_sound.load()
+    times["sounds"] = time.perf_counter() - begin
+
+    return times
+
+
+def main():
+    best = {}
+    for _ in range(_common.REPEATS):
+        output = subprocess.check_output([sys.executable, __file__, "start"],
+                                         stderr=subprocess.DEVNULL)
+        times = json.loads(output.decode("utf-8").strip().split("\n")[-1])
+        for phase in PHASES:
+            best[phase] = min(best.get(phase, times[phase]), times[phase])
+
+    print("ms to start the game")
+    for phase in PHASES:
+        print("%-10s %8.1f" % (phase, best[phase] * 1000))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["start"]:
+        print(json.dumps(start()))
+    else:
+        main()
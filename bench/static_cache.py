@@ -0,0 +1,91 @@
+"""Times drawing the static level of every level from scratch and from
+render.StaticCache.
+
+Run from anywhere with
+    python bench/static_cache.py
+
+"scratch" is what happens the first time a room is drawn: the background
+and Room.draw_static().  "cache" is a room that's drawn the same way again,
+like restarting it or going back to the game from the editor without
+changing anything, which is a blit of the copy the cache kept.  Both are checked to give the
+same pixels.  Every level is then drawn twice over in order, to show how
+much of a pass over the levels fits in the cache's budget.
+"""
+import _common
+
+import pygame
+
+import assets
+import constants as const
+import camera
+import graphics
+import grid
+import render
+import sequences
+
+BUDGET = 32 * 1048576  # the same as game.STATIC_CACHE_BUDGET
+
+BACKGROUND_COLOR = (20, 20, 20)
+
+
+def draw_scratch(room, surf, background):
+    surf.fill(BACKGROUND_COLOR)
+    surf.blit(background, (0, 0))
+    room.draw_static(surf, camera.zero_camera)
+
+
+def key_of(room):
+    return (room.content_key(), room.emitting, None, False)
+
+
+def draw_cached(cache, room, surf, background):
+    key = key_of(room)
+    cached = cache.get(key)
+    if cached is not None:
+        surf.blit(cached, (0, 0))
+    else:
+        draw_scratch(room, surf, background)
+        cache.put(key, surf)
+
+
+def main():
+    graphics.init()
+    assets.load_all()
+    background = graphics.load_image("background", 1)
+
+    surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+    surf.set_colorkey(const.TRANSPARENT)
+    rooms = [grid.Room(name) for name in sequences.level_names]
+
+    same = True
+    scratch = 0.0
+    cached = 0.0
+    for room in rooms:
+        cache = render.StaticCache(BUDGET)
+        draw_cached(cache, room, surf, background)
+        surf.fill(const.BLACK)
+        draw_cached(cache, room, surf, background)
+        from_cache = pygame.image.tostring(surf, "RGB")
+        draw_scratch(room, surf, background)
+        same = same and from_cache == pygame.image.tostring(surf, "RGB")
+
+        scratch += _common.best_time(lambda: draw_scratch(room, surf, background))
+        cached += _common.best_time(lambda: draw_cached(cache, room, surf, background))
+
+    cache = render.StaticCache(BUDGET)
+    for _ in range(2):
+        for room in rooms:
+            draw_cached(cache, room, surf, background)
+
+    print("%i levels" % len(rooms))
+    print("scratch, ms per level   %.3f" % (scratch / len(rooms) * 1000))
+    print("cache, ms per level     %.3f" % (cached / len(rooms) * 1000))
+    print("two passes over every level: " + cache.report())
+    if same:
+        print("same pixels on every level")
+    else:
+        print("different pixels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Times loading, drawing and playing every level, for keeping track of how
+changes affect performance.
+
+Run from anywhere with
+    python bench/suite.py --output before.json
+    python bench/suite.py --baseline before.json
+
+For each level in sequences.level_names (or the levels given), it times:
+    load          grid.Room(name)
+    draw_static   Room.draw_static(), as after loading, with the glow
+                  worked out again
+    emit          Room.emit()
+    unemit        Room.unemit()
+    flicker       a whole transition of Room.draw_flicker(), including
+                  working out the flicker events
+    collide_stage Collision._collide_stage() for COLLIDE_FRAMES frames of
+                  the player moving with headless.random_inputs(0)
+
+Each time is the best of _common.REPEATS (EMIT_REPEATS for emit and
+unemit), in seconds.  --output writes them to a JSON file.  With
+--baseline, the totals are compared against a file written earlier, and
+any measurement whose total got more than --threshold slower makes it exit
+with an error.  Levels that got slower are listed, but don't count as a
+regression by themselves, since times that small are noisy.
+"""
+import argparse
+import json
+import sys
+import time
+
+import _common
+
+import pygame
+
+import assets
+import constants as const
+import camera
+import graphics
+import grid
+import headless
+import sequences
+
+EMIT_REPEATS = 50  # emitting takes so little time that it needs more tries
+COLLIDE_FRAMES = 600
+THRESHOLD = 0.1  # how much slower counts as a regression
+
+MEASUREMENTS = ("load", "draw_static", "emit", "unemit", "flicker", "collide_stage")
+
+
+def time_draw_static(room, surf):
+    # Changing the version makes the room work out its glow again, and is
+    # left out of the time
+    def change_version():
+        room.version += 1
+
+    return _common.best_time(lambda: room.draw_static(surf, camera.zero_camera),
+                             setup=change_version)
+
+
+def time_emit(room):
+    """returns the best times of emit() and unemit()"""
+    unemit = _common.best_time(room.unemit, EMIT_REPEATS, setup=room.emit)
+    emit = _common.best_time(room.emit, EMIT_REPEATS, setup=room.unemit)
+    return emit, unemit
+
+
+def time_flicker(room, surf):
+    def change_version():
+        room.version += 1
+
+    def flicker():
+        room.flicker_events()
+        for frame in range(room.FLICKER_FRAMES):
+            room.draw_flicker(surf, camera.zero_camera, frame)
+
+    return _common.best_time(flicker, setup=change_version)
+
+
+def time_collide_stage(name):
+    # The time is the sum of every _collide_stage() call, not of the run,
+    # so this can't be timed by _common.best_time()
+    best = None
+    for _ in range(_common.REPEATS):
+        simulation = headless.Simulation([name])
+        player = simulation.player
+        collide_stage = player._collide_stage
+        total = 0.0
+
+        def timed_collide_stage():
+            nonlocal total
+            start = time.perf_counter()
+            collide_stage()
+            total += time.perf_counter() - start
+
+        player._collide_stage = timed_collide_stage
+        simulation.run(headless.random_inputs(0), COLLIDE_FRAMES)
+        if best is None or total < best:
+            best = total
+    return best
+
+
+def measure(name, surf):
+    """returns the times of every measurement on a level"""
+    times = {"load": _common.best_time(lambda: grid.Room(name))}
+
+    room = grid.Room(name)
+    times["draw_static"] = time_draw_static(room, surf)
+    times["emit"], times["unemit"] = time_emit(room)
+    times["flicker"] = time_flicker(room, surf)
+    times["collide_stage"] = time_collide_stage(name)
+    return times
+
+
+def compare(results, baseline, threshold):
+    """prints how the results changed since the baseline, and returns
+    whether any total got more than threshold slower.  only levels that
+    both have times for are compared"""
+    names = [name for name in results["levels"] if name in baseline["levels"]]
+
+    regressed = False
+    print()
+    print("against the baseline, %i levels" % len(names))
+    print("%-16s %11s %11s  %7s" % ("", "before", "after", "change"))
+    for measurement in MEASUREMENTS:
+        before = sum(baseline["levels"][name].get(measurement, 0.0) for name in names)
+        after = sum(results["levels"][name][measurement] for name in names)
+        if not before:
+            continue
+        change = after / before - 1
+        if change > threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        else:
+            flag = ""
+        print("%-16s %8.2f ms %8.2f ms  %+6.1f%%%s"
+              % (measurement, before * 1000, after * 1000, change * 100, flag))
+
+    slower = []
+    for name in names:
+        for measurement in MEASUREMENTS:
+            before = baseline["levels"][name].get(measurement)
+            after = results["levels"][name][measurement]
+            if before and after / before - 1 > threshold:
+                slower.append("%s %s %+.1f%%" % (name, measurement, (after / before - 1) * 100))
+    if slower:
+        print("%i level measurements more than %i%% slower:"
+              % (len(slower), threshold * 100))
+        for line in slower:
+            print("    " + line)
+
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times every level.")
+    parser.add_argument("levels", nargs="*", help="names of the levels to time")
+    parser.add_argument("--output", help="JSON file to write the times to")
+    parser.add_argument("--baseline", help="JSON file of earlier times to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="how much slower a total can get, as a fraction")
+    args = parser.parse_args()
+
+    graphics.init()
+    assets.load_all()
+    surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+
+    level_names = args.levels or sequences.level_names
+    results = {"repeats": _common.REPEATS, "collide_frames": COLLIDE_FRAMES,
+               "levels": {}, "totals": dict.fromkeys(MEASUREMENTS, 0.0)}
+    for name in level_names:
+        times = measure(name, surf)
+        results["levels"][name] = times
+        for measurement in MEASUREMENTS:
+            results["totals"][measurement] += times[measurement]
+
+    print("%i levels, best of %i" % (len(level_names), _common.REPEATS))
+    print("%-16s %11s %11s" % ("", "total", "per level"))
+    for measurement in MEASUREMENTS:
+        total = results["totals"][measurement]
+        print("%-16s %8.2f ms %8.3f ms"
+              % (measurement, total * 1000, total / len(level_names) * 1000))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print("saved to %s" % args.output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Times trying every jump timing on a level, one headless.Simulation at a
+time and then with sweep.py.
+
+Run from anywhere with
+    python bench/sweep.py
+
+Every player holds right, and jumps on a frame of its own.  A Simulation
+loads the level again for each player, and can only play one player at a
+time.  sweep.py loads it once per process and plays the players side by
+side, in one process and then in a pool of one per CPU.  All three are
+checked to leave every player in the same place.
+"""
+import os
+
+import _common
+
+import headless
+import replay
+import sweep
+
+LEVEL = "PunchersMomentum1"
+FRAMES = 200
+REPEATS = 3
+
+HELD = replay.RIGHT
+TAPPED = replay.JUMP
+
+
+def run_simulations():
+    results = []
+    for tap_frame in range(FRAMES):
+        simulation = headless.Simulation([LEVEL])
+        for frame in range(FRAMES):
+            if simulation.level_frames:
+                break
+            if frame == tap_frame:
+                simulation.step(*replay.keys_of(HELD | TAPPED))
+            else:
+                simulation.step(*replay.keys_of(HELD))
+        results.append((simulation.frame, simulation.player.x, simulation.player.y))
+    return results
+
+
+def run_sweep(processes):
+    results = sweep.sweep(LEVEL, FRAMES, HELD, TAPPED, processes)
+    return [(result.frames, result.x, result.y) for result in results]
+
+
+def main():
+    processes = os.cpu_count()
+    expected = run_simulations()
+    same = run_sweep(1) == expected and run_sweep(processes) == expected
+    frames = sum(result[0] for result in expected)
+
+    simulations = _common.best_time(run_simulations, REPEATS)
+    batched = _common.best_time(lambda: run_sweep(1), REPEATS)
+    pooled = _common.best_time(lambda: run_sweep(processes), REPEATS)
+
+    print("%s, %i timings, %i frames simulated" % (LEVEL, FRAMES, frames))
+    print("                              frames/s")
+    print("one Simulation at a time      %8i" % (frames / simulations))
+    print("sweep, 1 process              %8i" % (frames / batched))
+    print("sweep, %2i processes           %8i" % (processes, frames / pooled))
+    if same:
+        print("same places for every player")
+    else:
+        print("different places")
+
+
+if __name__ == "__main__":
+    main()
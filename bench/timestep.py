@@ -0,0 +1,84 @@
+"""Plays back frames of different lengths through the timestep, and counts
+how many steps the game takes.
+
+Run from anywhere with
+    python bench/timestep.py
+
+Nothing is drawn.  Each frame takes however long its scenario says, on a
+clock that only moves when it's told to.  The game used to take one step
+every frame, so a frame that took too long slowed the game down.  The
+timestep takes however many steps are due, so the game keeps to const.FPS
+steps a second, and draws are dropped instead.
+"""
+import random
+
+import _common
+
+import constants as const
+import timestep
+
+SECONDS = 60
+
+
+class Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def steady(rng):
+    return 1 / const.FPS
+
+
+def slow_draws(rng):
+    """every tenth frame takes three times as long"""
+    if rng.random() < 0.1:
+        return 3 / const.FPS
+    return 1 / const.FPS
+
+
+def overloaded(rng):
+    """frames take up to twice as long as they should"""
+    return rng.uniform(1, 2) / const.FPS
+
+
+def hitches(rng):
+    """frames are fine, but now and then one takes half a second"""
+    if rng.random() < 0.005:
+        return 0.5
+    return 1 / const.FPS
+
+
+SCENARIOS = (steady, slow_draws, overloaded, hitches)
+
+
+def run(scenario):
+    rng = random.Random(0)
+    clock = Clock()
+    steps = timestep.Timestep(clock)
+    frames = 0
+    while clock.time < SECONDS:
+        # The frame's steps and draw take this long, and are then followed
+        # by the next frame
+        steps.advance()
+        clock.time += scenario(rng)
+        frames += 1
+    return frames, steps
+
+
+def main():
+    print("%i seconds at %i steps a second" % (SECONDS, const.FPS))
+    print("                 game speed   draws/s   caught up on   dropped steps")
+    print("                 before after")
+    for scenario in SCENARIOS:
+        frames, steps = run(scenario)
+        print("%-16s %5.2f  %5.2f  %7.1f   %12i   %13i"
+              % (scenario.__name__, frames / (SECONDS * const.FPS),
+                 steps.steps / (SECONDS * const.FPS), steps.frames / SECONDS,
+                 steps.catch_up_frames, steps.dropped_steps))
+
+
+if __name__ == "__main__":
+    main()
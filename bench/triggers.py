@@ -0,0 +1,94 @@
+"""Times the trigger checks the player makes each frame on every level.
+
+Run from anywhere with
+    python bench/triggers.py
+
+Each query makes the lookups of a frame: punch zones on three spaces in a
+row, and the checkpoint ray and goal zone on the middle one.
+Room.trigger_at() is compared against the has_tile() and get_tile() pairs
+that the player used to make, and both are checked to find the same tiles.
+"""
+import os
+import random
+
+import _common
+
+import grid
+
+QUERY_COUNT = 20000
+
+
+def level_names():
+    return sorted(name for name in os.listdir("levels")
+                  if "." not in name and os.path.isfile(grid.level_path(name)))
+
+
+def make_queries(seed):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(QUERY_COUNT):
+        col = rng.randint(-1, grid.Room.WIDTH)
+        row = rng.randint(-1, grid.Room.HEIGHT)
+        queries.append((col, row))
+    return queries
+
+
+def tile_lookups(room, col, row):
+    punch_zone = None
+    if room.has_tile(grid.PunchZone, col, row):
+        punch_zone = room.get_tile(grid.PunchZone, col, row)
+    if room.has_tile(grid.PunchZone, col - 1, row):
+        room.get_tile(grid.PunchZone, col - 1, row)
+    if room.has_tile(grid.PunchZone, col + 1, row):
+        room.get_tile(grid.PunchZone, col + 1, row)
+
+    ray = None
+    if room.has_tile(grid.CheckpointRay, col, row):
+        ray = room.get_tile(grid.CheckpointRay, col, row)
+
+    goal_zone = room.has_tile(grid.PlayerGoalZone, col, row)
+    return punch_zone, ray, goal_zone
+
+
+def trigger_lookups(room, col, row):
+    triggers = room.trigger_at(col, row)
+    room.trigger_at(col - 1, row)
+    room.trigger_at(col + 1, row)
+    return triggers.punch_zone, triggers.checkpoint_ray, triggers.goal_zone
+
+
+def run_lookups(room, lookups, queries):
+    for col, row in queries:
+        lookups(room, col, row)
+
+
+def main():
+    queries = make_queries(0)
+    names = level_names()
+
+    tiles = 0.0
+    triggers = 0.0
+    mismatches = []
+    for name in names:
+        room = grid.Room(name)
+
+        for col, row in queries:
+            if tile_lookups(room, col, row) != trigger_lookups(room, col, row):
+                mismatches.append(name)
+                break
+
+        tiles += _common.best_time(lambda: run_lookups(room, tile_lookups, queries))
+        triggers += _common.best_time(lambda: run_lookups(room, trigger_lookups, queries))
+
+    frames = len(names) * len(queries)
+    print("%i levels, %i frames of lookups" % (len(names), frames))
+    print("has_tile and get_tile, ns per frame    %.1f" % (tiles / frames * 1e9))
+    print("trigger_at, ns per frame               %.1f" % (triggers / frames * 1e9))
+    if mismatches:
+        print("different tiles on %s" % ", ".join(mismatches))
+    else:
+        print("same tiles on every level")
+
+
+if __name__ == "__main__":
+    main()
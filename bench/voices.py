@@ -0,0 +1,119 @@
+"""Times keeping track of the sounds each SoundSet is playing.
+
+Run from anywhere with
+    python bench/voices.py
+
+Every SoundSet the game makes is given a limit, and random sets are
+played each frame.  The voice scheduler is compared against the lists of
+durations that every set used to keep, which sound.update() counted down
+one by one each frame.  Both are checked to let the same sounds play.
+Only the bookkeeping is timed, so nothing is actually played.
+"""
+import random
+
+import _common
+
+import sound
+import menus
+import entities.player
+
+FRAMES = 20000
+PLAYS_PER_FRAME = 2
+
+
+class DurationList:
+    """the lists of durations SoundSet used to keep"""
+    def __init__(self, limit, sound_duration):
+        self.limit = limit
+        self.sound_duration = sound_duration
+        self.durations = []
+
+    def play(self):
+        if len(self.durations) >= self.limit:
+            return False
+
+        for duration in self.durations:
+            if duration > self.sound_duration - 2:
+                return False
+
+        self.durations.append(self.sound_duration)
+        return True
+
+    def update(self):
+        for i in reversed(range(len(self.durations))):
+            if self.durations[i] <= 0:
+                del self.durations[i]
+            else:
+                self.durations[i] -= 1
+
+
+def make_plays(seed):
+    rng = random.Random(seed)
+    return [[rng.randrange(len(sound.soundsets)) for _ in range(PLAYS_PER_FRAME)]
+            for _ in range(FRAMES)]
+
+
+def run_lists(lists, plays):
+    """returns whether each play was allowed"""
+    allowed = []
+    for frame_plays in plays:
+        for duration_list in lists:
+            duration_list.update()
+        for index in frame_plays:
+            allowed.append(lists[index].play())
+    return allowed
+
+
+def run_scheduler(plays):
+    sound.voices = sound.VoiceScheduler()
+    for soundset in sound.soundsets:
+        soundset.voices = 0
+        soundset.last_start = None
+
+    allowed = []
+    for frame_plays in plays:
+        sound.voices.update()
+        for index in frame_plays:
+            soundset = sound.soundsets[index]
+            voices = soundset.voices
+            soundset.play(0)
+            allowed.append(soundset.voices > voices)
+    return allowed
+
+
+def main():
+    # Nothing is played, only counted.  Sets only count sounds that got a
+    # channel, so one that's never used is handed out
+    channel = object()
+    sound.play = lambda played_sound, volume=1.0: channel
+
+    rng = random.Random(0)
+    limits = []
+    for soundset in sound.soundsets:
+        limit = rng.randint(1, 4)
+        sound_duration = rng.randint(5, 60)
+        soundset.set_sound_limit(limit, sound_duration)
+        limits.append((limit, sound_duration))
+
+    plays = make_plays(1)
+
+    def fresh_lists():
+        return [DurationList(limit, sound_duration) for limit, sound_duration in limits]
+
+    same = run_lists(fresh_lists(), plays) == run_scheduler(plays)
+
+    lists = _common.best_time(lambda: run_lists(fresh_lists(), plays))
+    scheduler = _common.best_time(lambda: run_scheduler(plays))
+
+    print("%i sound sets, %i frames, %i plays a frame"
+          % (len(sound.soundsets), FRAMES, PLAYS_PER_FRAME))
+    print("lists of durations, us per frame    %.2f" % (lists / FRAMES * 1e6))
+    print("voice scheduler, us per frame       %.2f" % (scheduler / FRAMES * 1e6))
+    if same:
+        print("same sounds played by both")
+    else:
+        print("different sounds played")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import pygame
 
+import assets
 import constants as const
 
-pygame.init()
 
-TAHOMA = pygame.font.SysFont("Tahoma", 10)
-TAHOMA_LARGE = pygame.font.SysFont("Tahoma", 24)
+@assets.loader
+def _load_fonts():
+    global TAHOMA, TAHOMA_LARGE
+    TAHOMA = pygame.font.SysFont("Tahoma", 10)
+    TAHOMA_LARGE = pygame.font.SysFont("Tahoma", 24)
+
 
 strings = []
 lines = []
@@ -18,21 +22,33 @@ def debug(*args):
     strings.append(string)
 
 
+def text(string):
+    """like debug(), but shows the string as it is instead of its repr"""
+    strings.append(string)
+
+
 def new_line(point1, point2, color=const.RED):
     lines.append((point1, point2, color))
 
 
 def draw(surface):
+    """returns the rects that were drawn to"""
+    rects = []
     for line in lines:
         x1 = line[0][0]
         y1 = line[0][1]
         x2 = line[1][0]
         y2 = line[1][1]
-        pygame.draw.line(surface, line[2], (x1, y1), (x2, y2), 1)
+        rects.append(pygame.draw.line(surface, line[2], (x1, y1), (x2, y2), 1))
+
+    # The profiler can be shown before the fonts would have loaded
+    if strings:
+        assets.load(__name__)
 
     for string_num, string in enumerate(strings):
         text = TAHOMA.render(string, False, (255, 255, 255), (0, 0, 0))
-        surface.blit(text, (10, string_num * 10 + 10))
+        rects.append(surface.blit(text, (10, string_num * 10 + 10)))
 
     strings.clear()
-    lines.clear()
\ No newline at end of file
+    lines.clear()
+    return rects
\ No newline at end of file
@@ -124,13 +124,14 @@ class Editor:
             if self._tile in basic_tiles:
                 self.level.add_rect(left, top, width, height, self._tile)
             elif self._tile == grid.PunchBox:
-                constructor = lambda: grid.PunchBox(self._direction)
+                constructor = lambda: grid.PunchBox(self._direction, self.level.random)
                 self.level.add_rect(left, top, width, height, constructor)
 
             # These tiles shouldn't/can't be placed in a rect, so they are
             # placed as a single tile at the mouse's current position instead
             elif self._tile == grid.Checkpoint:
-                tile = grid.Checkpoint(self._direction, current_col, current_row)
+                tile = grid.Checkpoint(self._direction, current_col, current_row,
+                                       self.level.random)
                 self.level.add_tile(current_col, current_row, tile)
             elif self._tile == grid.PlayerSpawn:
                 self.level.move_player_spawn(current_col, current_row)
@@ -239,13 +239,13 @@ class Collision(KinematicsPoint):
         return self.level.collide_horiz(x1, x2, y, self.collide_deathlock)
 
     def draw_gridbox(self, surface, cam, color=const.RED):
-        pygame.draw.rect(surface, color, cam.move_rect(self._gridbox))
+        return pygame.draw.rect(surface, color, cam.move_rect(self._gridbox))
 
     def draw_hitbox(self, surface, cam, color=const.BLUE):
-        pygame.draw.rect(surface, color, cam.move_rect(self._hitbox))
+        return pygame.draw.rect(surface, color, cam.move_rect(self._hitbox))
 
     def draw(self, surface, cam):
-        self.draw_gridbox(surface, cam)
+        return self.draw_gridbox(surface, cam)
 
 
 class GravityCollision(Collision):
@@ -323,8 +323,9 @@ class PunchableGravityCollision(GravityCollision):
             center_col = grid.col_at(self.center_x)
             center_row = grid.row_at(self.center_y)
 
-            if self.level.has_tile(grid.PunchZone, center_col, center_row):
-                self._activate_punch_zone(center_col, center_row)
+            punch_zone = self.level.trigger_at(center_col, center_row).punch_zone
+            if punch_zone:
+                self._activate_punch_zone(center_col, center_row, punch_zone)
                 return
 
             # Only do special upwards puncher checks if player isn't moving up
@@ -335,23 +336,20 @@ class PunchableGravityCollision(GravityCollision):
                 # sometimes see the player stand for a moment on the very edge of an
                 # upwards puncher
                 left_col = grid.col_at(self.x + 2)
-                if self.level.has_tile(grid.PunchZone, left_col, center_row):
-                    tile = self.level.get_tile(grid.PunchZone, left_col, center_row)
-                    if tile.direction == const.UP:
-                        self._activate_punch_zone(left_col, center_row)
-                        return
+                punch_zone = self.level.trigger_at(left_col, center_row).punch_zone
+                if punch_zone and punch_zone.direction == const.UP:
+                    self._activate_punch_zone(left_col, center_row, punch_zone)
+                    return
 
                 right_col = grid.col_at(self.x + self._width - 3)
-                if self.level.has_tile(grid.PunchZone, right_col, center_row):
-                    tile = self.level.get_tile(grid.PunchZone, right_col, center_row)
-                    if tile.direction == const.UP:
-                        self._activate_punch_zone(right_col, center_row)
+                punch_zone = self.level.trigger_at(right_col, center_row).punch_zone
+                if punch_zone and punch_zone.direction == const.UP:
+                    self._activate_punch_zone(right_col, center_row, punch_zone)
 
         elif self.invuln_frames:
             self.invuln_frames -= 1
 
-    def _activate_punch_zone(self, col, row):
-        tile = self.level.get_tile(grid.PunchZone, col, row)
+    def _activate_punch_zone(self, col, row, tile):
         if tile.direction == const.LEFT:
             self._get_hit()
             punchers.add(col, row, const.LEFT)
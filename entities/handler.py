@@ -6,6 +6,17 @@ class Handler:
         for entity in self.list:
             entity.update()
 
+    def animate_all(self):
+        """moves every entity's animation on by a frame, even while they
+        aren't being updated"""
+        for entity in self.list:
+            entity.animate()
+
     def draw_all(self, surface, camera):
+        """returns the rects that were drawn to"""
+        rects = []
         for entity in self.list:
-            entity.draw(surface, camera)
+            rect = entity.draw(surface, camera)
+            if rect:
+                rects.append(rect)
+        return rects
@@ -156,18 +156,14 @@ class Player(collision.PunchableGravityCollision):
 
     HEART_SHEET = graphics.AnimSheet((MIDDLE_HEART, LEFT_HEART, RIGHT_HEART))
 
-    MIDDLE_HEART_X = (const.SCRN_W - MIDDLE_HEART.frame_w) // 2
-    HEART_X = [MIDDLE_HEART_X, MIDDLE_HEART_X - 50, MIDDLE_HEART_X + 50]
-    HEART_Y = -3
-
     # Sounds
-    RUN_SOUNDS = sound.load_numbers("run%i", 7)
+    RUN_SOUNDS = sound.load_numbers("run%i", 7, priority=sound.LOW_PRIORITY)
     RUN_SOUNDS.set_volumes(0.3)
 
-    WALL_PUSH_SOUNDS = sound.load_numbers("run%i", 7)
+    WALL_PUSH_SOUNDS = sound.load_numbers("run%i", 7, priority=sound.LOW_PRIORITY)
     WALL_PUSH_SOUNDS.set_volumes(0.35)
 
-    REVIVE_SOUNDS = sound.load_numbers("revive%i", 3)
+    REVIVE_SOUNDS = sound.load_numbers("revive%i", 3, priority=sound.HIGH_PRIORITY)
     REVIVE_SOUNDS.set_volumes(0.87)
 
     HIT_SOUNDS = sound.load_numbers("hit%i", 5)
@@ -177,10 +173,11 @@ class Player(collision.PunchableGravityCollision):
     JUMP_SOUNDS = sound.load_numbers("jump%i", 3)
     JUMP_SOUNDS.set_volumes(0.35)
 
-    LAND_SOUNDS = sound.load_numbers("run%i", 7)
+    LAND_SOUNDS = sound.load_numbers("run%i", 7, priority=sound.LOW_PRIORITY)
     LAND_SOUNDS.set_volumes(0.42)
 
-    CHECKPOINT_CHANGE_SOUNDS = sound.load_numbers("checkpoint_change%i", 3)
+    CHECKPOINT_CHANGE_SOUNDS = sound.load_numbers("checkpoint_change%i", 3,
+                                                priority=sound.HIGH_PRIORITY)
     CHECKPOINT_CHANGE_SOUNDS.set_volumes(0.32)
 
     def __init__(self, level, camera):
@@ -268,15 +265,34 @@ class Player(collision.PunchableGravityCollision):
         else:
             self.dead = False
 
-    def draw(self, surf, cam):
+    def get_state(self):
+        """returns everything about the player that physics can change, for
+        putting back later with set_state().  the animation is left out,
+        since it never changes how the player moves"""
+        return (self._x, self._y, self.x_vel, self.y_vel, self.x_acc, self.y_acc,
+                self._x_dir, self._y_dir, self.puncher_x_vel, self.invuln_frames,
+                self._health, self.checkpoint, self._coyote_timer, self._jump_buffer,
+                self._horizontal_punch_buffer, self._horizontal_punch_direction)
+
+    def set_state(self, state):
+        (x, y, self.x_vel, self.y_vel, self.x_acc, self.y_acc,
+         self._x_dir, self._y_dir, self.puncher_x_vel, self.invuln_frames,
+         health, self.checkpoint, self._coyote_timer, self._jump_buffer,
+         self._horizontal_punch_buffer, self._horizontal_punch_direction) = state
+        self.x = x
+        self.y = y
+        self.health = health
+
+    def animate(self):
         self.sprite.update()
 
+    def draw(self, surf, cam):
         if self.hidden:
-            return
+            return None
 
         x = self._gridbox.x - cam.x
         y = self._gridbox.y - cam.y
-        self.sprite.draw_frame(surf, x, y)
+        return self.sprite.draw_frame(surf, x, y)
 
     def update(self):
         self.collide_deathlock = not self.dead
@@ -700,10 +716,9 @@ class Player(collision.PunchableGravityCollision):
             self.unpush_frames = self.MAX_UNPUSH_FRAME
             self._update_wall_push_success_flag = False
 
-    def _activate_punch_zone(self, col, row):
+    def _activate_punch_zone(self, col, row, tile):
         # Exactly the same as the parent method, except _horizontal_punch_buffer
         # is updated when punched horizontally
-        tile = self.level.get_tile(grid.PunchZone, col, row)
         if tile.direction == const.LEFT:
             self._get_hit()
             punchers.add(col, row, const.LEFT)
@@ -747,9 +762,8 @@ class Player(collision.PunchableGravityCollision):
     def _collide_checkpoints(self):
         col = grid.col_at(self.center_x)
         row = grid.row_at(self.center_y)
-        if self.level.has_tile(grid.CheckpointRay, col, row):
-            ray = self.level.get_tile(grid.CheckpointRay, col, row)
-
+        ray = self.level.trigger_at(col, row).checkpoint_ray
+        if ray:
             if not (ray.checkpoint is self.checkpoint):
                 self._deactivate_checkpoint()
                 ray.checkpoint.active = True
@@ -784,4 +798,4 @@ class Player(collision.PunchableGravityCollision):
     def touching_goal(self):
         col = grid.col_at(self.center_x)
         row = grid.row_at(self.center_y)
-        return self.level.has_tile(grid.PlayerGoalZone, col, row)
+        return self.level.trigger_at(col, row).goal_zone
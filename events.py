@@ -1,36 +1,74 @@
 import pygame
 
-pygame.init()
-
 
 number_keys = [pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_5,
                pygame.K_6, pygame.K_7, pygame.K_8, pygame.K_9, pygame.K_0]
 
 
+class KeyState:
+    """The keyboard on one frame.  It never changes once it's made, so it
+    can be kept around, compared, and stored in replays with as_tuple()."""
+    def __init__(self, held=(), pressed=(), released=()):
+        self.held = frozenset(held)
+        self.pressed = frozenset(pressed)
+        self.released = frozenset(released)
+
+        # The menus rebind to whichever key was pressed first
+        self.pressed_order = tuple(dict.fromkeys(pressed))
+
+    def as_tuple(self):
+        """returns (held, pressed, released), which KeyState() takes back"""
+        return tuple(sorted(self.held)), self.pressed_order, tuple(sorted(self.released))
+
+    def __eq__(self, other):
+        return isinstance(other, KeyState) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return "KeyState%r" % (self.as_tuple(),)
+
+
 class Keybind:
-    def __init__(self, key_list):
+    """Any of a list of keys.  Whether it's held, pressed or released is
+    worked out once per KeyState, the first time it's asked for.
+
+    It reads the keyboard, unless it's given a KeyHandler of its own."""
+    def __init__(self, key_list, handler=None):
         self.list = key_list
+        self.handler = handler or keys
+
+    @property
+    def list(self):
+        return self._list
+
+    @list.setter
+    def list(self, key_list):
+        self._list = key_list
+        self._state = None  # the KeyState the flags below are for
+
+    def _update(self):
+        state = self.handler.state
+        self._state = state
+        self._held = not state.held.isdisjoint(self._list)
+        self._pressed = not state.pressed.isdisjoint(self._list)
+        self._released = not state.released.isdisjoint(self._list)
 
     @property
     def is_held(self):
-        for key in self.list:
-            if keys.is_held(key):
-                return True
-        return False
+        if self._state is not self.handler.state:
+            self._update()
+        return self._held
 
     @property
     def is_pressed(self):
-        for key in self.list:
-            if key in keys.pressed_keys:
-                return True
-        return False
+        if self._state is not self.handler.state:
+            self._update()
+        return self._pressed
 
     @property
     def is_released(self):
-        for key in self.list:
-            if key in keys.released_keys:
-                return True
-        return False
+        if self._state is not self.handler.state:
+            self._update()
+        return self._released
 
 
 class MouseHandler:
@@ -45,16 +83,38 @@ class MouseHandler:
 
 
 class KeyHandler:
+    """Holds the KeyState of the current frame.  A new one is made every
+    frame, even if nothing changed."""
     def __init__(self):
-        self.held = False
-        self.held_keys = []
-        self.pressed = False
-        self.pressed_keys = []
-        self.released = False
-        self.released_keys = []
+        self.state = KeyState()
+
+    @property
+    def held(self):
+        return bool(self.state.held)
+
+    @property
+    def pressed(self):
+        return bool(self.state.pressed)
+
+    @property
+    def released(self):
+        return bool(self.state.released)
+
+    @property
+    def held_keys(self):
+        return self.state.held
+
+    @property
+    def pressed_keys(self):
+        """the keys pressed this frame, in the order they were pressed"""
+        return self.state.pressed_order
+
+    @property
+    def released_keys(self):
+        return self.state.released
 
     def is_held(self, key):
-        return key in self.held_keys
+        return key in self.state.held
 
 
 quit_program = False
@@ -68,10 +128,9 @@ def update():
     mouse.position = pygame.mouse.get_pos()
     mouse.relative = pygame.mouse.get_rel()
 
-    keys.released = False
-    keys.released_keys = []
-    keys.pressed = False
-    keys.pressed_keys = []
+    held_keys = set(keys.state.held)
+    pressed_keys = []
+    released_keys = []
 
     for event in pygame.event.get():
         if mouse.release_lock:
@@ -88,20 +147,26 @@ def update():
             mouse.release_lock = True
 
         elif event.type == pygame.KEYDOWN:
-            keys.held_keys.append(event.key)
-            keys.pressed = True
-            keys.pressed_keys.append(event.key)
+            held_keys.add(event.key)
+            pressed_keys.append(event.key)
 
         elif event.type == pygame.KEYUP:
-            keys.held_keys.remove(event.key)
-
-            keys.released = True
-            keys.released_keys.append(event.key)
+            # A key can come up without having gone down, such as when it
+            # was held as the window opened
+            held_keys.discard(event.key)
+            released_keys.append(event.key)
 
         elif event.type == pygame.QUIT:
             quit_program = True
 
-    keys.held = len(keys.held_keys) > 0
+    keys.state = KeyState(held_keys, pressed_keys, released_keys)
+
+
+def set_state(held_keys, pressed_keys=(), released_keys=()):
+    """Sets the keyboard state directly instead of reading pygame's events.
+
+    Used to drive the game without a keyboard, such as in headless.py."""
+    keys.state = KeyState(held_keys, pressed_keys, released_keys)
 
 
 mouse = MouseHandler()
@@ -69,8 +69,8 @@ class FlickerSequence:
     _SEQUENCE_LISTS = [_make_sequence_list(seq) for seq in _SEQUENCE_OUTLINES]
     SEQUENCE_LENGTH = len(_SEQUENCE_LISTS[0])
 
-    def __init__(self):
-        self.sequence_list = random.choice(self._SEQUENCE_LISTS)
+    def __init__(self, rng=random):
+        self.sequence_list = rng.choice(self._SEQUENCE_LISTS)
 
     def brightness(self, frame):
         if frame < 0:
@@ -86,7 +86,8 @@ STOP_FLICKERING_FRAME = START_DELAY + FlickerSequence.SEQUENCE_LENGTH
 TOTAL_LENGTH = START_DELAY + FlickerSequence.SEQUENCE_LENGTH + END_DELAY
 
 SOUND_COUNT = 6
-turn_on_sounds = [sound.load("flicker_on") for _ in range(SOUND_COUNT)]
+turn_on_sounds = [sound.load("flicker_on", sound.AMBIENCE, sound.LOW_PRIORITY)
+                  for _ in range(SOUND_COUNT)]
 
 
 def mute_sounds():
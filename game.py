@@ -20,31 +20,50 @@ import entities.player
 import entities.handler
 
 import punchers
+import replay
+import profiler
+import render
+import soundtrack
+import assets
+import atlas
+import timestep
 
 
 # INITIALIZATION
+sound.init()
 pygame.init()
-main_surf = pygame.display.set_mode((const.SCRN_W, const.SCRN_H))
+main_surf = graphics.init()
 pygame.display.set_caption("deathlock")
 pygame.display.set_icon(pygame.image.load(os.path.join("images", "icon.png")))
 
 clock = pygame.time.Clock()
+renderer = render.DirtyRenderer(main_surf)
 
 
-goal_light_activate = sound.load_numbers("level_start%i", 3)
+goal_light_activate = sound.load_numbers("level_start%i", 3, priority=sound.HIGH_PRIORITY)
 goal_light_activate.set_volumes(0.14)
 
-hum = sound.load("hum")
+hum = sound.load("hum", sound.AMBIENCE, sound.HIGH_PRIORITY)
 MAX_HUM_VOLUME = 1.0
 hum.set_volume(0)
 hum.play(-1)
 
-music = [sound.load("music%i" % x) for x in range(1, 8)]
-for m in music:
-    m.set_volume(0)
+music = soundtrack.Soundtrack(["music%i" % x for x in range(1, 8)])
 
-background = graphics.load_image("background", 1)
-player_glow = graphics.load_image("player_gradient", 1)
+
+@assets.loader
+def _load_images():
+    global background, player_glow
+    background = graphics.load_image("background", 1)
+    player_glow = graphics.load_blend_image("player_gradient", 1)
+
+
+# Only the splash screen is loaded before it's shown.  Everything else
+# loads while it plays, SPLASH_LOAD_TIME seconds of it each frame, and the
+# sounds load on a thread of their own.
+SPLASH_LOAD_TIME = 0.008
+assets.load("splash")
+sound.preload()
 
 
 def draw_background(surf):
@@ -52,52 +71,13 @@ def draw_background(surf):
     surf.blit(background, (0, 0))
 
 
-def screen_update(fps):
-    pygame.display.flip()
-    main_surf.fill(const.BLACK)
-    clock.tick(fps)
-
-
-def levels_with_number(shared_name, first, last):
-    """Returns a list of levels with increasing numbers attached.
-
-    levels_with_number("Intro", 2, 5) returns the list
-    ["Intro2", "Intro3", "Intro4", "Intro5"]
-    """
-    shared_name += "%i"
-    return [shared_name % x for x in range(first, last + 1)]
-
-
-level_names = (
-    levels_with_number("Intro", 1, 4) +
-
-    levels_with_number("PunchersIntro", 1, 5) +
-    levels_with_number("PunchersMomentum", 1, 6) +
-    ["PuncherParkour"] +
-    levels_with_number("RespawnMomentum", 1, 6) +
-    levels_with_number("FallPunch", 1, 2) +
-    ["RespawnPuzzle"] +
-
-    levels_with_number("CheckpointsIntro", 1, 3) +
-    ["CheckpointTiming"] +
-    levels_with_number("CheckpointsMomentum", 1, 4) +
-    ["CheckpointsClimb", "Teleport1", "TeleportDown", "SpamRespawn",
-     "SpamRespawnFall", "LaserMaze", "EarlyJump"] +
-    levels_with_number("Escalator", 1, 3) +
-
-    levels_with_number("DeathlockIntro", 1, 4) +
-    ["DeathlockTiming"] +
-    levels_with_number("DeathlockMomentum", 1, 5) +
-    ["DeathlockBlock"] +
-    ["DeadMansTrampoline", "DeadMansRightPuncher", "AvoidTheFirst"] +
-    levels_with_number("Pole", 1, 2) +
-    levels_with_number("DoubleFallPunch", 1, 2) +
-    levels_with_number("Ledge", 1, 2) +
-    ["DeathlockHeadBonk", "DoubleTriple", "EverythingClimb"] +
-    levels_with_number("Haul", 1, 4) +
-    ["DoublePunchHaul", "CheckpointHaul", "BackAndForthHaul", "UsefulSpawnHaul"] +
-    levels_with_number("End", 1, 6)
-)
+def screen_update():
+    with profiler.phase("display.flip"):
+        renderer.present()
+    clock.tick()
+
+
+level_names = sequences.level_names
 sequence = sequences.Sequence(level_names)
 
 editor = editor.Editor(sequence)
@@ -106,6 +86,10 @@ SWAP_TO_EDITOR = 0
 NEXT_LEVEL = 1
 level_beat_mode = NEXT_LEVEL
 
+# Saves a replay to the replays folder whenever a level is beaten
+RECORD_REPLAYS = False
+recorder = replay.Recorder(RECORD_REPLAYS)
+
 main_cam = camera.Camera()
 main_cam.base_x = 0
 main_cam.base_y = 0
@@ -117,13 +101,84 @@ entity_handler.list = [player]
 
 static_level_surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
 static_level_surf.set_colorkey(const.TRANSPARENT)
-draw_background(static_level_surf)
-sequence.current.draw_static(static_level_surf, main_cam)
+
+# Fully drawn static levels, for when a room is drawn the same way again,
+# like dying again at the same checkpoint or restarting a level
+STATIC_CACHE_BUDGET = 32 * 1048576  # bytes, about eight layers
+static_cache = render.StaticCache(STATIC_CACHE_BUDGET)
+
+
+def static_level_key():
+    """returns what static_level_surf is drawn from: the room, the
+    checkpoint and whether the player is dead"""
+    room = sequence.current
+    if player.checkpoint:
+        checkpoint = (player.checkpoint.col, player.checkpoint.row)
+    else:
+        checkpoint = None
+    return room.content_key(), room.emitting, checkpoint, player.dead
+
+
+def draw_static_level():
+    """draws static_level_surf from scratch, or blits it from static_cache
+    if the room has been drawn like this before"""
+    key = static_level_key()
+    surf = static_cache.get(key)
+    if surf is not None:
+        static_level_surf.blit(surf, (0, 0))
+        return
+
+    room = sequence.current
+    draw_background(static_level_surf)
+    room.draw_static(static_level_surf, camera.zero_camera)
+    if player.dead:
+        room.draw_deathlock(static_level_surf, camera.zero_camera, True)
+    static_cache.put(key, static_level_surf)
+
+
+def update_static_level():
+    """brings static_level_surf up to date after the checkpoint changes or
+    the player dies or respawns.  only what changed is drawn, unless
+    static_cache has the whole thing"""
+    key = static_level_key()
+    surf = static_cache.get(key)
+    if surf is not None:
+        static_level_surf.blit(surf, (0, 0))
+        return
+
+    room = sequence.current
+    if player.checkpoint_swapped:
+        if player.checkpoint:
+            room.draw_checkpoint_and_ray(static_level_surf, player.checkpoint)
+        if player.prev_frame_checkpoint:
+            room.draw_checkpoint_and_ray(static_level_surf, player.prev_frame_checkpoint)
+
+    if player.just_respawned or player.just_died:
+        room.draw_deathlock(static_level_surf, camera.zero_camera, player.dead)
+    static_cache.put(key, static_level_surf)
+
+
+def finish_loading():
+    """loads whatever the splash screen didn't get to"""
+    assets.load_all()
+
+    # Every animation column has been built by now
+    atlas.save()
+
+    draw_static_level()
+
+    # The time spent loading isn't part of the game
+    steps.reset()
+
 
 # sound.play_music()
 
 
 editor_key = events.Keybind([pygame.K_e])
+profiler_key = events.Keybind([pygame.K_F3])
+profiler_trace_key = events.Keybind([pygame.K_F4])
+PROFILER_PHASES = ("events.update", "update_all", "punchers.update", "draw_level",
+                   "draw_dynamic", "draw_ui", "display.flip")
 
 main_menu = menus.MainMenu()
 pause_menu = menus.PauseMenu(player)
@@ -142,6 +197,9 @@ PAUSE = 4
 CREDITS = 5
 state = SPLASH_SCREEN
 
+# The game is stepped at const.FPS, and drawn after however many steps are due
+steps = timestep.Timestep()
+
 
 def hard_reset():
     player.hard_respawn()
@@ -149,8 +207,11 @@ def hard_reset():
 
 def game_update():
     if not sequence.transitioning:
-        entity_handler.update_all()
-        punchers.update()
+        recorder.record()
+        with profiler.phase("update_all"):
+            entity_handler.update_all()
+        with profiler.phase("punchers.update"):
+            punchers.update()
 
     main_cam.update()
 
@@ -170,6 +231,7 @@ def game_update():
         if level_beat_mode == SWAP_TO_EDITOR:
             swap_to_editor()
         elif level_beat_mode == NEXT_LEVEL:
+            recorder.finish(player)
             if sequence.level_num == len(level_names) - 1:
                 sequence.start_credits = True
                 save_level = 80
@@ -185,77 +247,85 @@ def game_update():
     #     hum.set_volume(min(MAX_HUM_VOLUME, hum.get_volume() + 0.02))
     sequence.current.update_goal_sound(player, sequence.transitioning)
 
+    update_level()
+    handle_music_fade()
+    entity_handler.animate_all()
 
-def draw_level():
+
+def update_level():
+    """keeps the static level and the flicker sounds up to date.  frames
+    aren't always drawn, so this is done every step instead of on draw"""
     if sequence.transitioning:
         if sequence.frame >= flicker.STOP_FLICKERING_FRAME:
             if sequence.frame == flicker.STOP_FLICKERING_FRAME:
-                static_level_surf.fill(const.BLACK)
-                sequence.next.draw_flicker_glow(static_level_surf, 1000)
-                sequence.next.draw_silhouette(static_level_surf)
-                sequence.next.draw_flicker_tiles(static_level_surf, main_cam, 1000)
-            main_surf.blit(static_level_surf, (int(-main_cam.x), int(-main_cam.y)))
+                frame = sequence.frame - flicker.START_DELAY
+                sequence.next.draw_flicker(static_level_surf, main_cam, frame)
 
             flicker.mute_sounds()
 
         elif sequence.frame >= flicker.START_DELAY:
-            frame = sequence.frame - flicker.START_DELAY
-            sequence.next.draw_flicker_glow(main_surf, frame)
+            adjust_flicker_volumes(sequence.frame - flicker.START_DELAY)
+    else:
+        checkpoint_changed = player.checkpoint_swapped and \
+            (player.checkpoint or player.prev_frame_checkpoint)
 
-            main_surf.blit(static_level_surf, (int(-main_cam.x), int(-main_cam.y)))
+        # Changes to the static level mean the whole screen has to be redrawn
+        if checkpoint_changed or player.just_respawned or player.just_died:
+            update_static_level()
+            renderer.redraw_all()
 
-            sequence.next.draw_flicker_tiles(main_surf, main_cam, frame)
+        sequence.update_hard_respawn_popup(player)
 
-            adjust_flicker_volumes(frame)
 
-        sequence.draw_flicker_ui(main_surf, main_cam)
-    else:
-        if player.checkpoint_swapped:
-            if player.checkpoint:
-                sequence.current.draw_checkpoint_and_ray(static_level_surf, player.checkpoint)
-            if player.prev_frame_checkpoint:
-                sequence.current.draw_checkpoint_and_ray(static_level_surf, player.prev_frame_checkpoint)
+def draw_level():
+    if sequence.transitioning:
+        renderer.clear()
+        if sequence.frame >= flicker.STOP_FLICKERING_FRAME:
+            main_surf.blit(static_level_surf, (int(-main_cam.x), int(-main_cam.y)))
 
-        if player.just_respawned or player.just_died:
-            sequence.current.draw_deathlock(static_level_surf, camera.zero_camera, player.dead)
+        elif sequence.frame >= flicker.START_DELAY:
+            frame = sequence.frame - flicker.START_DELAY
+            sequence.next.draw_flicker(main_surf, main_cam, frame)
 
-        main_surf.blit(static_level_surf, (int(-main_cam.x), int(-main_cam.y)))
-        punchers.draw(main_surf, main_cam)
-        sequence.current.draw_dynamic(main_surf, main_cam,
-                                      player.dead, player.checkpoint is None)
+        sequence.draw_flicker_ui(main_surf, main_cam)
+    else:
+        renderer.draw_static(static_level_surf, main_cam)
+        renderer.add_all(punchers.draw(main_surf, main_cam))
+        with profiler.phase("draw_dynamic"):
+            renderer.add_all(sequence.current.draw_dynamic(main_surf, main_cam,
+                                                           player.dead, player.checkpoint is None))
 
         x = grid.x_of(sequence.current.player_goal.col) - grid.TILE_W * 2 - main_cam.x
         y = grid.y_of(sequence.current.player_goal.row) - grid.TILE_H * 2 - main_cam.y
-        main_surf.blit(grid.player_goal_glow, (x, y), special_flags=pygame.BLEND_ADD)
+        renderer.add(main_surf.blit(grid.player_goal_glow, (x, y), special_flags=pygame.BLEND_ADD))
 
         glow_x = int(player.center_x - player_glow.get_width() / 2) - main_cam.x
         glow_y = int(player.center_y - player_glow.get_height() / 2) - main_cam.y
 
-        main_surf.blit(player_glow, (glow_x, glow_y), special_flags=pygame.BLEND_ADD)
+        renderer.add(main_surf.blit(player_glow, (glow_x, glow_y), special_flags=pygame.BLEND_ADD))
 
-        sequence.draw_ui(main_surf, main_cam, player)
-
-    handle_music_fade()
+        with profiler.phase("draw_ui"):
+            renderer.add_all(sequence.draw_ui(main_surf, main_cam, player))
 
 
 def handle_music_fade():
+    layers = music.layers
     if sequence.level_num >= sequences.music_changes[6]:
-        sound.lower_volume(music[6], 0.005)
+        sound.lower_volume(layers[6], 0.005)
 
-    for i in range(len(music) - 1):
+    for i in range(len(layers) - 1):
         if sequence.level_num >= sequences.music_changes[i]:
-            sound.lower_volume(music[i], 0.005)
+            sound.lower_volume(layers[i], 0.005)
             if sequence.level_num < sequences.music_changes[i + 1]:
-                sound.raise_volume(music[i + 1], 0.02)
+                sound.raise_volume(layers[i + 1], 0.02)
 
     if sequence.level_num < sequences.TUTORIAL_TEXT_LEVEL:
-        sound.raise_volume(music[0], 0.02)
+        sound.raise_volume(layers[0], 0.02)
 
     # Plays the first song after the first level flickers in
     if sequence.intro_transition_flag and not sequence.transitioning:
         sequence.intro_transition_flag = False
-        for m in music:
-            m.play(-1)
+        music.play()
 
 
 def adjust_flicker_volumes(frame):
@@ -275,9 +345,10 @@ def adjust_flicker_volumes(frame):
 
 
 def game_draw():
-    draw_level()
+    with profiler.phase("draw_level"):
+        draw_level()
 
-    entity_handler.draw_all(main_surf, main_cam)
+    renderer.add_all(entity_handler.draw_all(main_surf, main_cam))
 
 
 def editor_update():
@@ -296,7 +367,7 @@ def editor_draw():
 def swap_to_editor():
     global state
     state = EDITOR
-    sequence.current.unemit()
+    recorder.cancel()
 
 
 def swap_to_game():
@@ -304,32 +375,43 @@ def swap_to_game():
     state = GAME
     player.hard_respawn()
     sequence.current.emit()
-    draw_background(static_level_surf)
-    sequence.current.draw_static(static_level_surf, main_cam)
+    draw_static_level()
+    renderer.redraw_all()
 
 
 def next_level():
-    sequence.current.unemit()
-    sequence.start_transition(static_level_surf)
+    sequence.leave_level(player)  # Turns on music again, with full health
+    sequence.start_transition()
     player.hidden = True
-    player.health = player.MAX_HEALTH  # Turns on music again
-    player.checkpoint = None
-    punchers.punchers = []
     flicker.play_sounds()
 
 
 def end_transition():
     sequence.done_transitioning = False
-    draw_background(static_level_surf)
-    sequence.current.draw_static(static_level_surf, main_cam)
-    player.level = sequence.current
+    draw_static_level()
+    renderer.redraw_all()
     player.hidden = False
-    player.hard_respawn(False)
+    sequence.enter_level(player)
     goal_light_activate.play_random()
+    recorder.start(sequence.current.name)
 
 
-while True:
-    events.update()
+def step():
+    """moves whatever's on screen on by a frame"""
+    global state
+
+    with profiler.phase("events.update"):
+        events.update()
+    sound.update()
+
+    # F3 shows the profiler, F4 writes every frame's times to profile.csv
+    if profiler_key.is_pressed:
+        profiler.toggle()
+    if profiler_trace_key.is_pressed and profiler.enabled:
+        if profiler.tracing():
+            profiler.stop_trace()
+        else:
+            profiler.start_trace("profile.csv", PROFILER_PHASES)
 
     # if editor_key.is_pressed:
     #     if state == GAME:
@@ -339,9 +421,10 @@ while True:
 
     if state == SPLASH_SCREEN:
         splash_screen.update()
-        splash_screen.draw(main_surf)
+        assets.load_some(SPLASH_LOAD_TIME)
         if splash_screen.done:
             splash_screen.done = False
+            finish_loading()
             state = MENU
 
     elif state == MENU:
@@ -351,16 +434,12 @@ while True:
             main_menu.switch_to_game = False
             state = GAME
             next_level()
-        else:
-            main_menu.draw(main_surf)
 
     elif state == CREDITS:
         credits_screen.update()
-        credits_screen.draw(main_surf)
 
     elif state == PAUSE:
         pause_menu.update()
-        pause_menu.draw(main_surf)
 
         if pause_menu.switch_to_game:
             state = GAME
@@ -369,7 +448,6 @@ while True:
 
     elif state == GAME:
         game_update()
-        game_draw()
 
         if player.pause_key.is_pressed:
             state = PAUSE
@@ -382,10 +460,31 @@ while True:
 
     elif state == EDITOR:
         editor_update()
+
+    music.update()
+
+
+def draw():
+    # Only the game itself is drawn through the renderer
+    if state != GAME:
+        renderer.clear()
+
+    if state == SPLASH_SCREEN:
+        splash_screen.draw(main_surf)
+    elif state == MENU:
+        main_menu.draw(main_surf)
+    elif state == CREDITS:
+        credits_screen.draw(main_surf)
+    elif state == PAUSE:
+        pause_menu.draw(main_surf)
+    elif state == GAME:
+        game_draw()
+    elif state == EDITOR:
         editor_draw()
 
     # debug.debug(clock.get_fps())
     # debug.debug(sequence.current.name)
+    # debug.debug(sequence.prefetcher.hits, sequence.prefetcher.misses)
     # debug.debug(main_cam.sliding, main_cam.last_slide_frame)
     # debug.debug(main_cam.slide_x_frame, main_cam.slide_y_frame, main_cam.SLIDE_LENGTH)
     # debug.debug(level.active_column, level.active_row)
@@ -394,14 +493,27 @@ while True:
     # debug.debug(float(player.x_vel), float(player.ext_x_vel))
     # debug.debug(player.health, player.dead)
 
-    debug.draw(main_surf)
+    if profiler.enabled:
+        debug.text("timestep: " + steps.report())
+        debug.text(static_cache.report())
+    profiler.draw()
+    renderer.add_all(debug.draw(main_surf))
 
-    # if pygame.K_f in events.keys.held_keys:
-    #     screen_update(2)
-    # else:
-    screen_update(60)
+    screen_update()
+    profiler.end_frame()
+
+
+while True:
+    steps.wait()
+    for _ in range(steps.advance()):
+        step()
+        if events.quit_program or credits_screen.done:
+            break
 
     if events.quit_program or credits_screen.done:
         break
 
+    draw()
+
+profiler.stop_trace()
 pygame.quit()
@@ -3,17 +3,37 @@ import constants as const
 import os
 import copy
 
-os.environ['SDL_VIDEO_CENTERED'] = '1'
+import assets
+import atlas
 
-pygame.init()
-pygame.display.set_mode((const.SCRN_W, const.SCRN_H))
+
+def init():
+    """Opens the window, and returns its surface.
+
+    Images can only be loaded after this, since they're converted to the
+    window's pixel format."""
+    os.environ['SDL_VIDEO_CENTERED'] = '1'
+    pygame.display.init()
+    pygame.font.init()
+    return pygame.display.set_mode((const.SCRN_W, const.SCRN_H))
 
 
 def pathify(string):
     return os.path.join("images", string + ".png")
 
 
-def load_image(path, multiplier=1):
+# Every image that's been loaded, by the loader that loaded it and what it
+# was given, since the same file comes out differently from each
+_images = {}
+
+
+def _image_key(loader, path, multiplier, colorkey):
+    if colorkey is not None:
+        colorkey = tuple(colorkey)
+    return loader, path, multiplier, colorkey
+
+
+def _load_scaled(path, multiplier, colorkey):
     actual_path = pathify(path)
 
     if multiplier == 1:
@@ -26,34 +46,104 @@ def load_image(path, multiplier=1):
         height = unscaled.get_height() * multiplier
         image = pygame.transform.scale(unscaled, (width, height))
 
-    image.convert()
-    image.set_colorkey((0, 0, 0))
+    # Paletted images use the nearest color in their palette as the
+    # colorkey, which the art relies on, so it's set before converting
+    image.set_colorkey(colorkey)
     return image
 
 
-def flip_column(column):
-    unflipped = column.surface
-    flipped = pygame.transform.flip(unflipped, True, False)
+def load_image(path, multiplier=1, colorkey=(0, 0, 0)):
+    """Loads an image that's drawn with plain blits, like a sprite.
+
+    The image is converted to the display's pixel format, so that blitting
+    it doesn't convert every pixel each time.  Images with per pixel alpha
+    keep it, and the rest get colorkey as their transparent color, with RLE
+    acceleration.  Each image is only loaded once, so the same path,
+    multiplier and colorkey always return the same surface."""
+    key = _image_key("image", path, multiplier, colorkey)
+    if key not in _images:
+        image = _load_scaled(path, multiplier, colorkey)
+        if image.get_flags() & pygame.SRCALPHA:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+            image.set_colorkey(image.get_colorkey(), pygame.RLEACCEL)
+        _images[key] = image
+
+    return _images[key]
+
+
+def load_blend_image(path, multiplier=1):
+    """Loads an image that's only drawn with special_flags, like glows,
+    gradients and shades.
+
+    These are converted like load_image() images, with black as their
+    colorkey, but without RLE acceleration.  Blending reads the pixels
+    directly, and would have to unpack an RLE image on every blit."""
+    key = _image_key("blend", path, multiplier, (0, 0, 0))
+    if key not in _images:
+        image = _load_scaled(path, multiplier, (0, 0, 0)).convert()
+        _images[key] = image
+
+    return _images[key]
+
+
+def load_column(path, multiplier=1, flipped=False):
+    """returns the surface of an animation column, from the atlas if it's
+    in there.  flipped columns are flipped horizontally."""
+    actual_path = pathify(path)
+    image = atlas.find(actual_path, multiplier, flipped)
+    if image is not None:
+        return image
+
+    if flipped:
+        image = pygame.transform.flip(load_column(path, multiplier), True, False)
+    else:
+        image = load_image(path, multiplier)
+    atlas.add(actual_path, multiplier, flipped, image)
+    return image
 
-    frame_count = column.frame_count
 
-    new_column = AnimColumn("null_sprite", frame_count, 1)
-    new_column.surface = flipped
-    new_column.frame_w = column.frame_w
-    new_column.frame_h = column.frame_h
+def flip_column(column):
+    new_column = AnimColumn(column.path, column.frame_count, column.multiplier,
+                            not column.flipped)
     new_column.delays = copy.copy(column.delays)
 
     return new_column
 
 
 class AnimColumn:
-    def __init__(self, path, frame_count, multiplier=1):
-        self.surface = load_image(path, multiplier)
+    """An animation whose frames are stacked on top of each other in one
+    image.  The image is only loaded once the column is first used, or when
+    the assets are loaded."""
+    def __init__(self, path, frame_count, multiplier=1, flipped=False):
+        self.path = path
+        self.multiplier = multiplier
+        self.flipped = flipped
+
+        self._surface = None
         self.frame_count = frame_count
-        self.frame_w = self.surface.get_width()
-        self.frame_h = self.surface.get_height() // frame_count
         self.delays = (1, ) * frame_count
 
+        assets.loader(self.load)
+
+    def load(self):
+        if self._surface is None:
+            self._surface = load_column(self.path, self.multiplier, self.flipped)
+
+    @property
+    def surface(self):
+        self.load()
+        return self._surface
+
+    @property
+    def frame_w(self):
+        return self.surface.get_width()
+
+    @property
+    def frame_h(self):
+        return self.surface.get_height() // self.frame_count
+
     def set_delay(self, amount):
         """Sets a constant delay for each frame."""
         self.delays = (amount, ) * self.frame_count
@@ -64,44 +154,55 @@ class AnimColumn:
 
 
 class AnimSheet:
+    """Every column of an animated sprite, side by side in one surface.
+    Like AnimColumn, the surface is only made once it's first drawn, or
+    when the assets are loaded."""
     def __init__(self, columns):
+        self._columns = tuple(columns)
+
+        # Only these are needed to play the animations
+        self.anim_delays = tuple(column.delays for column in columns)
+        self.frame_counts = tuple(column.frame_count for column in columns)
+        self.anim_count = len(columns)
+
+        self.surface = None
+        assets.loader(self.load)
+
+    def load(self):
+        if self.surface is not None:
+            return
+
         width = 0
         height = 0
-        frame_counts = []
 
         anim_x = []  # the x position of the animation in the surface
         frame_widths = []
         frame_heights = []
-        anim_delays = []
-        for column in columns:
+        for column in self._columns:
             anim_x.append(width)
             frame_widths.append(column.frame_w)
             frame_heights.append(column.frame_h)
 
             width += column.frame_w
             height = max(height, column.surface.get_height())
-            frame_counts.append(column.frame_count)
-
-            anim_delays.append(column.delays)
 
-        self.anim_delays = tuple(anim_delays)
         self.anim_x = tuple(anim_x)
         self.frame_widths = tuple(frame_widths)
         self.frame_heights = tuple(frame_heights)
 
-        self.frame_counts = tuple(frame_counts)
-        self.anim_count = len(columns)
-
-        self.surface = pygame.Surface((width, height))
-        self.surface.set_colorkey(const.TRANSPARENT)
-        for index, column in enumerate(columns):
-            self.surface.blit(column.surface, (anim_x[index], 0))
+        surface = pygame.Surface((width, height))
+        surface.set_colorkey(const.TRANSPARENT, pygame.RLEACCEL)
+        for index, column in enumerate(self._columns):
+            surface.blit(column.surface, (anim_x[index], 0))
+        self.surface = surface
 
     def draw_frame(self, surface, frame, anim, x, y):
+        if self.surface is None:
+            self.load()
         anim_x = self.anim_x[anim]
         anim_y = self.frame_heights[anim] * frame
         rect = (anim_x, anim_y, self.frame_widths[anim], self.frame_heights[anim])
-        surface.blit(self.surface, (x, y), rect)
+        return surface.blit(self.surface, (x, y), rect)
 
 
 class AnimInstance:
@@ -125,7 +226,7 @@ class AnimInstance:
             self.next_frame()
 
     def draw_frame(self, surface, x, y):
-        self.spritesheet.draw_frame(surface, self.frame, self.anim, x, y)
+        return self.spritesheet.draw_frame(surface, self.frame, self.anim, x, y)
 
     def next_frame(self):
         self.frame += 1
@@ -3,11 +3,15 @@ import sound
 import math
 import os
 import pygame
+import random
+from array import array
 
+import assets
 import graphics
 import constants as const
 
 import flicker
+import levelfile
 
 TILE_W = 20
 TILE_H = 20
@@ -57,6 +61,12 @@ class Tile:
     EMITTED = False
     DRAWN_STATICALLY = True
 
+    # The bit that marks this tile type in Room.masks
+    BIT = 0
+    # Shared tiles hold no state, so they are only stored as a bit in
+    # Room.masks instead of as an object in Room.objects
+    SHARED = False
+
     def __init__(self):
         pass
 
@@ -75,6 +85,9 @@ class Wall(Tile):
     EMITTED = False
     DRAWN_STATICALLY = True
 
+    BIT = 1 << 0
+    SHARED = True
+
     def __init__(self):
         super().__init__()
 
@@ -84,10 +97,12 @@ class PunchBox(Tile):
     EMITTED = False
     DRAWN_STATICALLY = False
 
-    def __init__(self, direction):
+    BIT = 1 << 1
+
+    def __init__(self, direction, rng=random):
         super().__init__()
         self.direction = direction
-        self.flicker_sequence = flicker.FlickerSequence()
+        self.flicker_sequence = flicker.FlickerSequence(rng)
 
 
 class PunchZone(Tile):
@@ -95,9 +110,12 @@ class PunchZone(Tile):
     EMITTED = True
     DRAWN_STATICALLY = True
 
-    def __init__(self, direction):
+    BIT = 1 << 2
+
+    def __init__(self, direction, source):
         super().__init__()
         self.direction = direction
+        self.source = source  # the index of the PunchBox's space
 
 
 class Deathlock(Tile):
@@ -105,6 +123,8 @@ class Deathlock(Tile):
     EMITTED = False
     DRAWN_STATICALLY = True
 
+    BIT = 1 << 3
+
     def __init__(self):
         super().__init__()
         self.flicker_sequence = None
@@ -119,13 +139,15 @@ class Checkpoint(Tile):
     EMITTED = False
     DRAWN_STATICALLY = True
 
-    def __init__(self, direction, col, row):
+    BIT = 1 << 4
+
+    def __init__(self, direction, col, row, rng=random):
         super().__init__()
         self.direction = direction
         self.col = col
         self.row = row
         self.active = False
-        self.flicker_sequence = flicker.FlickerSequence()
+        self.flicker_sequence = flicker.FlickerSequence(rng)
 
 
 class CheckpointRay(Tile):
@@ -133,11 +155,14 @@ class CheckpointRay(Tile):
     EMITTED = True
     DRAWN_STATICALLY = True
 
-    def __init__(self, checkpoint, orientation):
+    BIT = 1 << 5
+
+    def __init__(self, checkpoint, orientation, source):
         super().__init__()
 
         self.orientation = orientation
         self.checkpoint = checkpoint
+        self.source = source  # the index of the Checkpoint's space
 
 
 class PlayerSpawn(Tile):
@@ -145,11 +170,13 @@ class PlayerSpawn(Tile):
     EMITTED = False
     DRAWN_STATICALLY = False
 
-    def __init__(self, col, row):
+    BIT = 1 << 6
+
+    def __init__(self, col, row, rng=random):
         super().__init__()
         self.col = col
         self.row = row
-        self.flicker_sequence = flicker.FlickerSequence()
+        self.flicker_sequence = flicker.FlickerSequence(rng)
 
 
 class PlayerGoal(Tile):
@@ -157,6 +184,8 @@ class PlayerGoal(Tile):
     EMITTED = False
     DRAWN_STATICALLY = True
 
+    BIT = 1 << 7
+
     def __init__(self, col, row):
         super().__init__()
         self.col = col
@@ -168,38 +197,89 @@ class PlayerGoalZone(Tile):
     EMITTED = True
     DRAWN_STATICALLY = True
 
+    BIT = 1 << 8
+    SHARED = True
+
     def __init__(self):
         super().__init__()
 
 
-punch_box_left = graphics.load_image("punch_box", 2)
-punch_box_left.set_colorkey(const.TRANSPARENT)
-punch_box_up = pygame.transform.rotate(punch_box_left, -90)
-punch_box_right = pygame.transform.rotate(punch_box_left, 180)
-punch_box_down = pygame.transform.rotate(punch_box_left, 90)
-punch_box_gradient = graphics.load_image("punch_box_gradient", 1)
-punch_box_glow = graphics.load_image("punch_box_glow", 1)
+class Triggers:
+    """the tiles on a space that do something when the player is on it"""
+    def __init__(self, punch_zone=None, checkpoint_ray=None, goal_zone=False):
+        self.punch_zone = punch_zone  # the first PunchZone, or None
+        self.checkpoint_ray = checkpoint_ray  # the first CheckpointRay, or None
+        self.goal_zone = goal_zone  # whether there is a PlayerGoalZone
+
+
+no_triggers = Triggers()
+
 
-checkpoint_activated = graphics.load_image("checkpoint_activated", 2)
-checkpoint_activated.set_colorkey(const.TRANSPARENT)
-checkpoint_deactivated = graphics.load_image("checkpoint_deactivated", 2)
-checkpoint_deactivated.set_colorkey(const.TRANSPARENT)
-checkpoint_gradient = graphics.load_image("checkpoint_gradient", 1)
-checkpoint_glow = graphics.load_image("checkpoint_glow", 1)
+# The order tiles are listed in when several share a space.  The first tile
+# in this order is the one that gets drawn and saved for that space.
+TILE_ORDER = (PlayerSpawn, PlayerGoal, Wall, Deathlock, PunchBox, Checkpoint,
+              PlayerGoalZone, CheckpointRay, PunchZone)
 
-checkpoint_ray_horiz_gradient = graphics.load_image("checkpoint_ray_horiz_gradient", 1)
-checkpoint_ray_vert_gradient = pygame.transform.rotate(checkpoint_ray_horiz_gradient, 90)
-checkpoint_ray_horiz_glow = graphics.load_image("checkpoint_ray_horiz_glow", 1)
-checkpoint_ray_vert_glow = pygame.transform.rotate(checkpoint_ray_horiz_glow, 90)
+SOLID_MASK = Wall.BIT | PunchBox.BIT
+EMITTED_MASK = PunchZone.BIT | CheckpointRay.BIT | PlayerGoalZone.BIT
+EMITTER_MASK = PunchBox.BIT | Checkpoint.BIT | PlayerGoal.BIT
+UNERASABLE_MASK = PlayerSpawn.BIT | PlayerGoal.BIT
+OCCUPANCY_MASK = SOLID_MASK | Deathlock.BIT
+GLOW_MASK = PunchBox.BIT | Deathlock.BIT | Checkpoint.BIT | CheckpointRay.BIT | PlayerSpawn.BIT
+DYNAMIC_MASK = PunchBox.BIT | PlayerSpawn.BIT  # the tiles not DRAWN_STATICALLY
 
-player_goal_glow = graphics.load_image("player_goal_glow", 1)
-player_goal_gradient = graphics.load_image("player_goal_gradient", 1)
+shared_tiles = {Wall: Wall(), PlayerGoalZone: PlayerGoalZone()}
 
-deathlock_glow = graphics.load_image("deathlock_glow", 1)
-deathlock_gradient = graphics.load_image("deathlock_gradient", 1)
+# The (col, row) step taken in each direction
+direction_steps = {const.LEFT: (-1, 0), const.UP: (0, -1),
+                   const.RIGHT: (1, 0), const.DOWN: (0, 1)}
 
-player_spawn_gradient = checkpoint_gradient
-player_spawn_glow = graphics.load_image("player_spawn_glow", 1)
+
+@assets.loader
+def _load_images():
+    global punch_box_left, punch_box_up, punch_box_right, punch_box_down
+    global punch_box_gradient, punch_box_glow
+    punch_box_left = graphics.load_image("punch_box", 2, const.TRANSPARENT)
+    punch_box_up = pygame.transform.rotate(punch_box_left, -90)
+    punch_box_right = pygame.transform.rotate(punch_box_left, 180)
+    punch_box_down = pygame.transform.rotate(punch_box_left, 90)
+    punch_box_gradient = graphics.load_blend_image("punch_box_gradient", 1)
+    punch_box_glow = graphics.load_blend_image("punch_box_glow", 1)
+
+    global checkpoint_activated, checkpoint_deactivated
+    global checkpoint_gradient, checkpoint_glow
+    checkpoint_activated = graphics.load_image("checkpoint_activated", 2, const.TRANSPARENT)
+    checkpoint_deactivated = graphics.load_image("checkpoint_deactivated", 2, const.TRANSPARENT)
+    checkpoint_gradient = graphics.load_blend_image("checkpoint_gradient", 1)
+    checkpoint_glow = graphics.load_blend_image("checkpoint_glow", 1)
+
+    global checkpoint_ray_horiz_gradient, checkpoint_ray_vert_gradient
+    global checkpoint_ray_horiz_glow, checkpoint_ray_vert_glow
+    checkpoint_ray_horiz_gradient = graphics.load_blend_image("checkpoint_ray_horiz_gradient", 1)
+    checkpoint_ray_vert_gradient = pygame.transform.rotate(checkpoint_ray_horiz_gradient, 90)
+    checkpoint_ray_horiz_glow = graphics.load_blend_image("checkpoint_ray_horiz_glow", 1)
+    checkpoint_ray_vert_glow = pygame.transform.rotate(checkpoint_ray_horiz_glow, 90)
+
+    global player_goal_glow, player_goal_gradient
+    player_goal_glow = graphics.load_blend_image("player_goal_glow", 1)
+    player_goal_gradient = graphics.load_blend_image("player_goal_gradient", 1)
+
+    global deathlock_glow, deathlock_gradient
+    deathlock_glow = graphics.load_blend_image("deathlock_glow", 1)
+    deathlock_gradient = graphics.load_blend_image("deathlock_gradient", 1)
+
+    global player_spawn_gradient, player_spawn_glow
+    player_spawn_gradient = checkpoint_gradient
+    player_spawn_glow = graphics.load_blend_image("player_spawn_glow", 1)
+
+    Room.checkpoint_shade_soft = graphics.load_blend_image("checkpoint_shade_soft", 2)
+    Room.checkpoint_shade_medium = graphics.load_blend_image("checkpoint_shade_medium", 2)
+    Room.checkpoint_shade_bright = graphics.load_blend_image("checkpoint_shade_bright", 2)
+
+    # How many spaces away from a tile its glow can reach
+    Room.MAX_SEARCH_PUNCH_BOX = (punch_box_gradient.get_width() // TILE_W - 1) // 2 + 1
+    Room.MAX_SEARCH_CHECKPOINT = (checkpoint_gradient.get_width() // TILE_W - 1) // 2 + 1
+    Room.MAX_SEARCH_DEATHLOCK = (deathlock_gradient.get_width() // TILE_W - 1) // 2 + 1
 
 
 def col_at(x):
@@ -240,10 +320,20 @@ def center_y_of(row):
     return y_of(row) + (TILE_H / 2)
 
 
-def draw_glow_centered(surf, glow, center_x, center_y):
+def _centered_blit(glow, center_x, center_y):
+    """returns a BLEND_MAX blit of a glow centered on a point, as arguments
+    for Surface.blits()"""
     glow_x = int(center_x - (glow.get_width() / 2))
     glow_y = int(center_y - (glow.get_height() / 2))
-    surf.blit(glow, (glow_x, glow_y), special_flags=pygame.BLEND_MAX)
+    return glow, (glow_x, glow_y), None, pygame.BLEND_MAX
+
+
+def _blit_rect(blit):
+    """returns the area covered by a blit from Surface.blits() arguments"""
+    source, position, area, flags = blit
+    if area:
+        return pygame.Rect(position, area[2:])
+    return pygame.Rect(position, source.get_size())
 
 
 class Room:
@@ -253,18 +343,78 @@ class Room:
     PIXEL_W = WIDTH * TILE_W
     PIXEL_H = HEIGHT * TILE_H
 
-    goal_sound = sound.load("goal")
+    goal_sound = sound.load("goal", sound.AMBIENCE, sound.HIGH_PRIORITY)
     goal_sound.set_volume(0)
     goal_sound_playing = False
 
     def __init__(self, name):
         """name is the name of the file in the levels folder"""
-        self.grid = [[[] for _ in range(self.HEIGHT)] for _ in range(self.WIDTH)]
-
-        self.player_spawn = PlayerSpawn(0, 0)
+        # Every space holds a bitmask of the tile types on it, indexed by
+        # row * WIDTH + col.  Tiles that hold their own state are also kept
+        # in objects, which maps an index to the list of those tiles.
+        self.masks = array("H", [0]) * (self.WIDTH * self.HEIGHT)
+        self.objects = {}
+
+        # The indexes of the spaces with a tile in DYNAMIC_MASK, so that
+        # draw_dynamic() doesn't have to look through every space
+        self.dynamic = set()
+
+        # Occupancy bitmaps used by the collide functions.  Bit n of
+        # solid_rows[row] is set if column n of that row is solid, and bit n
+        # of solid_cols[col] is set if row n of that column is solid.
+        self.solid_rows = [0] * self.HEIGHT
+        self.solid_cols = [0] * self.WIDTH
+        self.deathlock_rows = [0] * self.HEIGHT
+        self.deathlock_cols = [0] * self.WIDTH
+
+        # The group of touching deathlock spaces each space is in, numbered
+        # from 1, or 0 for spaces without deathlock.  Only updated on load().
+        self.deathlock_components = array("H", [0]) * (self.WIDTH * self.HEIGHT)
+
+        # Goes up whenever a tile is added or removed, so that anything
+        # worked out from the tiles knows when to work it out again
+        self.version = 0
+        self._glow_blits = []
+        self._glow_bounds = pygame.Rect(0, 0, 0, 0)
+        self._glow_version = -1
+
+        self._triggers = []
+        self._triggers_version = -1
+
+        self._content_key = b""
+        self._content_key_version = -1
+
+        self._flicker_events = []
+        self._flicker_events_version = -1
+        self._flicker_lists = []
+        self._flicker_checkpoints = {}
+
+        # The room as it's drawn while flickering in, and the frame it's drawn at
+        self._flicker_surf = None
+        self._flicker_frame = -1
+        self._flicker_offset = (0, 0)
+        self._flicker_drawn_version = -1
+        self._flicker_glows = {}
+        self._flicker_glow_blits = []
+        self._flicker_glow_rects = []
+
+        # The emitted tiles, kept separately so that they can be updated one
+        # emitter at a time.  Maps the index of the tile they were emitted
+        # from to a list of (index, tile) for every tile it emitted.  While
+        # emitting is True, adding or removing tiles updates them.
+        self.emitted = {}
+        self.emitting = False
+
+        # Flickers are picked from the room's own generator, seeded with its
+        # name on every load().  Rooms are built on the prefetcher's thread
+        # while the main thread uses the global one, so sharing it would
+        # make the flickers depend on timing.
+        self.random = random.Random(name)
+
+        self.player_spawn = PlayerSpawn(0, 0, self.random)
         self.player_goal = PlayerGoal(0, 0)
-        self.grid[0][0].append(self.player_spawn)
-        self.grid[0][0].append(self.player_goal)
+        self.add_tile(0, 0, self.player_spawn)
+        self.add_tile(0, 0, self.player_goal)
 
         self.unique_flickers = []
 
@@ -284,34 +434,151 @@ class Room:
         return True
 
     def clear(self):
-        for col in range(self.WIDTH):
-            for row in range(self.HEIGHT):
-                self.clear_point(col, row)
+        # Spawn and goal shouldn't be erasable
+        for index in range(len(self.masks)):
+            self.masks[index] &= UNERASABLE_MASK
+        objects = {}
+        for index, tiles in self.objects.items():
+            kept = [tile for tile in tiles if tile.BIT & UNERASABLE_MASK]
+            if kept:
+                objects[index] = kept
+        self.objects = objects
+        self._rebuild_occupancy()
+        self._rebuild_dynamic()
+        self.deathlock_components = array("H", [0]) * len(self.masks)
+        self.emitted = {}
+        self.emitting = False
+        self.version += 1
 
     def add_tile(self, col, row, tile):
         if not self.out_of_bounds(col, row):
-            self.grid[col][row].append(tile)
+            self._place_tile(col, row, tile)
+            if self.emitting and not tile.EMITTED:
+                self._update_emission(col, row)
 
         else:
             print("add_tile() tried to add a tile out of bounds")
 
+    def _place_tile(self, col, row, tile):
+        self.version += 1
+        index = row * self.WIDTH + col
+        self.masks[index] |= tile.BIT
+        if not tile.SHARED:
+            if index in self.objects:
+                self.objects[index].append(tile)
+            else:
+                self.objects[index] = [tile]
+
+        if tile.BIT & OCCUPANCY_MASK:
+            self._update_occupancy(col, row)
+        if tile.BIT & DYNAMIC_MASK:
+            self.dynamic.add(index)
+
+    def remove_tile(self, col, row, tile):
+        """removes a single tile object from a space, if it is there"""
+        if self.out_of_bounds(col, row):
+            return
+
+        self._take_tile(col, row, tile)
+        if self.emitting and not tile.EMITTED:
+            self._update_emission(col, row)
+
+    def _take_tile(self, col, row, tile):
+        self.version += 1
+        index = row * self.WIDTH + col
+        if tile.SHARED:
+            self.masks[index] &= ~tile.BIT
+            self._update_occupancy(col, row)
+            return
+
+        tiles = self.objects.get(index)
+        if not tiles or tile not in tiles:
+            return
+
+        tiles.remove(tile)
+        for other in tiles:
+            if type(other) is type(tile):
+                break
+        else:
+            self.masks[index] &= ~tile.BIT
+
+        if not tiles:
+            del self.objects[index]
+        if not self.masks[index] & DYNAMIC_MASK:
+            self.dynamic.discard(index)
+
+        self._update_occupancy(col, row)
+
     def clear_point(self, col, row):
         if not self.out_of_bounds(col, row):
-            new_tile = []
+            self.version += 1
+            index = row * self.WIDTH + col
+
+            # The emitters of any emitted tiles about to be erased
+            if self.emitting:
+                erased = self._emission_sources(col, row)
 
             # Spawn and goal shouldn't be erasable
-            if self.has_tile(PlayerSpawn, col, row):
-                spawn = self.get_tile(PlayerSpawn, col, row)
-                new_tile.append(spawn)
-            if self.has_tile(PlayerGoal, col, row):
-                goal = self.get_tile(PlayerGoal, col, row)
-                new_tile.append(goal)
+            self.masks[index] &= UNERASABLE_MASK
+            if index in self.objects:
+                kept = [tile for tile in self.objects[index]
+                        if tile.BIT & UNERASABLE_MASK]
+                if kept:
+                    self.objects[index] = kept
+                else:
+                    del self.objects[index]
+            if not self.masks[index] & DYNAMIC_MASK:
+                self.dynamic.discard(index)
 
-            self.grid[col][row] = new_tile
+            self._update_occupancy(col, row)
+
+            if self.emitting:
+                self._update_emission(col, row, erased)
 
         else:
             print("clear_point() tried to clear a tile out of bounds")
 
+    def _update_occupancy(self, col, row):
+        """updates the occupancy bitmaps for a single space"""
+        mask = self.masks[row * self.WIDTH + col]
+        col_bit = 1 << col
+        row_bit = 1 << row
+
+        if mask & SOLID_MASK:
+            self.solid_rows[row] |= col_bit
+            self.solid_cols[col] |= row_bit
+        else:
+            self.solid_rows[row] &= ~col_bit
+            self.solid_cols[col] &= ~row_bit
+
+        if mask & Deathlock.BIT:
+            self.deathlock_rows[row] |= col_bit
+            self.deathlock_cols[col] |= row_bit
+        else:
+            self.deathlock_rows[row] &= ~col_bit
+            self.deathlock_cols[col] &= ~row_bit
+
+    def _rebuild_occupancy(self):
+        """rebuilds the occupancy bitmaps from scratch"""
+        self.solid_rows = [0] * self.HEIGHT
+        self.solid_cols = [0] * self.WIDTH
+        self.deathlock_rows = [0] * self.HEIGHT
+        self.deathlock_cols = [0] * self.WIDTH
+
+        for row in range(self.HEIGHT):
+            for col in range(self.WIDTH):
+                mask = self.masks[row * self.WIDTH + col]
+                if mask & SOLID_MASK:
+                    self.solid_rows[row] |= 1 << col
+                    self.solid_cols[col] |= 1 << row
+                if mask & Deathlock.BIT:
+                    self.deathlock_rows[row] |= 1 << col
+                    self.deathlock_cols[col] |= 1 << row
+
+    def _rebuild_dynamic(self):
+        self.dynamic = {index for index, mask in enumerate(self.masks)
+                        if mask & DYNAMIC_MASK}
+
     def add_rect(self, col, row, w, h, constructor):
         """places a rectangle of tiles at the given coordinates
 
@@ -328,52 +595,81 @@ class Room:
                 self.clear_point(col_index, row_index)
 
     def add_checkpoint(self, col, row, direction):
-        self.add_tile(col, row, Checkpoint(direction, col, row))
+        self.add_tile(col, row, Checkpoint(direction, col, row, self.random))
 
     def move_player_spawn(self, col, row):
         # Remove old spawn
-        old_col = self.player_spawn.col
-        old_row = self.player_spawn.row
-        if self.player_spawn in self.grid[old_col][old_row]:
-            self.grid[old_col][old_row].remove(self.player_spawn)
+        self.remove_tile(self.player_spawn.col, self.player_spawn.row,
+                         self.player_spawn)
 
         # Place new spawn
-        self.player_spawn = PlayerSpawn(col, row)
+        self.player_spawn = PlayerSpawn(col, row, self.random)
         self.add_tile(col, row, self.player_spawn)
 
     def move_player_goal(self, col, row):
         # Remove old goal
-        old_col = self.player_goal.col
-        old_row = self.player_goal.row
-        if self.player_goal in self.grid[old_col][old_row]:
-            self.grid[old_col][old_row].remove(self.player_goal)
+        self.remove_tile(self.player_goal.col, self.player_goal.row,
+                         self.player_goal)
 
         # Place new goal
         self.player_goal = PlayerGoal(col, row)
         self.add_tile(col, row, self.player_goal)
 
     def tiles_at(self, col, row):
-        """returns the tiles at a given point"""
-        if not self.out_of_bounds(col, row):
-            return self.grid[col][row]
+        """returns a new list of the tiles at a given point, in TILE_ORDER"""
+        if self.out_of_bounds(col, row):
+            return [Void()]
+
+        index = row * self.WIDTH + col
+        mask = self.masks[index]
+        tiles = []
+        if not mask:
+            return tiles
+
+        objects = self.objects.get(index, ())
+        for type_ in TILE_ORDER:
+            if mask & type_.BIT:
+                if type_.SHARED:
+                    tiles.append(shared_tiles[type_])
+                else:
+                    tiles.extend(tile for tile in objects if type(tile) is type_)
+
+        return tiles
+
+    def first_tile(self, col, row):
+        """returns the tile that is drawn for a point, or None if it's empty
+
+        assumes that the point is in bounds"""
+        index = row * self.WIDTH + col
+        mask = self.masks[index]
+        if not mask:
+            return None
 
-        return [Void()]
+        for type_ in TILE_ORDER:
+            if mask & type_.BIT:
+                if type_.SHARED:
+                    return shared_tiles[type_]
+                for tile in self.objects[index]:
+                    if type(tile) is type_:
+                        return tile
 
     def has_tile(self, type_, col, row):
         """determines if a certain space contains a tile"""
-        if not self.out_of_bounds(col, row):
-            for tile in self.tiles_at(col, row):
-                if type(tile) == type_:
-                    return True
-            return False
+        if 0 <= col < self.WIDTH and 0 <= row < self.HEIGHT:
+            return bool(self.masks[row * self.WIDTH + col] & type_.BIT)
 
         return type_ == Void
 
     def get_tile(self, type_, col, row):
         """gets the first tile with a given type on this space"""
-        for tile in self.tiles_at(col, row):
-            if type(tile) == type_:
-                return tile
+        if self.has_tile(type_, col, row):
+            if type_ == Void:
+                return Void()
+            if type_.SHARED:
+                return shared_tiles[type_]
+            for tile in self.objects[row * self.WIDTH + col]:
+                if type(tile) == type_:
+                    return tile
 
         raise("There is not tile of type %s there!" % str(type_))
 
@@ -386,115 +682,239 @@ class Room:
         return False
 
     def is_empty(self, col, row):
-        return not self.tiles_at(col, row)
+        if self.out_of_bounds(col, row):
+            return False
+        return not self.masks[row * self.WIDTH + col]
 
     def has_solid(self, col, row):
         """returns whether a tile is solid or not"""
-        for tile in self.tiles_at(col, row):
-            if tile.SOLID:
-                return True
+        if 0 <= col < self.WIDTH and 0 <= row < self.HEIGHT:
+            return bool(self.masks[row * self.WIDTH + col] & SOLID_MASK)
 
-        return False
+        return True
 
-    def _initiate_deathlock_flicker(self):
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self.has_tile(Deathlock, col, row):
-                    self._initiate_deathlock_flicker_recursion(flicker.FlickerSequence(), col, row)
+    def trigger_at(self, col, row):
+        """returns the Triggers of a space, which are looked up again
+        only after the tiles change"""
+        if 0 <= col < self.WIDTH and 0 <= row < self.HEIGHT:
+            if self._triggers_version != self.version:
+                self._update_triggers()
+            return self._triggers[row * self.WIDTH + col]
+
+        return no_triggers
+
+    def _update_triggers(self):
+        triggers = [no_triggers] * len(self.masks)
+        for index, mask in enumerate(self.masks):
+            if mask & EMITTED_MASK:
+                punch_zone = None
+                checkpoint_ray = None
+                for tile in self.objects.get(index, ()):
+                    if punch_zone is None and type(tile) is PunchZone:
+                        punch_zone = tile
+                    elif checkpoint_ray is None and type(tile) is CheckpointRay:
+                        checkpoint_ray = tile
+                goal_zone = bool(mask & PlayerGoalZone.BIT)
+                triggers[index] = Triggers(punch_zone, checkpoint_ray, goal_zone)
+
+        self._triggers = triggers
+        self._triggers_version = self.version
+
+    def _label_deathlock_components(self):
+        """numbers each group of touching deathlock spaces, starting from 1
+        in the order the groups first show up, and fills in
+        deathlock_components with the number of each space's group"""
+        width = self.WIDTH
+        size = len(self.masks)
+        masks = self.masks
+        components = array("H", [0]) * size
+
+        count = 0
+        stack = []
+        for start in range(size):
+            if not masks[start] & Deathlock.BIT or components[start]:
+                continue
+
+            count += 1
+            components[start] = count
+            stack.append(start)
+            while stack:
+                index = stack.pop()
+                col = index % width
+                if col > 0 and masks[index - 1] & Deathlock.BIT and not components[index - 1]:
+                    components[index - 1] = count
+                    stack.append(index - 1)
+                if col < width - 1 and masks[index + 1] & Deathlock.BIT and not components[index + 1]:
+                    components[index + 1] = count
+                    stack.append(index + 1)
+                if index >= width and masks[index - width] & Deathlock.BIT and not components[index - width]:
+                    components[index - width] = count
+                    stack.append(index - width)
+                if index < size - width and masks[index + width] & Deathlock.BIT and not components[index + width]:
+                    components[index + width] = count
+                    stack.append(index + width)
+
+        self.deathlock_components = components
 
-    def _initiate_deathlock_flicker_recursion(self, flicker_sequence, col, row):
-        tile = self.get_tile(Deathlock, col, row)
-        if tile.flicker_initiated:
-            return
-
-        tile.flicker_sequence = flicker_sequence
-        if self.has_tile(Deathlock, col - 1, row):
-            self._initiate_deathlock_flicker_recursion(flicker_sequence, col - 1, row)
-        if self.has_tile(Deathlock, col + 1, row):
-            self._initiate_deathlock_flicker_recursion(flicker_sequence, col + 1, row)
-        if self.has_tile(Deathlock, col, row - 1):
-            self._initiate_deathlock_flicker_recursion(flicker_sequence, col, row - 1)
-        if self.has_tile(Deathlock, col, row + 1):
-            self._initiate_deathlock_flicker_recursion(flicker_sequence, col, row + 1)
+    def _initiate_deathlock_flicker(self):
+        """gives every group of touching deathlock spaces its own flicker"""
+        sequences = {}
+        for index, component in enumerate(self.deathlock_components):
+            if component:
+                if component not in sequences:
+                    sequences[component] = flicker.FlickerSequence(self.random)
+                for tile in self.objects[index]:
+                    if type(tile) is Deathlock:
+                        tile.flicker_sequence = sequences[component]
 
     def _record_unique_flickers(self):
         self.unique_flickers = [self.player_spawn.flicker_sequence]
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self.grid[col][row]:
-                    tile = self.grid[col][row][0]
-                    if hasattr(tile, "flicker_sequence"):
-                        for flicker_sequence in self.unique_flickers:
-                            if flicker_sequence.sequence_list is tile.flicker_sequence.sequence_list:
-                                break
-                        else:
-                            self.unique_flickers.append(tile.flicker_sequence)
+
+        # Only spaces with objects can hold a flicker sequence
+        for index in sorted(self.objects):
+            tile = self.first_tile(index % self.WIDTH, index // self.WIDTH)
+            if hasattr(tile, "flicker_sequence"):
+                for flicker_sequence in self.unique_flickers:
+                    if flicker_sequence.sequence_list is tile.flicker_sequence.sequence_list:
+                        break
+                else:
+                    self.unique_flickers.append(tile.flicker_sequence)
+
+    def _emitters(self, type_):
+        """returns (col, row, tile) for every tile of a type, column by column"""
+        emitters = []
+        for index, tiles in self.objects.items():
+            if self.masks[index] & type_.BIT:
+                col = index % self.WIDTH
+                row = index // self.WIDTH
+                for tile in tiles:
+                    if type(tile) is type_:
+                        emitters.append((col, row, tile))
+        emitters.sort(key=lambda emitter: (emitter[0], emitter[1]))
+        return emitters
 
     def emit(self):
         """Emits PunchZones from all PunchBoxes and CheckpointRays from
-        all Checkpoints"""
-        for col in range(self.WIDTH):
-            for row in range(self.HEIGHT):
-                for tile in self.tiles_at(col, row):
-                    if type(tile) == PlayerGoal:
-                        self.emit_player_goal_zone(col, row)
-        for col in range(self.WIDTH):
-            for row in range(self.HEIGHT):
-                for tile in self.tiles_at(col, row):
-                    if type(tile) == Checkpoint:
-                        self.emit_checkpoint_ray(col, row, tile)
-        for col in range(self.WIDTH):
-            for row in range(self.HEIGHT):
-                for tile in self.tiles_at(col, row):
-                    if type(tile) == PunchBox:
-                        self.emit_punch_zone(col, row, tile)
+        all Checkpoints.  Until unemit() is called, adding or removing
+        tiles re-emits only the emitted tiles that it affects."""
+        if self.emitting:
+            return
 
-    def unemit(self):
-        """Emits PunchZones from all PunchBoxes"""
-        for col in range(self.WIDTH):
-            for row in range(self.HEIGHT):
-                for tile in reversed(self.tiles_at(col, row)):
-                    if tile.EMITTED:
-                        self.tiles_at(col, row).remove(tile)
+        self.emitting = True
+        for type_ in (PlayerGoal, Checkpoint, PunchBox):
+            for col, row, tile in self._emitters(type_):
+                self._emit_tile(row * self.WIDTH + col, tile)
 
-    def emit_punch_zone(self, col, row, tile):
-        if tile.direction == const.LEFT:
-            self.add_tile(col - 1, row, PunchZone(const.LEFT))
-        elif tile.direction == const.UP:
-            self.add_tile(col, row - 1, PunchZone(const.UP))
-        elif tile.direction == const.RIGHT:
-            self.add_tile(col + 1, row, PunchZone(const.RIGHT))
-        elif tile.direction == const.DOWN:
-            self.add_tile(col, row + 1, PunchZone(const.DOWN))
-
-    def emit_checkpoint_ray(self, col, row, tile):
-        if tile.direction == const.LEFT:
-            ray_col = col
-            while not self.stops_checkpoint_ray(ray_col, row):
-                self.add_tile(ray_col, row, CheckpointRay(tile, const.HORIZ))
-                ray_col -= 1
-        elif tile.direction == const.RIGHT:
-            ray_col = col
-            while not self.stops_checkpoint_ray(ray_col, row):
-                self.add_tile(ray_col, row, CheckpointRay(tile, const.HORIZ))
-                ray_col += 1
-        elif tile.direction == const.UP:
-            ray_row = row
-            while not self.stops_checkpoint_ray(col, ray_row):
-                self.add_tile(col, ray_row, CheckpointRay(tile, const.VERT))
-                ray_row -= 1
-        elif tile.direction == const.DOWN:
-            ray_row = row
-            while not self.stops_checkpoint_ray(col, ray_row):
-                self.add_tile(col, ray_row, CheckpointRay(tile, const.VERT))
-                ray_row += 1
-
-    def emit_player_goal_zone(self, col, row):
-        # Place goal zones in a 3x3 area around the goal tile
-        for x in range(col - 1, col + 2):
-            for y in range(row - 1, row + 2):
-                if not self.out_of_bounds(x, y):
-                    self.add_tile(x, y, PlayerGoalZone())
+    def unemit(self):
+        """Removes all emitted tiles"""
+        self.version += 1
+        for source in list(self.emitted):
+            self._unemit_from(source)
+        self.emitting = False
+
+    def _emit_tile(self, source, tile):
+        """emits from a single tile, which is at the index source"""
+        col = source % self.WIDTH
+        row = source // self.WIDTH
+
+        if type(tile) is PunchBox:
+            col_step, row_step = direction_steps[tile.direction]
+            if not self.out_of_bounds(col + col_step, row + row_step):
+                zone = PunchZone(tile.direction, source)
+                self._add_emitted(source, col + col_step, row + row_step, zone)
+
+        elif type(tile) is Checkpoint:
+            col_step, row_step = direction_steps[tile.direction]
+            if col_step:
+                orientation = const.HORIZ
+            else:
+                orientation = const.VERT
+
+            while not self.stops_checkpoint_ray(col, row):
+                self._add_emitted(source, col, row, CheckpointRay(tile, orientation, source))
+                col += col_step
+                row += row_step
+
+        elif type(tile) is PlayerGoal:
+            # Place goal zones in a 3x3 area around the goal tile
+            for x in range(col - 1, col + 2):
+                for y in range(row - 1, row + 2):
+                    if not self.out_of_bounds(x, y):
+                        self._add_emitted(source, x, y, shared_tiles[PlayerGoalZone])
+
+    def _emit_from(self, source):
+        """emits from every emitter on the space at the index source"""
+        if self.masks[source] & EMITTER_MASK:
+            for tile in list(self.objects[source]):
+                if tile.BIT & EMITTER_MASK:
+                    self._emit_tile(source, tile)
+
+    def _unemit_from(self, source):
+        """removes every tile emitted from the space at the index source"""
+        for index, tile in self.emitted.pop(source, ()):
+            self._take_tile(index % self.WIDTH, index // self.WIDTH, tile)
+
+    def _add_emitted(self, source, col, row, tile):
+        self.version += 1
+        index = row * self.WIDTH + col
+        self.masks[index] |= tile.BIT
+        if not tile.SHARED:
+            # Tiles of one type on a space are kept in the order that emit()
+            # places them, column by column, no matter what order they were
+            # emitted in
+            order = (source % self.WIDTH, source // self.WIDTH)
+            tiles = self.objects.setdefault(index, [])
+            position = len(tiles)
+            for other_position, other in enumerate(tiles):
+                if type(other) is type(tile):
+                    if (other.source % self.WIDTH, other.source // self.WIDTH) > order:
+                        position = other_position
+                        break
+            tiles.insert(position, tile)
+
+        if source in self.emitted:
+            self.emitted[source].append((index, tile))
+        else:
+            self.emitted[source] = [(index, tile)]
+
+    def _emission_sources(self, col, row):
+        """returns the indexes of the spaces whose emitted tiles could change
+        when the tiles on a space change"""
+        index = row * self.WIDTH + col
+        mask = self.masks[index]
+        sources = {index}
+
+        # Goal zones are shared, so removing a goal's zones can also remove
+        # the zones of any other goal close enough to overlap them
+        if mask & PlayerGoalZone.BIT:
+            for x in range(col - 2, col + 3):
+                for y in range(row - 2, row + 3):
+                    if self.has_tile(PlayerGoal, x, y):
+                        sources.add(y * self.WIDTH + x)
+        for tile in self.objects.get(index, ()):
+            if tile.EMITTED:
+                sources.add(tile.source)
+
+        # Rays that stop just before this space, which might now go further
+        for direction, (col_step, row_step) in direction_steps.items():
+            ray_col = col - col_step
+            ray_row = row - row_step
+            if self.has_tile(CheckpointRay, ray_col, ray_row):
+                for tile in self.objects[ray_row * self.WIDTH + ray_col]:
+                    if type(tile) is CheckpointRay and tile.checkpoint.direction == direction:
+                        sources.add(tile.source)
+
+        return sources
+
+    def _update_emission(self, col, row, sources=()):
+        """re-emits everything that could have been affected by the tiles
+        on a space changing.  sources are the indexes of any other emitters
+        whose tiles were erased from the space."""
+        sources = sorted(self._emission_sources(col, row).union(sources))
+        for source in sources:
+            self._unemit_from(source)
+        for source in sources:
+            self._emit_from(source)
 
     def stops_checkpoint_ray(self, col, row):
         if self.has_solid(col, row):
@@ -506,28 +926,39 @@ class Room:
         return False
 
     def collide_vert(self, x, y1, y2, collide_deathlock):
-        col = col_at(x)
-        start_row = row_at(y1)
-        end_row = row_at(y2)
-        for row in range(start_row, end_row + 1):
-            if collide_deathlock and self.has_tile(Deathlock, col, row):
-                return True
-            if self.has_solid(col, row):
-                return True
+        # col_at and row_at are inlined, since this runs several times a frame
+        col = int(x // TILE_W)
+        start_row = int(y1 // TILE_H)
+        end_row = int(y2 // TILE_H)
+        if end_row < start_row:
+            return False
 
-        return False
+        # Anything outside of the room is void, which is solid
+        if not 0 <= col < self.WIDTH or start_row < 0 or end_row >= self.HEIGHT:
+            return True
+
+        occupied = self.solid_cols[col]
+        if collide_deathlock:
+            occupied |= self.deathlock_cols[col]
+        span = ((1 << (end_row - start_row + 1)) - 1) << start_row
+        return bool(occupied & span)
 
     def collide_horiz(self, x1, x2, y, collide_deathlock):
-        start_col = col_at(x1)
-        end_col = col_at(x2)
-        row = row_at(y)
-        for col in range(start_col, end_col + 1):
-            if collide_deathlock and self.has_tile(Deathlock, col, row):
-                return True
-            if self.has_solid(col, row):
-                return True
+        start_col = int(x1 // TILE_W)
+        end_col = int(x2 // TILE_W)
+        row = int(y // TILE_H)
+        if end_col < start_col:
+            return False
 
-        return False
+        # Anything outside of the room is void, which is solid
+        if not 0 <= row < self.HEIGHT or start_col < 0 or end_col >= self.WIDTH:
+            return True
+
+        occupied = self.solid_rows[row]
+        if collide_deathlock:
+            occupied |= self.deathlock_rows[row]
+        span = ((1 << (end_col - start_col + 1)) - 1) << start_col
+        return bool(occupied & span)
 
     def _shift_location_tiles(self, col_change, row_change):
         """Change the position of all things that store their own position.
@@ -537,39 +968,59 @@ class Room:
         self.player_spawn.row += row_change
         self.player_goal.col += col_change
         self.player_goal.row += row_change
-        for col in range(0, self.WIDTH):
-            for row in range(0, self.HEIGHT):
-                for tile in self.grid[col][row]:
-                    if type(tile) == Checkpoint:
-                        tile.col += col_change
-                        tile.row += row_change
+        for tiles in self.objects.values():
+            for tile in tiles:
+                if type(tile) == Checkpoint:
+                    tile.col += col_change
+                    tile.row += row_change
+
+    def _shift_tiles(self, col_change, row_change):
+        masks = array("H", self.masks)
+        objects = {}
+        for row in range(self.HEIGHT):
+            for col in range(self.WIDTH):
+                index = row * self.WIDTH + col
+                from_col = col - col_change
+                from_row = row - row_change
+                if not self.out_of_bounds(from_col, from_row):
+                    index_from = from_row * self.WIDTH + from_col
+                else:
+                    index_from = index
+
+                masks[index] = self.masks[index_from]
+                if index_from in self.objects:
+                    objects[index] = list(self.objects[index_from])
+
+        self.masks = masks
+        self.objects = objects
+        self._rebuild_occupancy()
+        self._rebuild_dynamic()
+        self.version += 1
 
     # Note: these shift functions currently don't erase the very last row/col
     # so it just becomes a "copy".  This is fine for my purposes since all my
     # levels never directly touch edge.
+    def _shift(self, col_change, row_change):
+        # Emitted tiles are emitted again from scratch, since the edges
+        # are copied instead of shifted
+        emitting = self.emitting
+        self.unemit()
+        self._shift_tiles(col_change, row_change)
+        self._shift_location_tiles(col_change, row_change)
+        if emitting:
+            self.emit()
+
     def shift_left(self):
-        for col in range(0, self.WIDTH - 1):
-            for row in range(0, self.HEIGHT):
-                self.grid[col][row] = self.grid[col + 1][row]
-        self._shift_location_tiles(-1, 0)
+        self._shift(-1, 0)
 
     def shift_right(self):
-        for col in range(self.WIDTH - 1, 0, -1):
-            for row in range(0, self.HEIGHT):
-                self.grid[col][row] = self.grid[col - 1][row]
-        self._shift_location_tiles(1, 0)
+        self._shift(1, 0)
 
     def shift_up(self):
-        for row in range(0, self.HEIGHT - 1):
-            for col in range(0, self.WIDTH):
-                self.grid[col][row] = self.grid[col][row + 1]
-        self._shift_location_tiles(0, -1)
+        self._shift(0, -1)
 
     def shift_down(self):
-        for row in range(self.HEIGHT - 1, 0, -1):
-            for col in range(0, self.WIDTH):
-                self.grid[col][row] = self.grid[col][row - 1]
-        self._shift_location_tiles(0, 1)
+        self._shift(0, 1)
 
     def draw_silhouette(self, surf):
         for col in range(self.WIDTH):
@@ -635,183 +1086,400 @@ class Room:
                         color = (109, 112, 255)
                     pygame.draw.rect(surf, color, rect)
 
-    def draw_flicker_glow(self, surf, frame):
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self._flicker_bright_enough_for_gradient(col, row, frame):
-                    self.draw_glow_at(surf, col, row, frame)
-
-    def _flicker_bright_enough_for_gradient(self, col, row, frame):
-        if self.grid[col][row]:
-            tile = self.grid[col][row][0]
-            is_ray = type(tile) is CheckpointRay
-            if hasattr(tile, "flicker_sequence") or is_ray:
-                if is_ray:
-                    brightness = tile.checkpoint.flicker_sequence.brightness(frame)
-                else:
-                    brightness = tile.flicker_sequence.brightness(frame)
-                if brightness >= flicker.BRIGHT:
-                    return True
-
-        return False
-
-    def _stops_flicker_gradient(self, type_, col, row, frame):
-        if self.out_of_bounds(col, row):
-            return True
-
-        if self.grid[col][row]:
-            if type(self.grid[col][row][0]) is type_:
-                return self._flicker_bright_enough_for_gradient(col, row, frame)
-
-        return False
-
     shade_soft = pygame.Surface((TILE_W, TILE_H))
     shade_soft.fill(flicker.shade_color[flicker.SOFT])
     shade_medium = pygame.Surface((TILE_W, TILE_H))
     shade_medium.fill(flicker.shade_color[flicker.MEDIUM])
     shade_bright = pygame.Surface((TILE_W, TILE_H))
     shade_bright.fill(flicker.shade_color[flicker.BRIGHT])
-    checkpoint_shade_soft = graphics.load_image("checkpoint_shade_soft", 2)
-    checkpoint_shade_medium = graphics.load_image("checkpoint_shade_medium", 2)
-    checkpoint_shade_bright = graphics.load_image("checkpoint_shade_bright", 2)
-
-    def draw_flicker_tiles(self, surf, camera, frame):
-        # Draw all checkpoints first, so that the rays can be shaded later
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self.grid[col][row]:
-                    tile = self.grid[col][row][0]
-                    if type(tile) is Checkpoint:
-                        if tile.flicker_sequence.brightness(frame) > flicker.NONE:
-                            self.draw_tile_at(surf, camera, col, row)
+    # checkpoint_shade_soft, checkpoint_shade_medium and checkpoint_shade_bright
+    # are loaded by _load_images()
+
+    FLICKER_FRAMES = flicker.FlickerSequence.SEQUENCE_LENGTH + 1
+
+    def flicker_events(self):
+        """works out what changes on each frame of flickering in
+
+        returns a list with an item for each frame, holding
+            the spaces whose brightness changes on that frame,
+            (space, glow blits) for every space whose glow changes,
+            the areas covered by the glows that changed.
+        everything is at full brightness on the last frame.  the list is
+        only worked out again once the room's tiles change."""
+        if self._flicker_events_version == self.version:
+            return self._flicker_events
+
+        size = len(self.masks)
+        self._flicker_lists = [None] * size
+        for index, mask in enumerate(self.masks):
+            if mask:
+                tile = self.first_tile(index % self.WIDTH, index // self.WIDTH)
+                if type(tile) is CheckpointRay:
+                    self._flicker_lists[index] = tile.checkpoint.flicker_sequence.sequence_list
+                elif getattr(tile, "flicker_sequence", None):
+                    self._flicker_lists[index] = tile.flicker_sequence.sequence_list
+        flickering = [index for index in range(size) if self._flicker_lists[index]]
+
+        # Checkpoints, and the area they're drawn in along with their ray
+        self._flicker_checkpoints = {}
+        for index in flickering:
+            tile = self.first_tile(index % self.WIDTH, index // self.WIDTH)
+            if type(tile) is Checkpoint:
+                area = pygame.Rect(x_of(tile.col), y_of(tile.row), TILE_W, TILE_H)
+                ray_rect = self.checkpoint_ray_rect(tile)
+                if ray_rect:
+                    area.union_ip(ray_rect)
+                self._flicker_checkpoints[index] = area
+
+        # The type of each space's tile, if it's bright enough to glow
+        bright_types = [None] * size
+        brightnesses = [flicker.NONE] * size
+        glows = {}
+
+        self._flicker_events = []
+        for frame in range(self.FLICKER_FRAMES):
+            changed = []
+            toggled = []
+            for index in flickering:
+                brightness = self.flicker_brightness(index, frame)
+                if brightness == brightnesses[index]:
+                    continue
+
+                changed.append(index)
+                if (brightness >= flicker.BRIGHT) != (brightnesses[index] >= flicker.BRIGHT):
+                    toggled.append(index)
+                    if brightness >= flicker.BRIGHT:
+                        col = index % self.WIDTH
+                        bright_types[index] = type(self.first_tile(col, index // self.WIDTH))
+                    else:
+                        bright_types[index] = None
+                brightnesses[index] = brightness
+
+            glow_changes = []
+            glow_rects = []
+            for index in self._gradient_neighbours(toggled):
+                blits = []
+                if bright_types[index]:
+                    self._add_glow_blits(blits, index % self.WIDTH, index // self.WIDTH,
+                                         self.masks[index], bright_types)
+                old_blits = glows.get(index, [])
+                if blits != old_blits:
+                    glows[index] = blits
+                    glow_changes.append((index, blits))
+                    glow_rects.extend(_blit_rect(blit) for blit in old_blits + blits)
+
+            self._flicker_events.append((changed, glow_changes, glow_rects))
+
+        self._flicker_events_version = self.version
+        return self._flicker_events
+
+    def flicker_brightness(self, index, frame):
+        """returns the brightness of a space on a frame of flickering in
+
+        only works after flicker_events()"""
+        sequence_list = self._flicker_lists[index]
+        if not sequence_list:
+            return flicker.NONE
+        if frame < len(sequence_list):
+            return sequence_list[frame]
+        return flicker.FULL
+
+    def _gradient_neighbours(self, indexes):
+        """returns the spaces whose flickering glow could change when the
+        given spaces start or stop glowing, including the spaces themselves"""
+        max_search = max(self.MAX_SEARCH_PUNCH_BOX, self.MAX_SEARCH_CHECKPOINT,
+                         self.MAX_SEARCH_DEATHLOCK)
+        neighbours = set()
+        for index in indexes:
+            col = index % self.WIDTH
+            row = index // self.WIDTH
+            for c in range(max(0, col - max_search), min(self.WIDTH, col + max_search + 1)):
+                neighbours.add(row * self.WIDTH + c)
+            for r in range(max(0, row - max_search), min(self.HEIGHT, row + max_search + 1)):
+                neighbours.add(r * self.WIDTH + col)
+        return sorted(neighbours)
+
+    def draw_flicker(self, surf, camera, frame):
+        """draws the room as it looks on a frame of flickering in
+
+        the room is kept drawn on a surface of its own, so going forwards a
+        frame only redraws the spaces and glows that changed on that frame.
+        returns the areas that were redrawn."""
+        events = self.flicker_events()
+        frame = min(frame, self.FLICKER_FRAMES - 1)
+        offset = (int(camera.x), int(camera.y))
+
+        # Starts again from before the first frame, when everything is dark
+        if (self._flicker_surf is None or frame < self._flicker_frame
+                or offset != self._flicker_offset
+                or self._flicker_drawn_version != self.version):
+            if self._flicker_surf is None:
+                self._flicker_surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
+            self._flicker_surf.fill(const.BLACK)
+            self._flicker_frame = -1
+            self._flicker_offset = offset
+            self._flicker_drawn_version = self.version
+            self._flicker_glows = {}
+            self._update_flicker_glow_blits()
+
+        rects = []
+        while self._flicker_frame < frame:
+            self._flicker_frame += 1
+            changed, glow_changes, glow_rects = events[self._flicker_frame]
+
+            for index in changed:
+                # Tiles are drawn with the camera, but not their shades,
+                # checkpoints, or checkpoint rays
+                rect = pygame.Rect(x_of(index % self.WIDTH), y_of(index // self.WIDTH), TILE_W, TILE_H)
+                rects.append(rect)
+                if offset != (0, 0):
+                    rects.append(rect.move(-offset[0], -offset[1]))
+                if index in self._flicker_checkpoints:
+                    rects.append(self._flicker_checkpoints[index])
+
+            if glow_changes:
+                self._flicker_glows.update(glow_changes)
+                self._update_flicker_glow_blits()
+            rects.extend(glow_rects)
+
+        self._redraw_flicker(camera, rects)
+        surf.blit(self._flicker_surf, (0, 0))
+        return rects
+
+    def _update_flicker_glow_blits(self):
+        self._flicker_glow_blits = [blit for index in sorted(self._flicker_glows)
+                                    for blit in self._flicker_glows[index]]
+        self._flicker_glow_rects = [_blit_rect(blit) for blit in self._flicker_glow_blits]
+
+    FLICKER_BLOCK_W = TILE_W * 4
+    FLICKER_BLOCK_H = TILE_H * 4
+
+    def _flicker_blocks(self, rects):
+        """returns rects that cover the given rects with as few redraws as
+        possible
+
+        the screen is split into blocks, and each run of blocks in a row
+        that any of the rects touch is covered by one rect.  there can be
+        hundreds of small rects on a frame, and redrawing each one on its
+        own is slower than redrawing a little more than needed."""
+        screen = self._flicker_surf.get_rect()
+        blocks = set()
+        for rect in rects:
+            rect = rect.clip(screen)
+            if not rect:
+                continue
+            for block_row in range(rect.top // self.FLICKER_BLOCK_H,
+                                   (rect.bottom - 1) // self.FLICKER_BLOCK_H + 1):
+                for block_col in range(rect.left // self.FLICKER_BLOCK_W,
+                                       (rect.right - 1) // self.FLICKER_BLOCK_W + 1):
+                    blocks.add((block_row, block_col))
+
+        runs = []
+        for block_row, block_col in sorted(blocks):
+            x = block_col * self.FLICKER_BLOCK_W
+            y = block_row * self.FLICKER_BLOCK_H
+            if runs and runs[-1].y == y and runs[-1].right == x:
+                runs[-1].w += self.FLICKER_BLOCK_W
+            else:
+                runs.append(pygame.Rect(x, y, self.FLICKER_BLOCK_W, self.FLICKER_BLOCK_H))
+        return [run.clip(screen) for run in runs]
+
+    def _redraw_flicker(self, camera, rects):
+        """redraws parts of the flickering room, the same way the whole room
+        would be drawn: glows, then the silhouette, then the tiles"""
+        surf = self._flicker_surf
+        offset_x, offset_y = self._flicker_offset
+        frame = self._flicker_frame
+
+        checkpoints = [(index, area) for index, area in sorted(self._flicker_checkpoints.items())
+                       if self.flicker_brightness(index, frame) > flicker.NONE]
+
+        for rect in self._flicker_blocks(rects):
+            surf.set_clip(rect)
+            surf.fill(const.BLACK, rect)
+
+            glows = rect.collidelistall(self._flicker_glow_rects)
+            surf.blits([self._flicker_glow_blits[index] for index in glows], False)
+
+            # The spaces drawn in the rect, with or without the camera
+            first_col = max(0, col_at(rect.left + min(0, offset_x)))
+            last_col = min(self.WIDTH - 1, col_at(rect.right - 1 + max(0, offset_x)))
+            first_row = max(0, row_at(rect.top + min(0, offset_y)))
+            last_row = min(self.HEIGHT - 1, row_at(rect.bottom - 1 + max(0, offset_y)))
+
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    if self.has_solid(col, row):
+                        solid_rect = (x_of(col) - offset_x, y_of(row) - offset_y, TILE_W, TILE_H)
+                        pygame.draw.rect(surf, const.BLACK, solid_rect)
+
+            # Checkpoints are drawn first, so that the rays can be shaded later
+            for index, area in checkpoints:
+                if area.colliderect(rect):
+                    self.draw_tile_at(surf, camera, index % self.WIDTH, index // self.WIDTH)
+
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    index = row * self.WIDTH + col
+                    if self._flicker_lists[index]:
+                        brightness = self.flicker_brightness(index, frame)
+                        self._draw_flicker_tile(surf, camera, col, row, brightness)
+
+        surf.set_clip(None)
+
+    def _draw_flicker_tile(self, surf, camera, col, row, brightness):
+        """draws a tile other than a checkpoint, and shades any tile"""
+        tile = self.first_tile(col, row)
+        is_ray = type(tile) is CheckpointRay
+
+        if brightness != flicker.NONE and not type(tile) is Checkpoint and not is_ray:
+            self.draw_tile_at(surf, camera, col, row)
+        if brightness == flicker.SOFT:
+            shade = self.shade_soft
+        elif brightness == flicker.MEDIUM:
+            shade = self.shade_medium
+        elif brightness == flicker.BRIGHT:
+            shade = self.shade_bright
+        else:  # Skip FULL brightness, since no shade is drawn
+            return
 
-        # Draw other tiles and shade them all
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self.grid[col][row]:
-                    tile = self.grid[col][row][0]
-                    is_ray = type(tile) is CheckpointRay
-                    if hasattr(tile, "flicker_sequence") or is_ray:
-                        if is_ray:
-                            brightness = tile.checkpoint.flicker_sequence.brightness(frame)
-                        else:
-                            brightness = tile.flicker_sequence.brightness(frame)
-
-                        if brightness != flicker.NONE and not type(tile) is Checkpoint and not is_ray:
-                            self.draw_tile_at(surf, camera, col, row)
-                        if brightness == flicker.SOFT:
-                            shade = self.shade_soft
-                        elif brightness == flicker.MEDIUM:
-                            shade = self.shade_medium
-                        elif brightness == flicker.BRIGHT:
-                            shade = self.shade_bright
-                        else:  # Skip FULL brightness, since no shade is drawn
-                            continue
-
-                        if is_ray:
-                            if tile.orientation == const.HORIZ:
-                                pos = (x_of(col), y_of(row) + TILE_H // 3)
-                                rect = (0, 0, TILE_W, TILE_H // 3 + 2)
-                            else:
-                                pos = (x_of(col) + TILE_W // 3, y_of(row))
-                                rect = (0, 0, TILE_W // 3 + 2, TILE_H)
-                            surf.blit(shade, pos, rect, special_flags=pygame.BLEND_MULT)
-                        else:
-                            if type(tile) is Checkpoint:
-                                if brightness == flicker.SOFT:
-                                    shade = self.checkpoint_shade_soft
-                                elif brightness == flicker.MEDIUM:
-                                    shade = self.checkpoint_shade_medium
-                                elif brightness == flicker.BRIGHT:
-                                    shade = self.checkpoint_shade_bright
-                            pos = (x_of(col), y_of(row))
-                            surf.blit(shade, pos, special_flags=pygame.BLEND_MULT)
+        if is_ray:
+            if tile.orientation == const.HORIZ:
+                pos = (x_of(col), y_of(row) + TILE_H // 3)
+                rect = (0, 0, TILE_W, TILE_H // 3 + 2)
+            else:
+                pos = (x_of(col) + TILE_W // 3, y_of(row))
+                rect = (0, 0, TILE_W // 3 + 2, TILE_H)
+            surf.blit(shade, pos, rect, special_flags=pygame.BLEND_MULT)
+        else:
+            if type(tile) is Checkpoint:
+                if brightness == flicker.SOFT:
+                    shade = self.checkpoint_shade_soft
+                elif brightness == flicker.MEDIUM:
+                    shade = self.checkpoint_shade_medium
+                elif brightness == flicker.BRIGHT:
+                    shade = self.checkpoint_shade_bright
+            pos = (x_of(col), y_of(row))
+            surf.blit(shade, pos, special_flags=pygame.BLEND_MULT)
 
     glow_surf = pygame.Surface((const.SCRN_W, const.SCRN_H))
 
     def draw_glow(self, surf):
-        self.glow_surf.fill(const.BLACK)
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                self.draw_glow_at(self.glow_surf, col, row)
-        surf.blit(self.glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+        blits = self.glow_blits()
+
+        # Outside of the blits, the glow is black and adding it does nothing
+        bounds = self._glow_bounds
+        self.glow_surf.fill(const.BLACK, bounds)
+        self.glow_surf.blits(blits, False)
+        surf.blit(self.glow_surf, bounds.topleft, bounds, special_flags=pygame.BLEND_ADD)
+
+    def glow_blits(self):
+        """returns every blit that draws the glow of the whole room, as
+        arguments for Surface.blits()
+
+        they're all BLEND_MAX blits, so the order doesn't matter.  the list
+        is only worked out again once the room's tiles change."""
+        if self._glow_version != self.version:
+            self._glow_blits = []
+            for index, mask in enumerate(self.masks):
+                if mask & GLOW_MASK:
+                    self._add_glow_blits(self._glow_blits, index % self.WIDTH, index // self.WIDTH, mask)
+            self._glow_version = self.version
+
+            rects = [_blit_rect(blit) for blit in self._glow_blits]
+            screen = self.glow_surf.get_rect()
+            if rects:
+                self._glow_bounds = rects[0].unionall(rects).clip(screen)
+            else:
+                self._glow_bounds = pygame.Rect(0, 0, 0, 0)
 
-    def draw_glow_at(self, surf, col, row, flicker_frame=-1):
-        center_x = center_x_of(col)
-        center_y = center_y_of(row)
+        return self._glow_blits
 
-        if self.has_tile(PunchBox, col, row):
-            draw_glow_centered(surf, punch_box_glow, center_x, center_y)
-            if flicker_frame == -1:
-                self._draw_gradient_efficient(surf, PunchBox, punch_box_gradient, col, row)
-            else:
-                self._draw_flicker_gradient_efficient(surf, PunchBox, punch_box_gradient, col, row, flicker_frame)
-        elif self.has_tile(Deathlock, col, row):
-            draw_glow_centered(surf, deathlock_glow, center_x, center_y)
-            if flicker_frame == -1:
-                self._draw_gradient_efficient(surf, Deathlock, deathlock_gradient, col, row)
-            else:
-                self._draw_flicker_gradient_efficient(surf, Deathlock, deathlock_gradient, col, row, flicker_frame)
+    def draw_glow_at(self, surf, col, row):
+        blits = []
+        self._add_glow_blits(blits, col, row, self.masks[row * self.WIDTH + col])
+        surf.blits(blits, False)
 
-        elif self.has_tile(Checkpoint, col, row):
-            draw_glow_centered(surf, checkpoint_glow, center_x, center_y)
-            if flicker_frame == -1:
-                self._draw_gradient_efficient(surf, Checkpoint, checkpoint_gradient, col, row)
-            else:
-                self._draw_flicker_gradient_efficient(surf, Checkpoint, checkpoint_gradient, col, row, flicker_frame)
+    def _add_glow_blits(self, blits, col, row, mask, bright_types=None):
+        """adds the blits that draw the glow of a space to blits
 
-        elif self.has_tile(CheckpointRay, col, row):
+        bright_types is given while the room flickers in.  it holds the type
+        of each space's tile if it's bright enough to glow, or None if not"""
+        center_x = center_x_of(col)
+        center_y = center_y_of(row)
+
+        if mask & PunchBox.BIT:
+            blits.append(_centered_blit(punch_box_glow, center_x, center_y))
+            blits.append(self._gradient_blit(PunchBox, punch_box_gradient, col, row, bright_types))
+        elif mask & Deathlock.BIT:
+            blits.append(_centered_blit(deathlock_glow, center_x, center_y))
+            blits.append(self._gradient_blit(Deathlock, deathlock_gradient, col, row, bright_types))
+        elif mask & Checkpoint.BIT:
+            blits.append(_centered_blit(checkpoint_glow, center_x, center_y))
+            blits.append(self._gradient_blit(Checkpoint, checkpoint_gradient, col, row, bright_types))
+
+        elif mask & CheckpointRay.BIT:
             tile = self.get_tile(CheckpointRay, col, row)
             if tile.orientation == const.HORIZ:
-                draw_glow_centered(surf, checkpoint_ray_horiz_glow, center_x, center_y)
-                draw_glow_centered(surf, checkpoint_ray_horiz_gradient, center_x, center_y)
-
+                blits.append(_centered_blit(checkpoint_ray_horiz_glow, center_x, center_y))
+                blits.append(_centered_blit(checkpoint_ray_horiz_gradient, center_x, center_y))
             elif tile.orientation == const.VERT:
-                draw_glow_centered(surf, checkpoint_ray_vert_glow, center_x, center_y)
-                draw_glow_centered(surf, checkpoint_ray_vert_gradient, center_x, center_y)
+                blits.append(_centered_blit(checkpoint_ray_vert_glow, center_x, center_y))
+                blits.append(_centered_blit(checkpoint_ray_vert_gradient, center_x, center_y))
 
-        elif self.has_tile(PlayerSpawn, col, row):
-            draw_glow_centered(surf, player_spawn_glow, center_x, center_y)
-            draw_glow_centered(surf, player_spawn_gradient, center_x, center_y)
+        elif mask & PlayerSpawn.BIT:
+            blits.append(_centered_blit(player_spawn_glow, center_x, center_y))
+            blits.append(_centered_blit(player_spawn_gradient, center_x, center_y))
+
+    def _gradient_blit(self, type_, gradient, col, row, bright_types=None):
+        if bright_types is None:
+            return self._gradient_blit_efficient(type_, gradient, col, row)
+        return self._flicker_gradient_blit_efficient(type_, gradient, col, row, bright_types)
 
-    def _draw_gradient_efficient(self, surf, type_, gradient, col, row):
+    def _gradient_blit_efficient(self, type_, gradient, col, row):
+        """cuts off the gradient where it would overlap the gradients of
+        neighbouring tiles of the same type"""
         gradient_width = gradient.get_width()
         gradient_height = gradient.get_height()
         x_to_center = gradient_width // 2 - TILE_W // 2
         y_to_center = gradient_height // 2 - TILE_H // 2
-        x_remainder = gradient_width - x_to_center
-        y_remainder = gradient_height - y_to_center
 
-        if self.has_tile(type_, col - 1, row):
+        index = row * self.WIDTH + col
+        left = col > 0 and self.masks[index - 1] & type_.BIT
+        right = col < self.WIDTH - 1 and self.masks[index + 1] & type_.BIT
+        up = row > 0 and self.masks[index - self.WIDTH] & type_.BIT
+        down = row < self.HEIGHT - 1 and self.masks[index + self.WIDTH] & type_.BIT
+
+        if left:
             x = x_of(col)
             slice_x = x_to_center
-            slice_width = x_remainder
+            slice_width = gradient_width - x_to_center
         else:
             x = x_of(col) - x_to_center
             slice_x = 0
             slice_width = gradient_width
-        if self.has_tile(type_, col + 1, row):
+        if right:
             slice_width -= x_to_center
 
-        if self.has_tile(type_, col, row - 1):
+        if up:
             y = y_of(row)
             slice_y = y_to_center
-            slice_height = y_remainder
+            slice_height = gradient_height - y_to_center
         else:
             y = y_of(row) - y_to_center
             slice_y = 0
             slice_height = gradient_height
-        if self.has_tile(type_, col, row + 1):
+        if down:
             slice_height -= y_to_center
 
         rect = (slice_x, slice_y, slice_width, slice_height)
-        surf.blit(gradient, (x, y), rect, special_flags=pygame.BLEND_MAX)
+        return gradient, (x, y), rect, pygame.BLEND_MAX
 
-    MAX_SEARCH_PUNCH_BOX = (punch_box_gradient.get_width() // TILE_W - 1) // 2 + 1
-    MAX_SEARCH_CHECKPOINT = (checkpoint_gradient.get_width() // TILE_W - 1) // 2 + 1
-    MAX_SEARCH_DEATHLOCK = (deathlock_gradient.get_width() // TILE_W - 1) // 2 + 1
+    # MAX_SEARCH_PUNCH_BOX, MAX_SEARCH_CHECKPOINT and MAX_SEARCH_DEATHLOCK
+    # are set by _load_images(), since they depend on the gradients' sizes
 
-    def _draw_flicker_gradient_efficient(self, surf, type_, gradient, col, row, frame):
+    def _flicker_gradient_blit_efficient(self, type_, gradient, col, row, bright_types):
+        """cuts off the gradient at the nearest glowing tiles of the same type"""
         if type_ is PunchBox:
             max_search = self.MAX_SEARCH_PUNCH_BOX
         elif type_ is Checkpoint:
@@ -822,27 +1490,32 @@ class Room:
         x_to_center = gradient.get_width() // 2 - TILE_W // 2
         y_to_center = gradient.get_height() // 2 - TILE_H // 2
 
+        def stops_gradient(col, row):
+            if self.out_of_bounds(col, row):
+                return True
+            return bright_types[row * self.WIDTH + col] is type_
+
         space_left = 0
         for c in range(1, max_search + 1):
-            if self._stops_flicker_gradient(type_, col - c, row, frame):
+            if stops_gradient(col - c, row):
                 break
             space_left += 1
 
         space_right = 0
         for c in range(1, max_search + 1):
-            if self._stops_flicker_gradient(type_, col + c, row, frame):
+            if stops_gradient(col + c, row):
                 break
             space_right += 1
 
         space_up = 0
         for r in range(1, max_search + 1):
-            if self._stops_flicker_gradient(type_, col, row - r, frame):
+            if stops_gradient(col, row - r):
                 break
             space_up += 1
 
         space_down = 0
         for r in range(1, max_search + 1):
-            if self._stops_flicker_gradient(type_, col, row + r, frame):
+            if stops_gradient(col, row + r):
                 break
             space_down += 1
 
@@ -854,19 +1527,34 @@ class Room:
         slice_height = (space_up + space_down + 1) * TILE_H
         rect = (slice_x, slice_y, slice_width, slice_height)
 
-        surf.blit(gradient, (x, y), rect, special_flags=pygame.BLEND_MAX)
+        return gradient, (x, y), rect, pygame.BLEND_MAX
 
     def draw_goal_glow(self, surf):
-        glow_surf = pygame.Surface(surf.get_size())
+        gradient_w = player_goal_gradient.get_width()
+        gradient_h = player_goal_gradient.get_height()
+        positions = []
         for col in range(self.player_goal.col - 1, self.player_goal.col + 2):
             for row in range(self.player_goal.row - 1, self.player_goal.row + 2):
                 center_x = center_x_of(col)
                 center_y = center_y_of(row)
 
-                gradient_x = int(center_x - (player_goal_gradient.get_width() / 2))
-                gradient_y = int(center_y - (player_goal_gradient.get_height() / 2))
-                glow_surf.blit(player_goal_gradient, (gradient_x, gradient_y), special_flags=pygame.BLEND_MAX)
-        surf.blit(glow_surf, (0, 0), special_flags=pygame.BLEND_ADD)
+                gradient_x = int(center_x - (gradient_w / 2))
+                gradient_y = int(center_y - (gradient_h / 2))
+                positions.append((gradient_x, gradient_y))
+
+        # Only the area the gradients cover needs a glow surface
+        left = min(x for x, y in positions)
+        top = min(y for x, y in positions)
+        right = max(x for x, y in positions) + gradient_w
+        bottom = max(y for x, y in positions) + gradient_h
+        bounds = pygame.Rect(left, top, right - left, bottom - top).clip(surf.get_rect())
+        if not bounds:
+            return
+
+        glow_surf = pygame.Surface(bounds.size)
+        for x, y in positions:
+            glow_surf.blit(player_goal_gradient, (x - bounds.x, y - bounds.y), special_flags=pygame.BLEND_MAX)
+        surf.blit(glow_surf, bounds.topleft, special_flags=pygame.BLEND_ADD)
 
     def draw_static(self, surf, camera):
         """draws the entire stage"""
@@ -877,26 +1565,52 @@ class Room:
     def draw_tiles(self, surf, camera):
         for row in range(self.HEIGHT):
             for col in range(self.WIDTH):
-                if self.grid[col][row] and self.grid[col][row][0].DRAWN_STATICALLY:
+                tile = self.first_tile(col, row)
+                if tile and tile.DRAWN_STATICALLY:
                     self.draw_tile_at(surf, camera, col, row)
 
     def draw_dynamic(self, surf, camera, player_dead, original_spawn):
-        for row in range(self.HEIGHT):
-            for col in range(self.WIDTH):
-                if self.grid[col][row] and not self.grid[col][row][0].DRAWN_STATICALLY:
-                    self.draw_tile_at(surf, camera, col, row,
-                                      player_dead, original_spawn)
+        """returns the rects of the tiles that were drawn"""
+        rects = []
+        for index in sorted(self.dynamic):
+            row, col = divmod(index, self.WIDTH)
+            # Spaces are drawn as their first tile in TILE_ORDER, which
+            # could be one that's drawn statically
+            if not self.first_tile(col, row).DRAWN_STATICALLY:
+                self.draw_tile_at(surf, camera, col, row,
+                                  player_dead, original_spawn)
+                x = col * TILE_W - int(camera.x)
+                y = row * TILE_H - int(camera.y)
+                rects.append(pygame.Rect(x, y, TILE_W, TILE_H))
+        return rects
 
     def draw_checkpoint_and_ray(self, surf, checkpoint):
+        x = x_of(checkpoint.col)
+        y = y_of(checkpoint.row)
+        if checkpoint.active:
+            surf.blit(checkpoint_activated, (x, y))
+        else:
+            surf.blit(checkpoint_deactivated, (x, y))
+
+        ray_rect = self.checkpoint_ray_rect(checkpoint)
+        if not ray_rect:
+            return
+
+        if checkpoint.active:
+            color = (81, 255, 113)
+        else:
+            color = (71, 158, 71)
+
+        pygame.draw.rect(surf, color, ray_rect)
+
+    def checkpoint_ray_rect(self, checkpoint):
+        """returns the rect a checkpoint's ray is drawn in, or None if the
+        ray has no length"""
         col = checkpoint.col
         row = checkpoint.row
 
         x = x_of(col)
         y = y_of(row)
-        if checkpoint.active:
-            surf.blit(checkpoint_activated, (x, y))
-        else:
-            surf.blit(checkpoint_deactivated, (x, y))
 
         if checkpoint.direction == const.LEFT:
             stop_col = col - 1
@@ -905,7 +1619,7 @@ class Room:
             stop_col += 1
 
             if stop_col == col:
-                return
+                return None
 
             x = x_of(stop_col)
             y += TILE_H // 3
@@ -919,7 +1633,7 @@ class Room:
             stop_col -= 1
 
             if stop_col == col:
-                return
+                return None
 
             x += TILE_W
             y += TILE_H // 3
@@ -933,7 +1647,7 @@ class Room:
             stop_row += 1
 
             if stop_row == row:
-                return
+                return None
 
             x += TILE_W // 3
             y = y_of(stop_row)
@@ -947,19 +1661,14 @@ class Room:
             stop_row -= 1
 
             if stop_row == row:
-                return
+                return None
 
             x += TILE_W // 3
             y += TILE_H
             width = TILE_W // 3 + 2
             height = (stop_row - row) * TILE_H
 
-        if checkpoint.active:
-            color = (81, 255, 113)
-        else:
-            color = (71, 158, 71)
-
-        pygame.draw.rect(surf, color, (x, y, width, height))
+        return pygame.Rect(x, y, width, height)
 
     def update_goal_sound(self, player, is_transitioning):
         if is_transitioning:
@@ -1002,21 +1711,21 @@ class Room:
         elif tile_id == 2:
             tile = Deathlock()
         elif tile_id == 3:
-            tile = PunchBox(const.LEFT)
+            tile = PunchBox(const.LEFT, self.random)
         elif tile_id == 4:
-            tile = PunchBox(const.UP)
+            tile = PunchBox(const.UP, self.random)
         elif tile_id == 5:
-            tile = PunchBox(const.RIGHT)
+            tile = PunchBox(const.RIGHT, self.random)
         elif tile_id == 6:
-            tile = PunchBox(const.DOWN)
+            tile = PunchBox(const.DOWN, self.random)
         elif tile_id == 7:
-            tile = Checkpoint(const.LEFT, col, row)
+            tile = Checkpoint(const.LEFT, col, row, self.random)
         elif tile_id == 8:
-            tile = Checkpoint(const.UP, col, row)
+            tile = Checkpoint(const.UP, col, row, self.random)
         elif tile_id == 9:
-            tile = Checkpoint(const.RIGHT, col, row)
+            tile = Checkpoint(const.RIGHT, col, row, self.random)
         elif tile_id == 10:
-            tile = Checkpoint(const.DOWN, col, row)
+            tile = Checkpoint(const.DOWN, col, row, self.random)
         elif tile_id == 11:
             self.move_player_spawn(col, row)
             return
@@ -1028,42 +1737,164 @@ class Room:
 
         self.add_tile(col, row, tile)
 
+    def _level_data(self):
+        ids = bytearray(self.WIDTH * self.HEIGHT)
+        for row in range(self.HEIGHT):
+            for col in range(self.WIDTH):
+                ids[row * self.WIDTH + col] = id_of(self.tiles_at(col, row))
+
+        return levelfile.LevelData(self.WIDTH, self.HEIGHT, self.text_x,
+                                   self.text_y, self.heart_direction, ids)
+
+    def content_key(self):
+        """returns the tiles as they're saved, which are the same for any
+        two rooms with the same tiles, whichever object they're in"""
+        if self._content_key_version != self.version:
+            self._content_key = bytes(self._level_data().ids)
+            self._content_key_version = self.version
+        return self._content_key
+
     def save(self):
+        level = self._level_data()
+
         strings = ["%i %i %i" % (self.text_x, self.text_y, self.heart_direction)]
         for row in range(self.HEIGHT):
-            row_of_ids = []
-            for col in range(self.WIDTH):
-                tiles = self.tiles_at(col, row)
-                id = id_of(tiles)
-                row_of_ids.append(str(id))
-            strings.append(" ".join(row_of_ids))
+            row_of_ids = level.ids[row * self.WIDTH:(row + 1) * self.WIDTH]
+            strings.append(" ".join(str(id) for id in row_of_ids))
         data = "\n".join(strings)
 
         with open(level_path(self.name), "w") as file:
             file.write(data)
+        levelfile.write_binary(self.name, level)
 
-    def load(self):
-        self.clear()
+    def _source_path(self):
+        """returns the file this room is loaded from, or None if there isn't one
 
+        text levels are preferred over binary ones, since those are the ones
+        that get edited by hand"""
         path = level_path(self.name)
-        if not os.path.exists(path):
-            return
+        if os.path.exists(path):
+            return path
 
+        path = levelfile.binary_path(self.name)
+        if os.path.exists(path):
+            return path
+
+        return None
+
+    def _read_text(self, path):
         with open(path, "r") as file:
             data = file.read()
 
         lines = data.split("\n")
         text_position = lines[0].split(" ")
-        self.text_x = int(text_position[0])
-        self.text_y = int(text_position[1])
-        self.heart_direction = int(text_position[2])
-
-        level_rows = lines[1:]
+        level = levelfile.LevelData(self.WIDTH, self.HEIGHT,
+                                    int(text_position[0]), int(text_position[1]),
+                                    int(text_position[2]))
 
-        for row_index, row in enumerate(level_rows):
+        ids = bytearray(level.ids)
+        for row_index, row in enumerate(lines[1:]):
             for col_index, tile in enumerate(row.split(" ")):
-                self.place_tile_from_id(col_index, row_index, int(tile))
+                tile_id = int(tile)
+                if self.out_of_bounds(col_index, row_index):
+                    print("load() found a tile out of bounds")
+                    continue
+                ids[row_index * self.WIDTH + col_index] = tile_id
+        level.ids = ids
+
+        return level
+
+    def _place_level(self, level):
+        """places the tiles of a level, without any of the emitted tiles"""
+        self.text_x = level.text_x
+        self.text_y = level.text_y
+        self.heart_direction = level.heart_direction
+
+        for index, tile_id in enumerate(level.ids):
+            # Walls are shared, so they don't need an object
+            if tile_id == 1:
+                self.masks[index] |= Wall.BIT
+            elif tile_id:
+                self.place_tile_from_id(index % self.WIDTH, index // self.WIDTH, tile_id)
+
+        self._rebuild_occupancy()
+
+    def _compile(self, level):
+        """records the deathlock groups and emitted tiles of a loaded room"""
+        level.groups = array("H", self.deathlock_components)
+        level.emissions = []
+
+        for index in sorted(self.objects):
+            for tile in self.objects[index]:
+                if type(tile) is PunchZone:
+                    emission = (levelfile.PUNCH_ZONE, index, 0, tile.direction)
+                    level.emissions.append(emission)
+
+                elif type(tile) is CheckpointRay:
+                    emission = (levelfile.CHECKPOINT_RAY, index, tile.source, tile.orientation)
+                    level.emissions.append(emission)
+
+        for index, mask in enumerate(self.masks):
+            if mask & PlayerGoalZone.BIT:
+                level.emissions.append((levelfile.PLAYER_GOAL_ZONE, index, 0, 0))
+
+        return level
+
+    def _load_compiled(self, level):
+        self._place_level(level)
+
+        # Groups are numbered the same way _label_deathlock_components()
+        # numbers them, so rooms get the same random flickers either way
+        self.deathlock_components = array("H", level.groups)
+        self._initiate_deathlock_flicker()
+
+        goal = self.player_goal.row * self.WIDTH + self.player_goal.col
+        for kind, index, source, direction in level.emissions:
+            col = index % self.WIDTH
+            row = index // self.WIDTH
+            if kind == levelfile.PUNCH_ZONE:
+                col_step, row_step = direction_steps[direction]
+                source = index - row_step * self.WIDTH - col_step
+                tile = PunchZone(direction, source)
+            elif kind == levelfile.CHECKPOINT_RAY:
+                checkpoint = self.get_tile(Checkpoint, source % self.WIDTH,
+                                           source // self.WIDTH)
+                tile = CheckpointRay(checkpoint, direction, source)
+            elif kind == levelfile.PLAYER_GOAL_ZONE:
+                tile = shared_tiles[PlayerGoalZone]
+                source = goal
+            else:
+                continue
+            self._add_emitted(source, col, row, tile)
+        self.emitting = True
 
+        self._record_unique_flickers()
+
+    def load(self):
+        self.clear()
+        self.random.seed(self.name)
+
+        path = self._source_path()
+        if not path:
+            return
+
+        level = levelfile.read_compiled(self.name, path)
+        if level and (level.width, level.height) == (self.WIDTH, self.HEIGHT):
+            self._load_compiled(level)
+            return
+
+        if path == level_path(self.name):
+            level = self._read_text(path)
+        else:
+            level = levelfile.read_binary(self.name)
+            if not level or (level.width, level.height) != (self.WIDTH, self.HEIGHT):
+                print("load() couldn't read %s" % path)
+                return
+
+        self._place_level(level)
+        self._label_deathlock_components()
         self._initiate_deathlock_flicker()
         self._record_unique_flickers()
         self.emit()
+
+        levelfile.write_compiled(self.name, path, self._compile(level))
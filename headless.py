@@ -0,0 +1,168 @@
+"""Runs the game logic without a window, sound or frame cap.
+
+The simulation steps as fast as it can, which makes it useful for checking
+that levels still play the same after a change, or for tuning.  From the
+command line, it plays levels with random inputs and prints where the
+player ended up:
+
+    python headless.py --frames 600 --seed 3 Intro1 Intro2
+
+With no level names, every level is played in the order the game uses.
+"""
+import os
+
+# These have to be set before pygame is initialized
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import sound
+
+import argparse
+import random
+import time
+
+import events
+import camera
+import punchers
+import sequences
+import entities.player
+
+sound.sfx_muted = True
+
+
+class Simulation:
+    """plays through a list of levels the way game_update() does, except
+    the keys held each frame are given to step()
+
+    only one simulation can run at a time, since punchers and the keyboard
+    state are shared by the whole program.  levels are moved through by a
+    sequences.Sequence, without prefetching.  level transitions are only
+    visual, so they take no frames here."""
+
+    def __init__(self, level_names, level_num=0):
+        self.level_names = level_names
+        self.sequence = sequences.Sequence(level_names, level_num, prefetch_depth=0)
+
+        self.camera = camera.Camera()
+        self.player = entities.player.Player(self.room, self.camera)
+        punchers.punchers = []
+
+        self.frame = 0  # frames since the simulation started
+        self.level_frame = 0  # frames since the current level started
+        self.level_frames = []  # frames taken to beat each level
+        self.done = False  # whether the last level has been beaten
+
+        self._held_keys = frozenset()
+
+    @property
+    def level_num(self):
+        return self.sequence.level_num
+
+    @property
+    def room(self):
+        return self.sequence.current
+
+    def step(self, held_keys=(), pressed_keys=None):
+        """simulates one frame, with the given keys held down
+
+        by default, a key counts as pressed if it wasn't held last frame"""
+        held_keys = frozenset(held_keys)
+        if pressed_keys is None:
+            pressed_keys = held_keys - self._held_keys
+        events.set_state(held_keys, pressed_keys, self._held_keys - held_keys)
+        self._held_keys = held_keys
+
+        self.player.update()
+        punchers.update()
+        self.camera.update()
+
+        if self.player.hard_respawn_key.is_pressed:
+            self.player.hard_respawn()
+
+        self.frame += 1
+        self.level_frame += 1
+
+        if self.player.touching_goal:
+            self._next_level()
+
+    def run(self, inputs, max_frames=-1):
+        """steps once for every set of held keys in inputs, stopping early if
+        the last level is beaten or max_frames is reached
+
+        returns the amount of frames that were stepped"""
+        frames = 0
+        for held_keys in inputs:
+            if self.done or frames == max_frames:
+                break
+            self.step(held_keys)
+            frames += 1
+
+        return frames
+
+    def _next_level(self):
+        self.level_frames.append(self.level_frame)
+        self.level_frame = 0
+
+        if self.level_num == len(self.level_names) - 1:
+            self.done = True
+            return
+
+        # game.py plays a transition between these
+        self.sequence.leave_level(self.player)
+        self.sequence.next_level()
+        self.sequence.enter_level(self.player)
+
+
+def random_inputs(seed):
+    """an endless stream of randomly held keys, for mashing through levels"""
+    rng = random.Random(seed)
+    player = entities.player.Player
+    while True:
+        held_keys = []
+
+        value = rng.random()
+        if value < 0.45:
+            held_keys.append(player.left_key.list[0])
+        elif value < 0.9:
+            held_keys.append(player.right_key.list[0])
+
+        if rng.random() < 0.3:
+            held_keys.append(player.jump_key.list[0])
+        if rng.random() < 0.02:
+            held_keys.append(player.respawn_key.list[0])
+
+        yield held_keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays levels without a window.")
+    parser.add_argument("levels", nargs="*", help="names of the levels to play")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="frames to play each level for")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the random inputs")
+    args = parser.parse_args()
+
+    level_names = args.levels or sequences.level_names
+
+    total_frames = 0
+    start_time = time.perf_counter()
+    for level_name in level_names:
+        simulation = Simulation([level_name])
+        frames = simulation.run(random_inputs(args.seed), args.frames)
+        total_frames += frames
+
+        player = simulation.player
+        if simulation.done:
+            result = "beaten on frame %i" % simulation.level_frames[0]
+        else:
+            result = "ended at (%i, %i)" % (player.x, player.y)
+        print("%s: %s" % (level_name, result))
+
+    seconds = time.perf_counter() - start_time
+    print("%i frames in %.2f seconds (%i frames per second)"
+          % (total_frames, seconds, total_frames / max(seconds, 0.000001)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Binary level files and the compiled level cache.
+
+A binary level holds the same information as a text level: a header with
+the level text position, followed by one byte per tile id in row major
+order.  The ids are the ones from grid.id_of().
+
+A compiled level is a binary level that has already been through Room's
+load steps.  Along with the tile ids, it stores which deathlock group each
+space belongs to and every tile that emit() placed.  Every compiled level
+is kept in one pack file in levels/.cache, with an index of where each
+level is in it.  The pack is memory mapped once, the first time a level is
+loaded, and every level after that is read out of the same map.  A
+compiled level is thrown away as soon as its source file changes.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+CACHE_FOLDER = os.path.join("levels", ".cache")
+PACK_PATH = os.path.join(CACHE_FOLDER, "levels.pack")
+
+# Bump COMPILED_VERSION whenever the way Room loads or emits changes, so
+# that old compiled levels stop being used
+LEVEL_MAGIC = b"DLKL"
+LEVEL_VERSION = 1
+COMPILED_MAGIC = b"DLKC"
+COMPILED_VERSION = 1
+PACK_MAGIC = b"DLKP"
+PACK_VERSION = 1
+
+# magic, version, width, height, text_x, text_y, heart_direction
+LEVEL_HEADER = struct.Struct("<4sBBBhhB")
+# magic, version, source mtime, source size, source sha1
+COMPILED_HEADER = struct.Struct("<4sBqq20s")
+EMISSION_COUNT = struct.Struct("<I")
+# kind, index, source index, direction or orientation
+EMISSION = struct.Struct("<BHHB")
+# magic, version, level count
+PACK_HEADER = struct.Struct("<4sBI")
+# Each level in the pack's index is the length of its name, the name, and
+# the offset and size of its compiled level
+NAME_LENGTH = struct.Struct("<B")
+LOCATION = struct.Struct("<II")
+
+# Kinds of emitted tiles
+PUNCH_ZONE = 1
+CHECKPOINT_RAY = 2
+PLAYER_GOAL_ZONE = 3
+
+
+class LevelData:
+    def __init__(self, width, height, text_x=0, text_y=0, heart_direction=0, ids=None):
+        """ids holds one tile id per space, in row major order."""
+        self.width = width
+        self.height = height
+        self.text_x = text_x
+        self.text_y = text_y
+        self.heart_direction = heart_direction
+        if ids is None:
+            ids = bytes(width * height)
+        self.ids = ids
+
+        # Only filled in for compiled levels
+        self.groups = None
+        self.emissions = None
+
+
+# The pack is mapped once and shared between threads, since rooms are also
+# loaded on the prefetcher's
+_pack_lock = threading.Lock()
+_pack = None  # the memory map of the pack
+_pack_index = {}  # level name -> (offset, size) in the pack
+
+
+def binary_path(name):
+    return os.path.join("levels", name + ".bin")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def pack_level(level):
+    header = LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, level.width, level.height,
+                               level.text_x, level.text_y, level.heart_direction)
+    return header + bytes(level.ids)
+
+
+def unpack_level(buffer, offset=0):
+    """Returns (level, offset after the level), or (None, offset) if the
+    buffer doesn't start with a binary level."""
+    if len(buffer) - offset < LEVEL_HEADER.size:
+        return None, offset
+
+    magic, version, width, height, text_x, text_y, heart_direction = \
+        LEVEL_HEADER.unpack_from(buffer, offset)
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+        return None, offset
+    offset += LEVEL_HEADER.size
+
+    size = width * height
+    if len(buffer) - offset < size:
+        return None, offset
+    ids = bytes(buffer[offset:offset + size])
+    offset += size
+
+    level = LevelData(width, height, text_x, text_y, heart_direction, ids)
+    return level, offset
+
+
+def _map_file(path):
+    """Returns a read only memory map of a file, or None if it can't be read."""
+    try:
+        with open(path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def read_binary(name):
+    buffer = _map_file(binary_path(name))
+    if buffer is None:
+        return None
+
+    with buffer:
+        level, _ = unpack_level(buffer)
+    return level
+
+
+def write_binary(name, level):
+    with open(binary_path(name), "wb") as file:
+        file.write(pack_level(level))
+
+
+def _source_stamp(path):
+    """Returns the (mtime, size) of a source file, or None if it's missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _source_digest(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).digest()
+
+
+def _read_index(buffer):
+    """Returns {level name: (offset, size)} for a pack, or {} if the buffer
+    isn't one."""
+    if len(buffer) < PACK_HEADER.size:
+        return {}
+    magic, version, count = PACK_HEADER.unpack_from(buffer)
+    if magic != PACK_MAGIC or version != PACK_VERSION:
+        return {}
+
+    index = {}
+    offset = PACK_HEADER.size
+    try:
+        for _ in range(count):
+            length, = NAME_LENGTH.unpack_from(buffer, offset)
+            offset += NAME_LENGTH.size
+            name = bytes(buffer[offset:offset + length]).decode("utf-8")
+            offset += length
+            index[name] = LOCATION.unpack_from(buffer, offset)
+            offset += LOCATION.size
+    except (struct.error, UnicodeDecodeError):
+        return {}
+    return index
+
+
+def _map_pack():
+    """Maps the pack if it isn't mapped yet.  Call with _pack_lock held."""
+    global _pack, _pack_index
+    if _pack is None:
+        _pack = _map_file(PACK_PATH)
+        if _pack is not None:
+            _pack_index = _read_index(_pack)
+
+
+def _unmap_pack():
+    """Call with _pack_lock held."""
+    global _pack, _pack_index
+    if _pack is not None:
+        _pack.close()
+    _pack = None
+    _pack_index = {}
+
+
+def _unpack_compiled(buffer, source, stamp):
+    if len(buffer) < COMPILED_HEADER.size:
+        return None
+    magic, version, mtime, size, digest = COMPILED_HEADER.unpack_from(buffer)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        return None
+    if (mtime, size) != stamp and digest != _source_digest(source):
+        return None
+
+    level, offset = unpack_level(buffer, COMPILED_HEADER.size)
+    if level is None:
+        return None
+
+    size = level.width * level.height
+    groups = array("H")
+    groups.frombytes(buffer[offset:offset + size * groups.itemsize])
+    if len(groups) != size:
+        return None
+    level.groups = _little_endian(groups)
+    offset += size * groups.itemsize
+
+    try:
+        count, = EMISSION_COUNT.unpack_from(buffer, offset)
+        offset += EMISSION_COUNT.size
+        level.emissions = list(EMISSION.iter_unpack(
+            buffer[offset:offset + count * EMISSION.size]))
+    except struct.error:
+        return None
+
+    return level
+
+
+def read_compiled(name, source):
+    """Returns the compiled version of a level, or None if there isn't an
+    up to date one.
+
+    source is the path of the file the level was compiled from.  The
+    compiled level is used if the source's mtime and size are unchanged, or
+    if its contents are (a fresh checkout changes mtimes, but not contents).
+    """
+    stamp = _source_stamp(source)
+    if stamp is None:
+        return None
+
+    with _pack_lock:
+        _map_pack()
+        if name not in _pack_index:
+            return None
+        offset, size = _pack_index[name]
+        buffer = _pack[offset:offset + size]
+
+    return _unpack_compiled(buffer, source, stamp)
+
+
+def _write_pack(levels):
+    """Writes {level name: compiled level bytes} as the pack.  Call with
+    _pack_lock held."""
+    names = sorted(levels)
+    index_size = PACK_HEADER.size
+    for name in names:
+        index_size += NAME_LENGTH.size + len(name.encode("utf-8")) + LOCATION.size
+
+    data = [PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(names))]
+    offset = index_size
+    for name in names:
+        encoded = name.encode("utf-8")
+        data.append(NAME_LENGTH.pack(len(encoded)) + encoded)
+        data.append(LOCATION.pack(offset, len(levels[name])))
+        offset += len(levels[name])
+    data.extend(levels[name] for name in names)
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+
+    # Written to a temporary file first, so nothing ever reads half a file.
+    # The map is closed first, since a mapped file can't be replaced on
+    # every platform.
+    temporary_path = "%s.%i.%i.tmp" % (PACK_PATH, os.getpid(), threading.get_ident())
+    with open(temporary_path, "wb") as file:
+        file.write(b"".join(data))
+    _unmap_pack()
+    os.replace(temporary_path, PACK_PATH)
+
+
+def write_compiled(name, source, level):
+    """Saves a compiled level into the pack.  Failing to write it is not an
+    error, it just means the level gets compiled again next time."""
+    stamp = _source_stamp(source)
+    if stamp is None:
+        return
+
+    try:
+        header = COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION,
+                                      stamp[0], stamp[1], _source_digest(source))
+        data = [header, pack_level(level),
+                _little_endian(level.groups).tobytes(),
+                EMISSION_COUNT.pack(len(level.emissions))]
+        data.extend(EMISSION.pack(*emission) for emission in level.emissions)
+
+        with _pack_lock:
+            # The levels are read from the file again rather than the map,
+            # in case another process wrote some since it was mapped
+            levels = {}
+            buffer = _map_file(PACK_PATH)
+            if buffer is not None:
+                with buffer:
+                    for other, (offset, size) in _read_index(buffer).items():
+                        levels[other] = buffer[offset:offset + size]
+            levels[name] = b"".join(data)
+            _write_pack(levels)
+    except OSError:
+        pass
@@ -3,6 +3,7 @@ import sound
 import os
 
 import pygame
+import assets
 import constants as const
 import graphics
 import events
@@ -21,18 +22,24 @@ rebind_order = [entities.player.Player.left_key,
 rebind_descriptions = ["Left", "Right", "Jump", "Action", "Reset level", "Pause"]
 
 
-m3x6 = pygame.font.Font(os.path.join("text", "m3x6.ttf"), 64)
+main_menu_music = sound.load("menu_music", sound.MUSIC)
 
-main_menu_music = sound.load("menu_music")
-
-start_sound = sound.load("game_start")
+start_sound = sound.load("game_start", sound.UI, sound.HIGH_PRIORITY)
 start_sound.set_volume(0.4)
-select_sound = sound.load_numbers("menu%i", 3)
+select_sound = sound.load_numbers("menu%i", 3, sound.UI)
 select_sound.set_volumes(0.35)
 
-title = graphics.load_image("title", 1)
 
-title_shade = pygame.Surface(title.get_size())
+@assets.loader
+def _load_assets():
+    global m3x6, title, title_shade
+    m3x6 = pygame.font.Font(os.path.join("text", "m3x6.ttf"), 64)
+
+    title = graphics.load_image("title", 1)
+    title_shade = pygame.Surface(title.get_size())
+
+    MainMenu.TITLE_X = const.SCRN_W // 2 - title.get_width() // 2
+    Credits.TEXT_HEIGHT = m3x6.get_height()
 
 
 def render_menu_text(surf, string, y, brightness):
@@ -43,7 +50,7 @@ def render_menu_text(surf, string, y, brightness):
 
 
 class MainMenu:
-    TITLE_X = const.SCRN_W // 2 - title.get_width() // 2
+    # TITLE_X is set once the title is loaded
     TITLE_Y = 100
 
     KEYBIND_TEXT_Y = 190
@@ -227,7 +234,7 @@ class Credits:
         ("a game by winterbeak",),
         ("",)
     ]
-    TEXT_HEIGHT = m3x6.get_height()
+    # TEXT_HEIGHT is set once the font is loaded
 
     START_DELAY = 240
 
@@ -0,0 +1,161 @@
+"""Times each phase of the main loop.
+
+Phases are timed with
+
+    with profiler.phase("draw_level"):
+        draw_level()
+
+and end_frame() is called once per frame.  A phase can be timed inside
+another, like draw_dynamic inside draw_level.  Its time is then taken off
+the outer phase's, so every phase only counts its own time and a frame's
+phases never add up to more than the frame took.
+
+draw() shows the 50th, 95th and 99th percentile of each phase over the last WINDOW frames, through debug,
+along with how many sounds each SoundSet is playing and how each
+category's channels have been used.
+A trace of every frame can also be written to a CSV file.
+
+Nothing is timed while the profiler is disabled.
+"""
+import collections
+import csv
+import time
+
+import debug
+import sound
+
+WINDOW = 300  # the amount of frames the percentiles are taken over
+PERCENTILES = (50, 95, 99)
+
+enabled = False
+
+_times = collections.OrderedDict()  # phase name -> deque of recent times
+_frame = {}  # phase name -> time spent in it this frame, in milliseconds
+_frame_count = 0
+_running = []  # the timers of the phases being timed, innermost last
+
+_trace_file = None
+_trace_writer = None
+_trace_phases = []  # the phases written to the trace, in column order
+
+
+class _Timer:
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+        self.nested = 0.0  # time spent in phases timed inside this one
+
+    def __enter__(self):
+        _running.append(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+        elapsed = time.perf_counter() - self.start
+        _running.pop()
+        if _running:
+            _running[-1].nested += elapsed
+
+        own = (elapsed - self.nested) * 1000
+        _frame[self.name] = _frame.get(self.name, 0.0) + own
+
+
+class _NullTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exception):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def phase(name):
+    """returns a context manager that times a phase of the frame"""
+    if enabled:
+        return _Timer(name)
+    return _null_timer
+
+
+def toggle():
+    global enabled
+    enabled = not enabled
+    _frame.clear()
+
+
+def end_frame():
+    """records the times of every phase timed this frame"""
+    global _frame_count
+
+    if not enabled:
+        return
+
+    _frame_count += 1
+    for name, elapsed in _frame.items():
+        if name not in _times:
+            _times[name] = collections.deque(maxlen=WINDOW)
+        _times[name].append(elapsed)
+
+    if _trace_writer:
+        row = [_frame_count] + ["%.4f" % _frame.get(name, 0.0) for name in _trace_phases]
+        _trace_writer.writerow(row)
+
+    _frame.clear()
+
+
+def percentile(values, percent):
+    """returns the value that percent% of the values are at or below"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+def draw():
+    """shows the percentiles of every phase through debug"""
+    if not enabled:
+        return
+
+    header = "ms over %i frames: " % WINDOW + " / ".join("p%i" % p for p in PERCENTILES)
+    debug.text(header)
+    for name, values in _times.items():
+        if values:
+            numbers = " / ".join("%.2f" % percentile(values, p) for p in PERCENTILES)
+            debug.text("%s: %s" % (name, numbers))
+
+    playing = sound.active_voices()
+    if playing:
+        debug.text("voices: " + ", ".join("%s %i" % voice for voice in playing))
+    for line in sound.channel_pool.report():
+        debug.text(line)
+
+    if _trace_writer:
+        debug.text("tracing to %s" % _trace_file.name)
+
+
+def start_trace(path, phases):
+    """starts writing the times of every frame to a CSV file
+
+    each row has the frame number followed by the time of each of the given
+    phases, in milliseconds.  phases that weren't timed that frame are 0."""
+    global _trace_file, _trace_writer, _trace_phases
+
+    stop_trace()
+    _trace_file = open(path, "w", newline="")
+    _trace_writer = csv.writer(_trace_file)
+    _trace_phases = list(phases)
+    _trace_writer.writerow(["frame"] + _trace_phases)
+
+
+def stop_trace():
+    global _trace_file, _trace_writer
+
+    if not _trace_file:
+        return
+
+    _trace_file.close()
+    _trace_file = None
+    _trace_writer = None
+
+
+def tracing():
+    return _trace_file is not None
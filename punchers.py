@@ -1,5 +1,6 @@
 import pygame
 
+import assets
 import constants as const
 import graphics
 
@@ -8,11 +9,14 @@ import grid
 
 punchers = []
 
-punch_left = graphics.load_image("punch", 2)
-punch_left.set_colorkey(const.TRANSPARENT)
-punch_right = pygame.transform.flip(punch_left, True, False)
-punch_up = pygame.transform.rotate(punch_right, 90)
-punch_down = pygame.transform.rotate(punch_right, -90)
+
+@assets.loader
+def _load_images():
+    global punch_left, punch_right, punch_up, punch_down
+    punch_left = graphics.load_image("punch", 2, const.TRANSPARENT)
+    punch_right = pygame.transform.flip(punch_left, True, False)
+    punch_up = pygame.transform.rotate(punch_right, 90)
+    punch_down = pygame.transform.rotate(punch_right, -90)
 
 
 def add(col, row, direction):
@@ -20,8 +24,8 @@ def add(col, row, direction):
 
 
 def draw(surf, camera):
-    for puncher in punchers:
-        puncher.draw(surf, camera)
+    """returns the rects that were drawn to"""
+    return [puncher.draw(surf, camera) for puncher in punchers]
 
 
 def update():
@@ -73,22 +77,22 @@ class Puncher:
             x = (self.base_x + grid.TILE_W - self.outness) - camera.x
             y = self.base_y - camera.y
 
-            surf.blit(punch_left, (x, y))
+            return surf.blit(punch_left, (x, y))
 
         elif self.direction == const.UP:
             x = self.base_x - camera.x
             y = (self.base_y + grid.TILE_H - self.outness) - camera.y
 
-            surf.blit(punch_up, (x, y))
+            return surf.blit(punch_up, (x, y))
 
         elif self.direction == const.RIGHT:
             x = (self.base_x - grid.TILE_W + self.outness) - camera.x
             y = self.base_y - camera.y
 
-            surf.blit(punch_right, (x, y))
+            return surf.blit(punch_right, (x, y))
 
         elif self.direction == const.DOWN:
             x = self.base_x - camera.x
             y = (self.base_y - grid.TILE_H + self.outness) - camera.y
 
-            surf.blit(punch_down, (x, y))
+            return surf.blit(punch_down, (x, y))
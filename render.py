@@ -0,0 +1,148 @@
+"""Only redraws and updates the parts of the screen that change.
+
+During normal play, almost all of the screen is the static level surface,
+and only the player, punchers, dynamic tiles and UI change.  Everything
+drawn over the static level during a frame is recorded with add().  On the
+next frame, only those regions are restored from the static level, and
+only the regions that were restored or drawn over are sent to the display.
+
+The whole screen is redrawn instead whenever the camera moves, the static
+level changes, or the last frame wasn't drawn through here (transitions,
+menus, the editor).
+
+Drawing the static level from scratch takes a while, so StaticCache keeps
+copies of it for rooms that are drawn the same way again, with the same
+checkpoint and the player alive or dead.
+"""
+import collections
+
+import pygame
+
+import constants as const
+
+
+class DirtyRenderer:
+    def __init__(self, surf):
+        self.surf = surf
+
+        # The regions drawn over the static level last frame and this frame.
+        # previous_rects is None when the last frame can't be restored.
+        self.previous_rects = None
+        self.rects = []
+
+        self._offset = (0, 0)
+        self._partial = False  # whether this frame is only partly redrawn
+        self._needs_clear = False
+
+        # For checking how much is being redrawn
+        self.full_frames = 0
+        self.partial_frames = 0
+
+    def redraw_all(self):
+        """makes the next call to draw_static() redraw the whole screen"""
+        self.previous_rects = None
+
+    def clear(self):
+        """fills the screen with black, for frames that don't go through
+        draw_static().  does nothing if it's already been cleared."""
+        self.previous_rects = None
+        self._partial = False
+        if self._needs_clear:
+            self._needs_clear = False
+            self.surf.fill(const.BLACK)
+
+    def draw_static(self, static_surf, camera):
+        """draws the static level, either all of it or just the regions
+        that were drawn over last frame"""
+        offset = (int(-camera.x), int(-camera.y))
+
+        if self.previous_rects is None or offset != self._offset:
+            self.surf.fill(const.BLACK)
+            self.surf.blit(static_surf, offset)
+            self._partial = False
+            self.full_frames += 1
+        else:
+            for rect in self.previous_rects:
+                self.surf.fill(const.BLACK, rect)
+                self.surf.blit(static_surf, rect.topleft, rect.move(-offset[0], -offset[1]))
+            self._partial = True
+            self.partial_frames += 1
+
+        self._offset = offset
+        self._needs_clear = True
+        self.rects = []
+
+    def add(self, rect):
+        """records a region that was drawn over the static level"""
+        if rect:
+            self.rects.append(pygame.Rect(rect))
+
+    def add_all(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def present(self):
+        """sends this frame to the display"""
+        if self._partial:
+            pygame.display.update(self.previous_rects + self.rects)
+        else:
+            pygame.display.flip()
+
+        if self._needs_clear:
+            self.previous_rects = self.rects
+        else:
+            self.previous_rects = None
+            self.surf.fill(const.BLACK)
+
+        self.rects = []
+        self._partial = False
+
+
+class StaticCache:
+    """Copies of fully drawn static levels, kept by key.  The least recently
+    used copies are dropped once they take up more than budget bytes."""
+    def __init__(self, budget):
+        self.budget = budget
+        self.size = 0  # bytes taken up by the copies
+        self._surfs = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """returns the copy kept under key, or None if there isn't one"""
+        surf = self._surfs.get(key)
+        if surf is None:
+            self.misses += 1
+            return None
+
+        self._surfs.move_to_end(key)
+        self.hits += 1
+        return surf
+
+    def put(self, key, surf):
+        """keeps a copy of surf under key"""
+        if key in self._surfs:
+            self.size -= _size_of(self._surfs.pop(key))
+
+        # The copy is blitted over the whole surface, so it can't skip the
+        # static level's transparent pixels
+        copy = surf.copy()
+        copy.set_colorkey(None)
+        self._surfs[key] = copy
+        self.size += _size_of(copy)
+
+        while self.size > self.budget:
+            _, old = self._surfs.popitem(last=False)
+            self.size -= _size_of(old)
+            self.evictions += 1
+
+    def report(self):
+        return ("static cache: %i hits, %i misses, %i evicted, %.1f of %.1f MB"
+                % (self.hits, self.misses, self.evictions,
+                   self.size / 1048576, self.budget / 1048576))
+
+
+def _size_of(surf):
+    return surf.get_pitch() * surf.get_height()
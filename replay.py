@@ -0,0 +1,274 @@
+"""Recording and replaying player inputs.
+
+A replay holds the level it was recorded on, the seed random was given when
+recording started, and the actions taken on every frame the player was
+updated.  It also stores a checksum of the player's state on the last
+frame, so playing a replay back shows whether the physics still behave
+the same.
+
+Actions are stored as runs of (action bits, frame count), since the same
+keys tend to be held for many frames in a row.  To check every replay in
+the replays folder:
+
+    python replay.py replays/*
+
+Replays can also be made from random inputs, for bulk regression checks:
+
+    python replay.py --record --frames 600 Intro1 Intro2
+"""
+# headless has to set up pygame before anything else does
+if __name__ == "__main__":
+    import headless
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+import entities.player
+
+REPLAY_FOLDER = "replays"
+
+MAGIC = b"DLKR"
+VERSION = 1
+
+# magic, version, seed, checksum, frame count, level name length
+HEADER = struct.Struct("<4sBQIIH")
+# action bits, frames in a row
+RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+# Action bits.  Left and right are held, the rest are pressed.
+LEFT = 1 << 0
+RIGHT = 1 << 1
+JUMP = 1 << 2
+RESPAWN = 1 << 3
+HARD_RESPAWN = 1 << 4
+
+_Player = entities.player.Player
+HELD_ACTIONS = ((LEFT, _Player.left_key), (RIGHT, _Player.right_key))
+PRESSED_ACTIONS = ((JUMP, _Player.jump_key), (RESPAWN, _Player.respawn_key),
+                   (HARD_RESPAWN, _Player.hard_respawn_key))
+
+
+def current_actions():
+    """returns the action bits for the keys as they are this frame"""
+    actions = 0
+    for bit, keybind in HELD_ACTIONS:
+        if keybind.is_held:
+            actions |= bit
+    for bit, keybind in PRESSED_ACTIONS:
+        if keybind.is_pressed:
+            actions |= bit
+    return actions
+
+
+def keys_of(actions):
+    """returns (held keys, pressed keys) that give the action bits"""
+    held_keys = []
+    pressed_keys = []
+    for bit, keybind in HELD_ACTIONS:
+        if actions & bit:
+            held_keys.append(keybind.list[0])
+    for bit, keybind in PRESSED_ACTIONS:
+        if actions & bit:
+            held_keys.append(keybind.list[0])
+            pressed_keys.append(keybind.list[0])
+    return held_keys, pressed_keys
+
+
+def checksum(player):
+    """a checksum of everything about the player that physics can change"""
+    if player.checkpoint:
+        checkpoint = (player.checkpoint.col, player.checkpoint.row)
+    else:
+        checkpoint = None
+
+    state = (player.x, player.y, player.x_vel, player.y_vel,
+             player.puncher_x_vel, player.health, checkpoint)
+    return zlib.crc32(repr(state).encode())
+
+
+class Replay:
+    def __init__(self, level_name, seed):
+        self.level_name = level_name
+        self.seed = seed
+        self.actions = bytearray()  # action bits for each frame
+        self.checksum = 0
+
+    def pack(self):
+        name = self.level_name.encode()
+        data = [HEADER.pack(MAGIC, VERSION, self.seed, self.checksum,
+                            len(self.actions), len(name)), name]
+
+        index = 0
+        while index < len(self.actions):
+            actions = self.actions[index]
+            length = 1
+            while (index + length < len(self.actions) and length < MAX_RUN
+                   and self.actions[index + length] == actions):
+                length += 1
+            data.append(RUN.pack(actions, length))
+            index += length
+
+        return b"".join(data)
+
+    @classmethod
+    def unpack(cls, buffer):
+        magic, version, seed, checksum_, frame_count, name_length = \
+            HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version %i replay" % VERSION)
+        offset = HEADER.size
+
+        level_name = bytes(buffer[offset:offset + name_length]).decode()
+        offset += name_length
+
+        replay = cls(level_name, seed)
+        replay.checksum = checksum_
+        for actions, length in RUN.iter_unpack(buffer[offset:]):
+            replay.actions.extend(bytes((actions, )) * length)
+
+        if len(replay.actions) != frame_count:
+            raise ValueError("replay is cut short")
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.pack())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.unpack(file.read())
+
+
+class Recorder:
+    """records a replay of each level as it's played
+
+    start() is called when a level starts, record() on every frame the
+    player is updated, and finish() when the goal is reached.  replays are
+    played back with a freshly spawned player, so anything carried over
+    from the previous level (like a buffered jump) isn't replayed."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.replay = None
+
+    def start(self, level_name):
+        if not self.enabled:
+            return
+
+        seed = random.getrandbits(32)
+        random.seed(seed)
+        self.replay = Replay(level_name, seed)
+
+    def record(self):
+        if self.replay:
+            self.replay.actions.append(current_actions())
+
+    def cancel(self):
+        self.replay = None
+
+    def finish(self, player):
+        """saves the replay to the replays folder"""
+        if not self.replay:
+            return
+
+        self.replay.checksum = checksum(player)
+
+        os.makedirs(REPLAY_FOLDER, exist_ok=True)
+        name = "%s_%i" % (self.replay.level_name, time.time())
+        self.replay.save(os.path.join(REPLAY_FOLDER, name))
+        self.replay = None
+
+
+def play(replay, realtime=False):
+    """plays a replay through a headless simulation and returns it
+
+    if realtime is False, it's played as fast as possible"""
+    # Only imported here, since it sets up pygame to run without a window
+    import headless
+    import pygame
+
+    random.seed(replay.seed)
+    simulation = headless.Simulation([replay.level_name])
+
+    clock = pygame.time.Clock()
+    for actions in replay.actions:
+        if simulation.done:
+            break
+        held_keys, pressed_keys = keys_of(actions)
+        simulation.step(held_keys, pressed_keys)
+
+        if realtime:
+            clock.tick(60)
+
+    return simulation
+
+
+def verify(replay, realtime=False):
+    """returns whether a replay still ends with the same player state"""
+    simulation = play(replay, realtime)
+    return checksum(simulation.player) == replay.checksum
+
+
+def record_random(level_name, frames, seed):
+    """makes a replay of a level played with random inputs"""
+    import headless
+
+    replay = Replay(level_name, seed)
+    random.seed(seed)
+    simulation = headless.Simulation([level_name])
+    for held_keys in headless.random_inputs(seed):
+        if simulation.done or len(replay.actions) == frames:
+            break
+
+        simulation.step(held_keys)
+        replay.actions.append(current_actions())
+
+    replay.checksum = checksum(simulation.player)
+    return replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks or makes replays.")
+    parser.add_argument("paths", nargs="*",
+                        help="replays to check, or levels to record with --record")
+    parser.add_argument("--realtime", action="store_true",
+                        help="play replays at 60 frames per second")
+    parser.add_argument("--record", action="store_true",
+                        help="record replays of levels played with random inputs")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="frames to record each level for")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the random inputs")
+    args = parser.parse_args()
+
+    if args.record:
+        os.makedirs(REPLAY_FOLDER, exist_ok=True)
+        for level_name in args.paths:
+            replay = record_random(level_name, args.frames, args.seed)
+            path = os.path.join(REPLAY_FOLDER, "%s_seed%i" % (level_name, args.seed))
+            replay.save(path)
+            print("recorded %s (%i frames)" % (path, len(replay.actions)))
+        return
+
+    failures = 0
+    for path in args.paths:
+        if verify(Replay.load(path), args.realtime):
+            print("%s: ok" % path)
+        else:
+            print("%s: MISMATCH" % path)
+            failures += 1
+
+    print("%i of %i replays match" % (len(args.paths) - failures, len(args.paths)))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import pygame
 import os
+from concurrent import futures
 
 import entities.player
+import assets
 import graphics
 import grid
 import flicker
+import punchers
 import constants as const
 
 
@@ -17,13 +20,16 @@ def load_story():
 
 story = load_story()
 
-m5x7 = pygame.font.Font(os.path.join("text", "m5x7.ttf"), 32)
-m3x6 = pygame.font.Font(os.path.join("text", "m3x6.ttf"), 32)
 
-small_heart = graphics.load_image("heart_small", 2)
-small_heart.set_colorkey(const.TRANSPARENT)
-large_heart = graphics.load_image("heart_large", 2)
-large_heart.set_colorkey(const.TRANSPARENT)
+@assets.loader
+def _load_assets():
+    global m5x7, m3x6, small_heart, large_heart
+    m5x7 = pygame.font.Font(os.path.join("text", "m5x7.ttf"), 32)
+    m3x6 = pygame.font.Font(os.path.join("text", "m3x6.ttf"), 32)
+
+    small_heart = graphics.load_image("heart_small", 2, const.TRANSPARENT)
+    large_heart = graphics.load_image("heart_large", 2, const.TRANSPARENT)
+
 
 TUTORIAL_TEXT_LEVEL = 16
 FIRST_CHECKPOINT_LEVEL = 25
@@ -33,21 +39,115 @@ music_changes = [TUTORIAL_TEXT_LEVEL, FIRST_CHECKPOINT_LEVEL,
                  REALIZATION_LEVEL, 38, 40, 43, 77]
 
 
+def levels_with_number(shared_name, first, last):
+    """Returns a list of levels with increasing numbers attached.
+
+    levels_with_number("Intro", 2, 5) returns the list
+    ["Intro2", "Intro3", "Intro4", "Intro5"]
+    """
+    shared_name += "%i"
+    return [shared_name % x for x in range(first, last + 1)]
+
+
+level_names = (
+    levels_with_number("Intro", 1, 4) +
+
+    levels_with_number("PunchersIntro", 1, 5) +
+    levels_with_number("PunchersMomentum", 1, 6) +
+    ["PuncherParkour"] +
+    levels_with_number("RespawnMomentum", 1, 6) +
+    levels_with_number("FallPunch", 1, 2) +
+    ["RespawnPuzzle"] +
+
+    levels_with_number("CheckpointsIntro", 1, 3) +
+    ["CheckpointTiming"] +
+    levels_with_number("CheckpointsMomentum", 1, 4) +
+    ["CheckpointsClimb", "Teleport1", "TeleportDown", "SpamRespawn",
+     "SpamRespawnFall", "LaserMaze", "EarlyJump"] +
+    levels_with_number("Escalator", 1, 3) +
+
+    levels_with_number("DeathlockIntro", 1, 4) +
+    ["DeathlockTiming"] +
+    levels_with_number("DeathlockMomentum", 1, 5) +
+    ["DeathlockBlock"] +
+    ["DeadMansTrampoline", "DeadMansRightPuncher", "AvoidTheFirst"] +
+    levels_with_number("Pole", 1, 2) +
+    levels_with_number("DoubleFallPunch", 1, 2) +
+    levels_with_number("Ledge", 1, 2) +
+    ["DeathlockHeadBonk", "DoubleTriple", "EverythingClimb"] +
+    levels_with_number("Haul", 1, 4) +
+    ["DoublePunchHaul", "CheckpointHaul", "BackAndForthHaul", "UsefulSpawnHaul"] +
+    levels_with_number("End", 1, 6)
+)
+
+
+class RoomPrefetcher:
+    """builds the rooms that come up next on a worker thread
+
+    rooms are fetched by level number.  hits counts rooms that were already
+    built when they were taken, and misses counts the ones that had to be
+    waited on.  with a depth of 0, nothing is built ahead of time"""
+    DEPTH = 2  # how many rooms ahead are built
+
+    def __init__(self, level_names, depth=DEPTH):
+        self._level_names = level_names
+        self._depth = depth
+        self._executor = futures.ThreadPoolExecutor(1)
+        self._rooms = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, level_num):
+        """starts building the rooms from level_num onwards"""
+        for num in list(self._rooms):
+            if num < level_num:
+                self._rooms[num].cancel()
+                del self._rooms[num]
+
+        last_num = min(level_num + self._depth, len(self._level_names))
+        for num in range(level_num, last_num):
+            if num not in self._rooms:
+                name = self._level_names[num]
+                self._rooms[num] = self._executor.submit(grid.Room, name)
+
+    def take(self, level_num):
+        """returns the room for a level, waiting for it if it isn't built yet"""
+        future = self._rooms.pop(level_num, None)
+        if future is None:
+            self.misses += 1
+            return grid.Room(self._level_names[level_num])
+
+        if future.done():
+            self.hits += 1
+        else:
+            self.misses += 1
+        return future.result()
+
+
 class Sequence:
     HEART_OFFSETS_X = [-8, -26, 14]
     HEART_OFFSETS_UP_Y = [-14, -12, -12]
     HEART_OFFSETS_DOWN_Y = [28, 28, 28]
 
-    def __init__(self, level_names):
+    def __init__(self, level_names, level_num=None, prefetch_depth=RoomPrefetcher.DEPTH):
+        """level_num is the level to start on.  by default, it's worked out
+        from the save file"""
+        if level_num is None:
+            with open(os.path.join("data", "save.txt")) as file:
+                level = file.readline()
 
-        with open(os.path.join("data", "save.txt")) as file:
-            level = file.readline()
+            # Subtract one, since the transition from menu to game increments level by 1
+            level_num = (len(level_names) - int(level)) - 1
 
         self.level_names = level_names
-        # Subtract one, since the transition from menu to game increments level by 1
-        self._level_num = (len(level_names) - int(level)) - 1
+        self._level_num = level_num
         self.current = grid.Room(level_names[self._level_num])
-        self.next = grid.Room(level_names[self._level_num + 1])
+        self.next = None
+        if self._level_num < len(level_names) - 1:
+            self.next = grid.Room(level_names[self._level_num + 1])
+        self.prefetcher = RoomPrefetcher(level_names, prefetch_depth)
+        self.prefetcher.prefetch(self._level_num + 2)
         self.transitioning = False
         self.done_transitioning = False
         self._frame = 0
@@ -60,7 +160,7 @@ class Sequence:
 
         self.level_name_flicker = flicker.FlickerSequence()
         self.respawn_text_flicker = flicker.FlickerSequence()
-        self._heart_shade_surface = pygame.Surface(large_heart.get_size())
+        self._heart_shade_surface = None  # made once the hearts are loaded
 
     @property
     def level_num(self):
@@ -74,14 +174,27 @@ class Sequence:
         self._level_num += 1
         self.current = self.next
         if self.level_num < len(self.level_names) - 1:
-            self.next = grid.Room(self.level_names[self._level_num + 1])
-
-    def start_transition(self, static_level_surf):
+            self.next = self.prefetcher.take(self._level_num + 1)
+            self.prefetcher.prefetch(self._level_num + 2)
+
+    def leave_level(self, player):
+        """call when the current level is beaten, before the transition"""
+        self.current.unemit()
+        player.health = player.MAX_HEALTH
+        player.checkpoint = None
+        punchers.punchers = []
+
+    def enter_level(self, player):
+        """call once the next level has become the current one"""
+        player.level = self.current
+        player.hard_respawn(False)
+
+    def start_transition(self):
         self._frame = 0
         self.transitioning = True
 
-        static_level_surf.fill(const.TRANSPARENT)
-        self.next.draw_silhouette(static_level_surf)
+        # Worked out now, since nothing is drawn until the flicker starts
+        self.next.flicker_events()
 
         self.level_name_flicker = flicker.FlickerSequence()
 
@@ -103,12 +216,11 @@ class Sequence:
             text = m3x6.render(string, False, const.WHITE)
             x = self.current.text_x - text.get_width() // 2 - cam.x
             y = self.current.text_y - 80
-            surf.blit(text, (x, y))
-
-    def _draw_hard_respawn_popup(self, surf, cam, player):
-        player_dead_no_horizontal = player.dead_no_horizontal_frames >= 60 and player.dead
-        beginning_popup = player_dead_no_horizontal and self.level_num < FIRST_CHECKPOINT_LEVEL
+            return surf.blit(text, (x, y))
+        return None
 
+    def update_hard_respawn_popup(self, player):
+        """call once every frame the level is played"""
         on_checkpoint_level = self.level_num == 28
         in_ditch = player.y > 500 and player.x < 660
         if on_checkpoint_level and in_ditch:
@@ -116,6 +228,10 @@ class Sequence:
         else:
             self._checkpoint_timing_popup_frame = 0
 
+    def _draw_hard_respawn_popup(self, surf, cam, player):
+        player_dead_no_horizontal = player.dead_no_horizontal_frames >= 60 and player.dead
+        beginning_popup = player_dead_no_horizontal and self.level_num < FIRST_CHECKPOINT_LEVEL
+
         if beginning_popup or self._checkpoint_timing_popup_frame > 300:
             if beginning_popup:
                 frame = player.dead_no_horizontal_frames - 60
@@ -129,7 +245,8 @@ class Sequence:
             text = m3x6.render(key_name, False, color, const.BLACK)
             x = player.center_x - text.get_width() // 2 - cam.x
             y = player.y - 30
-            surf.blit(text, (x, y), special_flags=pygame.BLEND_ADD)
+            return surf.blit(text, (x, y), special_flags=pygame.BLEND_ADD)
+        return None
 
     def draw_flicker_ui(self, surf, cam):
         if self._frame < flicker.START_DELAY:
@@ -160,6 +277,8 @@ class Sequence:
 
             surf.blit(heart, (x, y))
 
+            if self._heart_shade_surface is None:
+                self._heart_shade_surface = pygame.Surface(large_heart.get_size())
             self._heart_shade_surface.fill(color)
 
             surf.blit(self._heart_shade_surface, (x, y), special_flags=pygame.BLEND_MULT)
@@ -186,9 +305,10 @@ class Sequence:
         x = self.current.text_x - text.get_width() // 2 - cam.x
         y = self.current.text_y - cam.y
 
-        surf.blit(text, (x, y))
+        return surf.blit(text, (x, y))
 
     def _draw_hearts(self, surf, cam, player):
+        rects = []
         heart = large_heart
         for i in range(player.health):
             x = self.current.text_x - cam.x + self.HEART_OFFSETS_X[i]
@@ -197,12 +317,15 @@ class Sequence:
             else:
                 y = self.current.text_y - cam.y + self.HEART_OFFSETS_DOWN_Y[i]
 
-            surf.blit(heart, (x, y))
+            rects.append(surf.blit(heart, (x, y)))
             heart = small_heart
+        return rects
 
     def draw_ui(self, surf, cam, player):
-        self._draw_level_text(surf, cam)
-        self._draw_hearts(surf, cam, player)
+        """returns the rects that were drawn to"""
+        rects = [self._draw_level_text(surf, cam)]
+        rects.extend(self._draw_hearts(surf, cam, player))
 
-        self._draw_respawn_text(surf, cam)
-        self._draw_hard_respawn_popup(surf, cam, player)
+        rects.append(self._draw_respawn_text(surf, cam))
+        rects.append(self._draw_hard_respawn_popup(surf, cam, player))
+        return rects
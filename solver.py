@@ -0,0 +1,330 @@
+"""Searches for a way through each level with the real player physics, to
+check that a level can still be beaten after it's been edited.
+
+    python solver.py Intro1 Intro2
+
+With no level names, every level is searched in the order the game uses.
+The shortest way found through a level is saved to the replays folder,
+and can be checked again with replay.py.
+
+Every FRAMES_PER_INPUT frames, the search tries each of INPUTS from every
+state the player could be in by then.  It goes a layer of frames at a
+time, so the first way it finds to the goal is the shortest one it knows
+of.  States that round off to the same search_key() are only searched
+once.  If a layer has more than BEAM_WIDTH states, it's trimmed down to
+the ones nearest the goal on each tile, which means the shortest way could
+be missed.  That's pointed out when it happens.
+
+The player's state is saved and put back with Player.get_state() and
+set_state().  Physics never changes the Room, so a process loads each
+level once and every state shares it.  Levels are searched in parallel
+across a multiprocessing pool.
+"""
+# headless has to set up pygame before anything else does
+import headless
+
+import argparse
+import collections
+import functools
+import multiprocessing
+import os
+import sys
+import time
+
+import camera
+import events
+import grid
+import punchers
+import replay
+import sequences
+import sweep
+import entities.player
+
+FRAMES_PER_INPUT = 6
+MAX_FRAMES = 1800
+BEAM_WIDTH = 500
+
+# States are rounded off to these before being compared
+POSITION_STEP = 4  # pixels
+VELOCITY_STEP = 1.0  # pixels per frame
+
+HELD_INPUTS = replay.LEFT | replay.RIGHT
+
+# Every way of holding left, right or neither while pressing jump, respawn
+# or neither, and hard respawning
+INPUTS = tuple(held | pressed for held in (0, replay.LEFT, replay.RIGHT)
+               for pressed in (0, replay.JUMP, replay.RESPAWN)) + (replay.HARD_RESPAWN, )
+
+FAR = 0xFFFF  # the distance of tiles that can't reach the goal
+
+
+def search_key(state):
+    """rounds a state from Player.get_state() off, so that states that only
+    differ by a little are searched once"""
+    (x, y, x_vel, y_vel, _, _, _, _, puncher_x_vel, _, health, checkpoint,
+     coyote_timer, jump_buffer, horizontal_punch_buffer, _) = state
+    return (x // POSITION_STEP, y // POSITION_STEP,
+            round(x_vel / VELOCITY_STEP), round(y_vel / VELOCITY_STEP),
+            round(puncher_x_vel / VELOCITY_STEP), health, checkpoint,
+            coyote_timer, jump_buffer, horizontal_punch_buffer)
+
+
+def goal_distances(room):
+    """returns how many tiles each space is from the goal, going around
+    solid tiles"""
+    distances = [FAR] * (room.WIDTH * room.HEIGHT)
+    queue = collections.deque()
+    for row in range(room.HEIGHT):
+        for col in range(room.WIDTH):
+            if room.trigger_at(col, row).goal_zone:
+                distances[row * room.WIDTH + col] = 0
+                queue.append((col, row))
+
+    while queue:
+        col, row = queue.popleft()
+        distance = distances[row * room.WIDTH + col] + 1
+        for next_col, next_row in ((col - 1, row), (col + 1, row),
+                                   (col, row - 1), (col, row + 1)):
+            if room.has_solid(next_col, next_row):
+                continue
+            index = next_row * room.WIDTH + next_col
+            if distance < distances[index]:
+                distances[index] = distance
+                queue.append((next_col, next_row))
+
+    return distances
+
+
+class SearchPlayer(entities.player.Player):
+    """a Player that isn't animated, which takes a sixth of the time of
+    each frame and never changes how it moves"""
+    def _update_animation(self):
+        pass
+
+
+class Node:
+    def __init__(self, state, parent, actions):
+        self.state = state
+        self.parent = parent
+        self.actions = actions  # the input that led here from parent
+
+
+class Result:
+    def __init__(self, level_name):
+        self.level_name = level_name
+        self.replay = None  # the shortest way found, if there was one
+        self.trimmed = False  # whether any states were trimmed from the search
+        self.frames = 0  # frames that were simulated
+        self.states = 0  # states that were searched
+
+
+class Solver:
+    def __init__(self, level_name):
+        self.level_name = level_name
+        self.room = sweep.room(level_name)
+        self.distances = goal_distances(self.room)
+
+        self.keys = events.KeyHandler()
+        self.player = SearchPlayer(self.room, camera.Camera())
+        for name in sweep.KEYBIND_NAMES:
+            keybind = getattr(entities.player.Player, name)
+            setattr(self.player, name, events.Keybind(keybind.list, self.keys))
+
+        self._key_states = {}
+
+    def _key_state(self, actions, last_actions):
+        """returns the KeyState for a frame with the given action bits"""
+        if (actions, last_actions) not in self._key_states:
+            held, pressed = replay.keys_of(actions)
+            last_held, _ = replay.keys_of(last_actions)
+            held = frozenset(held)
+            self._key_states[actions, last_actions] = \
+                events.KeyState(held, pressed, frozenset(last_held) - held)
+        return self._key_states[actions, last_actions]
+
+    def _distance(self, col, row):
+        if 0 <= col < self.room.WIDTH and 0 <= row < self.room.HEIGHT:
+            return self.distances[row * self.room.WIDTH + col]
+        return FAR
+
+    def _trim(self, layer, beam_width):
+        """keeps beam_width of a layer's nodes.  the nodes nearest the goal
+        are kept first, but spread out over every tile the player has
+        reached, so that ways that have to go around aren't lost"""
+        nearest = []
+        for node in layer:
+            x, y = node.state[0], node.state[1]
+            health, checkpoint = node.state[10], node.state[11]
+            col = grid.col_at(x + self.player.WIDTH // 2)
+            row = grid.row_at(y + self.player.HEIGHT // 2)
+            distance = self._distance(col, row)
+
+            # A checkpoint can be respawned at, so the player is never any
+            # further from the goal than it is
+            if checkpoint is not None:
+                distance = min(distance, self._distance(checkpoint.col, checkpoint.row))
+            nearest.append((distance, (col, row, health, checkpoint), node))
+        nearest.sort(key=lambda entry: entry[0])
+
+        # A node's rank is how many nodes nearer the goal share its tile
+        ranks = {}
+        ranked = []
+        for distance, tile, node in nearest:
+            rank = ranks.get(tile, 0)
+            ranks[tile] = rank + 1
+            ranked.append((rank, distance, node))
+        ranked.sort(key=lambda entry: entry[:2])
+
+        return [node for _, _, node in ranked[:beam_width]]
+
+    def _play(self, node, actions, frames_per_input, result):
+        """plays frames_per_input frames of an input from a node's state, and
+        returns how many frames it took to reach the goal, or 0 if it
+        wasn't reached"""
+        player = self.player
+        player.set_state(node.state)
+
+        last_actions = node.actions & HELD_INPUTS
+        for frame in range(1, frames_per_input + 1):
+            self.keys.state = self._key_state(actions, last_actions)
+            last_actions = actions
+            actions &= HELD_INPUTS
+
+            player.update()
+            if player.hard_respawn_key.is_pressed:
+                player.hard_respawn(False)
+
+            result.frames += 1
+            if player.touching_goal:
+                return frame
+        return 0
+
+    def solve(self, max_frames=MAX_FRAMES, beam_width=BEAM_WIDTH,
+              frames_per_input=FRAMES_PER_INPUT):
+        """returns a Result, with a replay of the shortest way found to the
+        goal"""
+        result = Result(self.level_name)
+
+        start = Node(self.player.get_state(), None, 0)
+        seen = {search_key(start.state)}
+        layer = [start]
+        for depth in range(max_frames // frames_per_input):
+            next_layer = []
+            for node in layer:
+                for actions in INPUTS:
+                    frame = self._play(node, actions, frames_per_input, result)
+                    if frame:
+                        result.replay = self._replay(Node(None, node, actions),
+                                                     frames_per_input, frame)
+                        result.states = len(seen)
+                        return result
+
+                    state = self.player.get_state()
+                    key = search_key(state)
+                    if key not in seen:
+                        seen.add(key)
+                        next_layer.append(Node(state, node, actions))
+
+                # Punchers are only drawn, so there's no need to keep them
+                del punchers.punchers[:]
+
+            if len(next_layer) > beam_width:
+                next_layer = self._trim(next_layer, beam_width)
+                result.trimmed = True
+            layer = next_layer
+            if not layer:
+                break
+
+        result.states = len(seen)
+        return result
+
+    def _replay(self, node, frames_per_input, last_frames):
+        """returns a Replay of the inputs leading to a node, each held for
+        frames_per_input but the last, which is only held for last_frames"""
+        inputs = []
+        while node.parent:
+            inputs.append(node.actions)
+            node = node.parent
+        inputs.reverse()
+
+        solution = replay.Replay(self.level_name, 0)
+        for index, actions in enumerate(inputs):
+            if index == len(inputs) - 1:
+                frames = last_frames
+            else:
+                frames = frames_per_input
+            solution.actions.append(actions)
+            solution.actions.extend(bytes((actions & HELD_INPUTS, )) * (frames - 1))
+        return solution
+
+
+def solve(level_name, max_frames=MAX_FRAMES, beam_width=BEAM_WIDTH):
+    """searches a level, then plays the replay back from the start to check
+    that it really does reach the goal"""
+    result = Solver(level_name).solve(max_frames, beam_width)
+    if result.replay:
+        simulation = replay.play(result.replay)
+        if simulation.level_frames != [len(result.replay.actions)]:
+            raise RuntimeError("%s: the solution didn't reach the goal when played back"
+                               % level_name)
+        result.replay.checksum = replay.checksum(simulation.player)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds a way through levels.")
+    parser.add_argument("levels", nargs="*", help="names of the levels to search")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES,
+                        help="frames to search each level for")
+    parser.add_argument("--beam-width", type=int, default=BEAM_WIDTH,
+                        help="states to keep in each layer of the search")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes to search levels in")
+    args = parser.parse_args()
+
+    level_names = args.levels or sequences.level_names
+    solve_level = functools.partial(solve, max_frames=args.max_frames,
+                                    beam_width=args.beam_width)
+
+    if args.processes == 1:
+        results = map(solve_level, level_names)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(args.processes)
+        results = pool.imap(solve_level, level_names)
+
+    os.makedirs(replay.REPLAY_FOLDER, exist_ok=True)
+
+    unsolved = 0
+    total_frames = 0
+    start_time = time.perf_counter()
+    for result in results:
+        total_frames += result.frames
+        if not result.replay:
+            unsolved += 1
+            print("%s: no way through found in %i frames (%i states)"
+                  % (result.level_name, args.max_frames, result.states))
+            continue
+
+        path = os.path.join(replay.REPLAY_FOLDER, "%s_solved" % result.level_name)
+        result.replay.save(path)
+        if result.trimmed:
+            trimmed = ", trimmed"
+        else:
+            trimmed = ""
+        print("%s: beaten on frame %i (%i states%s), saved to %s"
+              % (result.level_name, len(result.replay.actions), result.states, trimmed, path))
+
+    if pool:
+        pool.close()
+
+    seconds = time.perf_counter() - start_time
+    print("%i frames in %.2f seconds (%i frames per second)"
+          % (total_frames, seconds, total_frames / max(seconds, 0.000001)))
+    print("%i of %i levels solved" % (len(level_names) - unsolved, len(level_names)))
+    if unsolved:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,86 @@
 import pygame
+import heapq
+import itertools
+import math
 import random
 import os
+import threading
+from concurrent import futures
+
+import constants as const
 
-# import math
 
 music_muted = False
 sfx_muted = False
 
-CHANNEL_COUNT = 32
-pygame.mixer.init(22050, -16, CHANNEL_COUNT, 64)
-pygame.mixer.set_num_channels(CHANNEL_COUNT)
-pygame.init()
-
-channels = [pygame.mixer.Channel(channel) for channel in range(CHANNEL_COUNT)]
+# Categories of sound.  Each gets its own group of channels, so that one
+# category can't take the channels another needs
+MUSIC = 0
+AMBIENCE = 1
+UI = 2
+SFX = 3
+
+CATEGORY_NAMES = ("music", "ambience", "ui", "sfx")
+
+# The amount of channels each category gets.  Each has room for everything
+# in it that can play at once, and at least one channel spare, since a full
+# group has to cut off or drop whatever comes next:
+#   music     the 7 soundtrack layers, the menu music and the jingle, + 1
+#   ambience  the 6 flicker sounds, the hum and the goal sound, + 1
+#   ui        at most 2 wanted at once (the start sound and a menu blip), + 2
+#   sfx       13 wanted at most while mashing through levels, with 1 cut
+#             off, so 16 leaves a few spare for busier scenes
+# ChannelPool.report() shows the most each group has wanted, for checking
+# these against.
+CHANNEL_GROUPS = (10, 9, 4, 16)
+CHANNEL_COUNT = sum(CHANNEL_GROUPS)
+
+# A playing sound can only be cut off by a sound of at least its priority
+LOW_PRIORITY = 0
+NORMAL_PRIORITY = 1
+HIGH_PRIORITY = 2
+
+channels = []
 soundsets = []
+sounds = []  # every sound that's been made, loaded or not
 
 # import debug
 
 
-def update():
-    for soundset in soundsets:
-        if soundset.limited:
-            for i in reversed(range(len(soundset.durations))):
-                if soundset.durations[i] <= 0:
-                    del soundset.durations[i]
-                else:
-                    soundset.durations[i] -= 1
+def init():
+    """Starts the mixer.  This has to happen before pygame.init(), which
+    would otherwise start it with the default settings."""
+    pygame.mixer.init(22050, -16, CHANNEL_COUNT, 64)
+    pygame.mixer.set_num_channels(CHANNEL_COUNT)
+    channels[:] = [pygame.mixer.Channel(channel) for channel in range(CHANNEL_COUNT)]
+
+    # Only the channel pool hands out channels, so pygame's Sound.play()
+    # can't pick one from another category's group
+    pygame.mixer.set_reserved(CHANNEL_COUNT)
+
 
+def preload():
+    """Starts loading every sound that isn't loaded yet on a worker thread,
+    so that they're ready before they're first played.  Decoding doesn't
+    hold the GIL, so the game keeps running while they load."""
+    executor = futures.ThreadPoolExecutor(1)
+    for sound in sounds:
+        if not sound.loaded:
+            executor.submit(sound.load)
+    executor.shutdown(wait=False)
+
+
+def update():
+    """call once every frame"""
+    voices.update()
     volume_control.update()
 
 
+def active_voices():
+    """returns (name, voices) for every SoundSet that's playing something"""
+    return [(soundset.name, soundset.voices) for soundset in soundsets if soundset.voices]
+
+
 def load_music(path):
     pygame.mixer.music.load(pathify(path))
 
@@ -50,35 +101,105 @@ def pathify(string):
     return os.path.join("sounds", string + ".ogg")
 
 
-def load(string):
-    return pygame.mixer.Sound(pathify(string))
+def load(string, category=SFX, priority=NORMAL_PRIORITY):
+    """returns the sound, which is only loaded from its file once it's
+    first used"""
+    return Sound(string, category, priority)
 
 
 def play(sound, volume=1.0):
-    channel = pygame.mixer.find_channel()
+    """returns the channel it's played on, or None if it was dropped"""
+    if not sound.playable:
+        return None
+
+    channel = channel_pool.find(sound.category, sound.priority)
     if channel:
         channel.set_volume(volume * volume_control.volume)
-        channel.play(sound)
+        channel.play(sound.load())
+    return channel
+
+
+class Sound:
+    """A pygame Sound that's loaded the first time it's used.
+
+    It can be used just like a pygame Sound.  Setting the volume doesn't
+    load it, so sounds can be set up when their module is imported.  It's
+    safe to load a sound from preload()'s thread while it's being used.
+    It's played on a channel from its category's group."""
+    def __init__(self, path, category=SFX, priority=NORMAL_PRIORITY):
+        self.path = path
+        self.category = category
+        self.priority = priority
+        self._sound = None
+        self._volume = None
+        self._lock = threading.Lock()
+        self.frames = 0  # how many frames it lasts, once it's loaded
+        sounds.append(self)
+
+    @property
+    def loaded(self):
+        return self._sound is not None
+
+    def load(self):
+        """returns the pygame Sound, loading it if it isn't loaded yet"""
+        with self._lock:
+            if self._sound is None:
+                sound = pygame.mixer.Sound(pathify(self.path))
+                if self._volume is not None:
+                    sound.set_volume(self._volume)
+                self.frames = int(math.ceil(sound.get_length() * const.FPS))
+                self._sound = sound
+
+        return self._sound
+
+    @property
+    def playable(self):
+        # SDL won't play a sound with nothing in it, and pygame's
+        # Channel.play() writes past the end of its channels when SDL won't
+        self.load()
+        return self.frames > 0
+
+    def set_volume(self, volume):
+        with self._lock:
+            if self._sound is None:
+                self._volume = volume
+            else:
+                self._sound.set_volume(volume)
+
+    def play(self, loops=0, maxtime=0, fade_ms=0):
+        """returns the channel it's played on, or None if it was dropped"""
+        if not self.playable:
+            return None
+
+        channel = channel_pool.find(self.category, self.priority)
+        if channel:
+            channel.set_volume(1.0)
+            channel.play(self.load(), loops, maxtime, fade_ms)
+        return channel
 
+    def __getattr__(self, name):
+        # Anything else loads the sound and is passed on to it
+        return getattr(self.load(), name)
 
-def load_numbers(path, count):
+
+def load_numbers(path, count, category=SFX, priority=NORMAL_PRIORITY):
     """Loads a set of sounds whose filenames are the same except they
     contain incrementing numbers.
     path is a string which should contain a %i representing where the number is.
     count is the amount of sounds.
     """
     paths = [path % (number + 1) for number in range(count)]
-    return SoundSet(paths)
+    return SoundSet(paths, path, category, priority)
 
 
-def load_strings(path, strings):
+def load_strings(path, strings, category=SFX, priority=NORMAL_PRIORITY):
     """Loads a set of sounds whose filenames are the same, except they
     all have one part that varies.
     path is the part of the string that stays the same.  must contain a %s
     strings is a list of strings, containing all the differences.
     """
     paths = [path % string for string in strings]
-    return SoundSet(paths)
+    return SoundSet(paths, path, category, priority)
 
 
 class VolumeControl:
@@ -113,18 +234,158 @@ class VolumeControl:
 volume_control = VolumeControl()
 
 
+class VoiceScheduler:
+    """Counts the sounds each SoundSet is playing, by frame.
+
+    Every voice that starts is pushed onto a heap by the frame it ends on.
+    update() only pops the voices that have ended, so sets that aren't
+    playing anything take no work, and each set keeps a count of its
+    voices instead of a list of them.  A voice whose channel is handed to
+    another sound ends then, and is skipped once it's popped."""
+    def __init__(self):
+        self.frame = 0
+        self._ends = []  # heap of (end frame, order started, soundset)
+        self._order = itertools.count()
+        self._playing = {}  # order started -> soundset, of every voice
+        self._on_channel = {}  # channel -> order started of its voice
+
+    def start(self, soundset, length, channel):
+        """starts a voice on a channel that's counted for length more frames"""
+        end = self.frame + length + 1
+        order = next(self._order)
+        heapq.heappush(self._ends, (end, order, soundset))
+        self._playing[order] = soundset
+        self._on_channel[channel] = order
+        soundset.voices += 1
+        soundset.last_start = self.frame
+
+    def cut(self, channel):
+        """ends the voice on a channel, if it has one"""
+        soundset = self._playing.pop(self._on_channel.pop(channel, None), None)
+        if soundset:
+            soundset.voices -= 1
+
+    def update(self):
+        self.frame += 1
+        ends = self._ends
+        while ends and ends[0][0] <= self.frame:
+            end, order, soundset = heapq.heappop(ends)
+            if self._playing.pop(order, None):
+                soundset.voices -= 1
+
+
+voices = VoiceScheduler()
+
+
+class ChannelStats:
+    """How a category's group of channels has been used"""
+    def __init__(self):
+        self.played = 0
+        self.stolen = 0  # sounds that cut off another sound
+        self.dropped = 0  # sounds that weren't played at all
+        self.most_wanted = 0  # the most channels needed at once
+
+
+class ChannelPool:
+    """Hands out the channels of each category's group.
+
+    When every channel in the group is busy, the sound with the lowest
+    priority is cut off, the quietest and then the oldest of them, as long
+    as its priority isn't higher than the new sound's.  Otherwise the new
+    sound is dropped.  stats keeps track of both for each category, so
+    CHANNEL_GROUPS can be sized by how many channels were wanted."""
+    def __init__(self):
+        self.groups = []  # the channel numbers of each category
+        first = 0
+        for count in CHANNEL_GROUPS:
+            self.groups.append(range(first, first + count))
+            first += count
+
+        self.stats = [ChannelStats() for _ in CATEGORY_NAMES]
+        self._priorities = [LOW_PRIORITY] * CHANNEL_COUNT
+        self._starts = [0] * CHANNEL_COUNT  # the order sounds started in
+        self._order = itertools.count()
+
+    def find(self, category, priority):
+        """returns a channel to play a sound on, or None if it should be
+        dropped"""
+        if not channels:
+            return None
+
+        stats = self.stats[category]
+        free = None
+        busy = 0
+        for channel_num in self.groups[category]:
+            if channels[channel_num].get_busy():
+                busy += 1
+            elif free is None:
+                free = channel_num
+        stats.most_wanted = max(stats.most_wanted, busy + 1)
+
+        if free is None:
+            free = self._steal(category, priority)
+            if free is None:
+                stats.dropped += 1
+                return None
+            stats.stolen += 1
+
+        stats.played += 1
+        self._priorities[free] = priority
+        self._starts[free] = next(self._order)
+        voices.cut(channels[free])
+        return channels[free]
+
+    def _steal(self, category, priority):
+        """returns the channel whose sound should be cut off, if any"""
+        stealable = [channel_num for channel_num in self.groups[category]
+                     if self._priorities[channel_num] <= priority]
+        if not stealable:
+            return None
+
+        def order(channel_num):
+            return (self._priorities[channel_num], _loudness(channels[channel_num]),
+                    self._starts[channel_num])
+
+        return min(stealable, key=order)
+
+    def report(self):
+        """returns a line about each category that's played anything"""
+        lines = []
+        for category, stats in enumerate(self.stats):
+            if stats.played or stats.dropped:
+                lines.append("%s: %i of %i channels wanted at most, %i stolen, %i dropped"
+                             % (CATEGORY_NAMES[category], stats.most_wanted,
+                                CHANNEL_GROUPS[category], stats.stolen, stats.dropped))
+        return lines
+
+
+def _loudness(channel):
+    playing = channel.get_sound()
+    if not playing:
+        return 0.0
+    return channel.get_volume() * playing.get_volume()
+
+
+channel_pool = ChannelPool()
+
+
 class SoundSet:
-    def __init__(self, paths):
-        self.sounds = [load(path) for path in paths]
+    def __init__(self, paths, name=None, category=SFX, priority=NORMAL_PRIORITY):
+        self.sounds = [load(path, category, priority) for path in paths]
         self.variants = len(self.sounds)
         self.lastPlayed = 0
         soundsets.append(self)
 
+        # The name the profiler shows the set's voices under
+        self.name = name or paths[0]
+
         self.limited = False
         self.limit = 0
-        self.durations = []
         self.sound_duration = 0
 
+        self.voices = 0  # how many of its sounds are playing
+        self.last_start = None  # the frame the newest one started on
+
         self.delayed = False
 
     def play(self, sound_id, volume=1.0, force_play=False):
@@ -132,21 +393,30 @@ class SoundSet:
             if sfx_muted:
                 return
 
-            if self.limited and len(self.durations) >= self.limit:
-                return
-
-            for duration in self.durations:
-                if duration > self.sound_duration - 2:
+            if self.limited:
+                if self.voices >= self.limit:
                     return
 
+                # Nor can two of its sounds start within two frames
+                if self.last_start is not None:
+                    since_start = voices.frame - self.last_start
+                    if since_start < min(2, self.sound_duration + 1):
+                        return
+
         if volume > 1.0:
             volume = 1.0
 
-        play(self.sounds[sound_id], volume)
+        sound = self.sounds[sound_id]
+        channel = play(sound, volume)
         self.lastPlayed = sound_id
 
+        # Only sounds that got a channel are counted as voices
+        if not channel:
+            return
         if self.limited:
-            self.durations.append(self.sound_duration)
+            voices.start(self, self.sound_duration, channel)
+        else:
+            voices.start(self, sound.frames, channel)
 
     def play_random(self, volume=1.0, force_play=False):
         if self.variants == 1:
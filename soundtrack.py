@@ -0,0 +1,245 @@
+"""The game's music, which is made of layers that are faded in and out.
+
+Every layer is a track of the same length, and they all play in time with
+each other from when the soundtrack starts.  Only the layers that can be
+heard are decoded and mixed.  Once a layer's volume goes above zero, its
+track is decoded on a worker thread.  It's played a chunk of CHUNK_LENGTH
+seconds at a time, each cut from the decoded track and queued on its
+channel while the one before it plays, so only the track and two chunks
+are ever in memory.  Once the layer fades back out to zero, it's stopped.
+The last KEPT_TRACKS tracks to fade out are kept decoded, so a layer that
+fades back in soon after starts straight away.
+
+A new layer starts at the position of a layer that's already playing,
+which is worked out from the mixer: the chunk that layer's channel is
+playing, plus the samples it's played of that chunk.  pygame can't tell
+how far into a sound a channel is, so a chunk's start is taken as when the
+chunk before it would have ended, kept to between the last frame it was
+still queued and the frame it was seen playing.  That stays in line with
+the mixer's clock, loop after loop.  The time since the soundtrack started
+is only used when no layer is playing, and is corrected by the layers while
+they are.  The next chunk is queued once a frame, so a frame would have to
+take longer than a chunk for there to be a gap.  A layer that does fall
+behind starts again in time with the others.
+"""
+import collections
+import time
+from concurrent import futures
+
+import pygame
+
+import sound
+
+CHUNK_LENGTH = 1.0  # seconds
+KEPT_TRACKS = 1
+
+# pygame keeps volumes as a whole number of steps out of this many
+VOLUME_STEPS = 128
+
+_executor = futures.ThreadPoolExecutor(1)
+_kept = collections.OrderedDict()  # path -> decoded track, oldest first
+
+
+def _frame_size():
+    """returns the size in bytes of one sample on every channel"""
+    frequency, size, channels = pygame.mixer.get_init()
+    return abs(size) // 8 * channels
+
+
+def _chunk_frames():
+    return int(CHUNK_LENGTH * pygame.mixer.get_init()[0])
+
+
+def _decode(path):
+    return pygame.mixer.Sound(sound.pathify(path))
+
+
+class Layer:
+    """One track of the soundtrack.  Its volume can be used like a pygame
+    Sound's, but it only plays while the volume is above zero."""
+    def __init__(self, path):
+        self.path = path
+        self._volume = 0  # in VOLUME_STEPS
+        self._decoding = None  # the future of the decoded track
+        self._track = None
+        self._track_frames = 0
+        self._channel = None
+
+        self._chunk = 0  # the chunk that's playing
+        self._playing = None  # the sounds that are playing and queued
+        self._queued = None
+        # When the playing chunk started, as if from its first sample, and
+        # the last time the chunk after it was seen still queued
+        self._chunk_start = 0.0
+        self._queued_seen = 0.0
+
+    @property
+    def audible(self):
+        return self._volume > 0
+
+    @property
+    def playing(self):
+        return self._channel is not None
+
+    @property
+    def track(self):
+        """the decoded track, or None if it isn't decoded"""
+        return self._track
+
+    def get_volume(self):
+        return self._volume / VOLUME_STEPS
+
+    def set_volume(self, volume):
+        self._volume = max(0, min(VOLUME_STEPS, int(volume * VOLUME_STEPS)))
+        if self._channel:
+            self._channel.set_volume(self.get_volume())
+
+    def position(self, now):
+        """returns how many mixer frames into the track the layer is at the
+        time now, from time.perf_counter().  only for playing layers"""
+        frequency = pygame.mixer.get_init()[0]
+        elapsed = int((now - self._chunk_start) * frequency)
+        return (self._chunk * _chunk_frames() + elapsed) % self._track_frames
+
+    def update(self, position, now):
+        """starts or stops the layer, depending on its volume.  position is
+        the mixer frames into the track the other layers are at, or None
+        if the soundtrack hasn't started"""
+        if not self.audible:
+            self._release()
+            return
+
+        if self._track is None and self.path in _kept:
+            self._set_track(_kept.pop(self.path))
+        if self._track is None:
+            if self._decoding is None:
+                self._decoding = _executor.submit(_decode, self.path)
+            if not self._decoding.done():
+                return
+            self._set_track(self._decoding.result())
+            self._decoding = None
+
+        if self._channel:
+            current = self._channel.get_sound()
+            if current is self._queued:
+                self._next_chunk_started(now)
+            elif current is self._playing:
+                self._queued_seen = now
+            else:
+                # The channel ran out, or was cut off, so the layer is
+                # started again in time with the others
+                self._channel = None
+
+        if not self._channel and position is not None:
+            self._start(position, now)
+
+    def _set_track(self, track):
+        self._track = track
+        self._track_frames = memoryview(track).nbytes // _frame_size()
+
+    def _cut(self, index, offset=0):
+        """returns a sound of one chunk of the track, from offset frames in"""
+        frame_size = _frame_size()
+        chunk_frames = _chunk_frames()
+        first = (index * chunk_frames + offset) * frame_size
+        last = (index + 1) * chunk_frames * frame_size
+        samples = memoryview(self._track).cast("B")
+        chunk = pygame.mixer.Sound(buffer=samples[first:last])
+        samples.release()
+        return chunk
+
+    def _queue(self, index):
+        chunk_count = -(-self._track_frames // _chunk_frames())
+        self._queued = self._cut(index % chunk_count)
+        self._channel.queue(self._queued)
+
+    def _next_chunk_started(self, now):
+        """moves on to the queued chunk, which started since the last frame"""
+        chunk_count = -(-self._track_frames // _chunk_frames())
+        frequency = pygame.mixer.get_init()[0]
+
+        # The chunk before it is always a whole one, unless it was the last
+        predicted = self._chunk_start + _chunk_frames() / frequency
+        if self._chunk == chunk_count - 1:
+            predicted -= (chunk_count * _chunk_frames() - self._track_frames) / frequency
+        self._chunk_start = min(max(predicted, self._queued_seen), now)
+
+        self._chunk = (self._chunk + 1) % chunk_count
+        self._playing = self._queued
+        self._queued_seen = now
+        self._queue(self._chunk + 1)
+
+    def _start(self, position, now):
+        channel = sound.channel_pool.find(sound.MUSIC, sound.HIGH_PRIORITY)
+        if not channel:
+            return
+
+        # Starts partway through the chunk the other layers are up to
+        frame = position % self._track_frames
+        index, offset = divmod(frame, _chunk_frames())
+        self._playing = self._cut(index, offset)
+        self._chunk = index
+        self._chunk_start = now - offset / pygame.mixer.get_init()[0]
+        self._queued_seen = now
+
+        self._channel = channel
+        channel.play(self._playing)
+        channel.set_volume(self.get_volume())
+        self._queue(index + 1)
+
+    def stop(self):
+        if self._channel:
+            self._channel.stop()
+            self._channel = None
+        self._playing = None
+        self._queued = None
+
+    def _release(self):
+        self.stop()
+        if self._decoding:
+            self._decoding.cancel()
+            self._decoding = None
+
+        if self._track is not None:
+            _kept[self.path] = self._track
+            while len(_kept) > KEPT_TRACKS:
+                _kept.popitem(last=False)
+            self._track = None
+
+
+class Soundtrack:
+    def __init__(self, paths):
+        self.layers = [Layer(path) for path in paths]
+        self._start_time = None
+
+    @property
+    def started(self):
+        return self._start_time is not None
+
+    def play(self):
+        """starts every layer from the beginning, though only the audible
+        ones are actually played"""
+        for layer in self.layers:
+            layer.stop()
+        self._start_time = time.perf_counter()
+
+    def position(self, now):
+        """returns how many mixer frames into the track the layers are at,
+        or None if the soundtrack hasn't started"""
+        if not self.started:
+            return None
+
+        frequency = pygame.mixer.get_init()[0]
+        for layer in self.layers:
+            if layer.playing:
+                position = layer.position(now)
+                self._start_time = now - position / frequency
+                return position
+        return int((now - self._start_time) * frequency)
+
+    def update(self):
+        """call once every frame"""
+        now = time.perf_counter()
+        position = self.position(now)
+        for layer in self.layers:
+            layer.update(position, now)
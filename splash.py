@@ -2,13 +2,11 @@ import sound
 
 import pygame
 
+import assets
 import constants as const
 import events
 import graphics
 
-name = graphics.load_image("splash_name", 4)
-name.set_colorkey(const.TRANSPARENT)
-
 _logo_column = graphics.AnimColumn("splash_logo", 11, 4)
 _logo_column.set_delay(9)
 _logo_sheet = graphics.AnimSheet([_logo_column])
@@ -17,14 +15,25 @@ logo = graphics.AnimInstance(_logo_sheet)
 
 LOGO_NAME_GAP = 24
 
-WIDTH = name.get_width() + _logo_column.surface.get_width() + LOGO_NAME_GAP
-HEIGHT = name.get_height() + 4
 
-LOGO_X = const.SCRN_W // 2 - WIDTH // 2
-NAME_X = LOGO_X + _logo_column.surface.get_width() + LOGO_NAME_GAP
+@assets.loader
+def _load_assets():
+    """loads the splash screen, which should be loaded before anything
+    else with assets.load("splash")"""
+    global name, WIDTH, HEIGHT, LOGO_X, NAME_X, NAME_Y, LOGO_Y, fade_surface
+    name = graphics.load_image("splash_name", 4, const.TRANSPARENT)
+
+    WIDTH = name.get_width() + _logo_column.surface.get_width() + LOGO_NAME_GAP
+    HEIGHT = name.get_height() + 4
+
+    LOGO_X = const.SCRN_W // 2 - WIDTH // 2
+    NAME_X = LOGO_X + _logo_column.surface.get_width() + LOGO_NAME_GAP
 
-NAME_Y = const.SCRN_H // 2 - HEIGHT // 2
-LOGO_Y = NAME_Y + 12
+    NAME_Y = const.SCRN_H // 2 - HEIGHT // 2
+    LOGO_Y = NAME_Y + 12
+
+    fade_surface = pygame.Surface((WIDTH, HEIGHT))
+    _logo_sheet.load()
 
 
 FADE_IN_LENGTH = 60
@@ -34,10 +43,8 @@ FADE_OUT_LENGTH = 60
 FADE_IN_END = FADE_IN_LENGTH
 FADE_HOLD_END = FADE_IN_END + FADE_HOLD_LENGTH
 
-fade_surface = pygame.Surface((WIDTH, HEIGHT))
-
 
-jingle = sound.load("intro_jingle")
+jingle = sound.load("intro_jingle", sound.MUSIC)
 jingle.set_volume(0.7)
 
 
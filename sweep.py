@@ -0,0 +1,167 @@
+"""Plays many players through the same level, each with inputs of its own,
+for trying every timing of a move.
+
+Every player holds the same actions the whole time, and taps one more
+action on a frame of its own.  With
+
+    python sweep.py --hold right --tap jump --frames 240 Intro4
+
+the first player jumps on frame 0, the next on frame 1, and so on up to
+frame 239.  It prints which timings beat the level and how many frames
+were simulated a second.
+
+Each player reads a KeyHandler of its own instead of the keyboard.  The
+players in a process all share one copy of each room, which they only
+read.  Players are played BATCH_SIZE at a time, and the batches are spread
+across a multiprocessing pool.
+"""
+# headless has to set up pygame before anything else does
+import headless
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import camera
+import events
+import grid
+import punchers
+import replay
+import entities.player
+
+BATCH_SIZE = 64  # players sent to a process at a time
+
+ACTIONS = {"left": replay.LEFT, "right": replay.RIGHT, "jump": replay.JUMP,
+           "respawn": replay.RESPAWN, "hard_respawn": replay.HARD_RESPAWN}
+
+KEYBIND_NAMES = ("left_key", "right_key", "jump_key", "respawn_key",
+                 "hard_respawn_key", "pause_key")
+
+_rooms = {}  # level name -> Room, so that each process loads a level once
+
+
+def room(level_name):
+    if level_name not in _rooms:
+        _rooms[level_name] = grid.Room(level_name)
+    return _rooms[level_name]
+
+
+class Runner:
+    """One player with keys of its own, played the way
+    headless.Simulation plays its player"""
+    def __init__(self, level):
+        self.keys = events.KeyHandler()
+        self.player = entities.player.Player(level, camera.Camera())
+        for name in KEYBIND_NAMES:
+            keybind = getattr(entities.player.Player, name)
+            setattr(self.player, name, events.Keybind(keybind.list, self.keys))
+
+        self.frame = 0
+        self.beaten_on = None  # the frame the goal was reached on
+
+        self._held_keys = frozenset()
+
+    def step(self, actions):
+        """plays a frame with the given action bits"""
+        held_keys, pressed_keys = replay.keys_of(actions)
+        held_keys = frozenset(held_keys)
+        self.keys.state = events.KeyState(held_keys, pressed_keys,
+                                          self._held_keys - held_keys)
+        self._held_keys = held_keys
+
+        self.player.update()
+        if self.player.hard_respawn_key.is_pressed:
+            self.player.hard_respawn()
+
+        self.frame += 1
+        if self.player.touching_goal:
+            self.beaten_on = self.frame
+
+
+class Result:
+    def __init__(self, tap_frame, runner):
+        self.tap_frame = tap_frame
+        self.beaten_on = runner.beaten_on
+        self.frames = runner.frame  # frames that were simulated
+        self.x = runner.player.x
+        self.y = runner.player.y
+
+
+def play_batch(batch):
+    """plays the players of one batch side by side, and returns a Result
+    for each.  batch is (level name, frames, held actions, tapped action,
+    the frames each player taps on)"""
+    level_name, frames, held, tapped, tap_frames = batch
+
+    level = room(level_name)
+    runners = [Runner(level) for _ in tap_frames]
+    for frame in range(frames):
+        for tap_frame, runner in zip(tap_frames, runners):
+            if runner.beaten_on is None:
+                if frame == tap_frame:
+                    runner.step(held | tapped)
+                else:
+                    runner.step(held)
+
+        # Punchers are only drawn, so there's no need to keep them
+        del punchers.punchers[:]
+
+    return [Result(tap_frame, runner) for tap_frame, runner in zip(tap_frames, runners)]
+
+
+def sweep(level_name, frames, held, tapped, processes=1):
+    """plays a player for every frame the tapped action could be tapped on,
+    and returns their Results in that order"""
+    tap_frames = range(frames)
+    batches = [(level_name, frames, held, tapped, tap_frames[start:start + BATCH_SIZE])
+               for start in range(0, frames, BATCH_SIZE)]
+
+    if processes == 1:
+        batch_results = map(play_batch, batches)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            batch_results = pool.map(play_batch, batches)
+
+    return [result for results in batch_results for result in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tries every timing of an action.")
+    parser.add_argument("levels", nargs="+", help="names of the levels to play")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frames to play each player for")
+    parser.add_argument("--hold", nargs="*", default=[], choices=sorted(ACTIONS),
+                        help="actions held the whole time")
+    parser.add_argument("--tap", default="jump", choices=sorted(ACTIONS),
+                        help="the action tapped on a different frame by each player")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="processes to play the players in")
+    args = parser.parse_args()
+
+    held = 0
+    for action in args.hold:
+        held |= ACTIONS[action]
+    tapped = ACTIONS[args.tap]
+
+    total_frames = 0
+    start_time = time.perf_counter()
+    for level_name in args.levels:
+        results = sweep(level_name, args.frames, held, tapped, args.processes)
+        total_frames += sum(result.frames for result in results)
+
+        beaten = [result for result in results if result.beaten_on is not None]
+        if beaten:
+            fastest = min(beaten, key=lambda result: result.beaten_on)
+            print("%s: %i of %i timings beat it, fastest on frame %i by tapping on frame %i"
+                  % (level_name, len(beaten), len(results), fastest.beaten_on, fastest.tap_frame))
+        else:
+            print("%s: none of %i timings beat it" % (level_name, len(results)))
+
+    seconds = time.perf_counter() - start_time
+    print("%i frames in %.2f seconds (%i frames per second)"
+          % (total_frames, seconds, total_frames / max(seconds, 0.000001)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Steps the game at a fixed rate, however long each frame takes to draw.
+
+Every frame, advance() returns how many steps of STEP seconds are due
+since the last frame.  The game takes that many steps and is then drawn
+once, so a slow frame is caught up on by taking several steps before the
+next draw.  That keeps the game running at const.FPS.  Only frames are
+dropped, never steps.  Time left over from a partial step carries over to
+the next frame.
+
+Nothing would change between two draws without a step in between, so
+wait() sleeps until the next step is due instead of drawing the same frame
+again.
+
+Only MAX_STEPS are taken before drawing, so the screen still changes while
+the game catches up.  Steps past that are carried over to the next frame,
+unless the game has fallen more than MAX_BEHIND seconds behind.  Then it
+can't keep up, and the extra steps are let go of rather than piling up
+forever.
+"""
+import time
+
+import constants as const
+
+STEP = 1 / const.FPS  # seconds
+MAX_STEPS = 5  # the most steps taken before drawing
+MAX_BEHIND = 1.0  # seconds
+
+# A step that's this much of a step away from being due is taken anyway, so
+# that rounding doesn't make frames a step apart take none and then two
+TOLERANCE = 0.001
+
+
+class Timestep:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._last = None  # when advance() was last called
+        self._behind = 0.0  # seconds of steps that are due
+
+        self.steps = 0
+        self.frames = 0
+        self.catch_up_frames = 0  # frames that took more than one step
+        self.skipped_draws = 0  # one for each extra step those frames took
+        self.dropped_steps = 0  # steps let go of while too far behind
+
+    def advance(self):
+        """returns how many steps to take before drawing this frame"""
+        now = self.clock()
+        if self._last is None:
+            self._behind = STEP
+        else:
+            self._behind += now - self._last
+        self._last = now
+
+        steps = min(int(self._behind / STEP + TOLERANCE), MAX_STEPS)
+        self._behind -= steps * STEP
+
+        if self._behind > MAX_BEHIND:
+            dropped = int((self._behind - MAX_BEHIND) / STEP + TOLERANCE)
+            self.dropped_steps += dropped
+            self._behind -= dropped * STEP
+
+        self.steps += steps
+        self.frames += 1
+        if steps > 1:
+            self.catch_up_frames += 1
+            self.skipped_draws += steps - 1
+        return steps
+
+    def wait(self):
+        """sleeps until the next step is due"""
+        if self._last is None:
+            return
+
+        delay = self._last + STEP - self._behind - self.clock()
+        if delay > 0:
+            time.sleep(delay)
+
+    def reset(self):
+        """forgets about any steps that are due, for after a pause that
+        isn't part of the game, like loading"""
+        self._last = None
+        self._behind = 0.0
+
+    def report(self):
+        return ("%i steps, %i frames, %i caught up on (%i draws skipped), %i steps dropped"
+                % (self.steps, self.frames, self.catch_up_frames,
+                   self.skipped_draws, self.dropped_steps))